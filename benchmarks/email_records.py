@@ -0,0 +1,169 @@
+# benchmarks/email_records.py
+"""Compare the memory of a cached inbox held as EmailRecords and as plain dicts
+
+Usage: python benchmarks/email_records.py [--count N] [--db DIR]
+
+Fills a message cache in a temporary directory (or uses the existing one
+in --db) with a synthetic inbox, then loads all of it with
+StorageService.get_cached_messages twice in fresh processes: once as the
+EmailRecords it returns, with bodies left in the blob store, and once as
+the dicts with eager bodies it returned before records were introduced.
+Reports the memory each list keeps alive (tracemalloc) and the growth of
+resident memory while loading it, where the platform exposes it.
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.storage_service import StorageService
+
+WORDS = ("offer account update order shipping invoice team meeting weekly report project delivery "
+         "schedule review confirm thanks please attached regards tomorrow budget draft").split()
+
+def resident_memory():
+    """Resident set size in bytes, or None where it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def fill_cache(storage, count, seed=1):
+    """Save count synthetic emails from a few hundred senders"""
+    rng = random.Random(seed)
+    senders = [f"Sender {index} <sender{index}@example.com>" for index in range(300)]
+    
+    for start in range(0, count, 1000):
+        emails = []
+        for index in range(start, min(count, start + 1000)):
+            body = '\n\n'.join(
+                ' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))
+                for _ in range(rng.randint(2, 12))
+            )
+            emails.append({
+                'id': f"message-{index}",
+                'subject': ' '.join(rng.choice(WORDS) for _ in range(6)),
+                'from': rng.choice(senders),
+                'to': "Me <me@example.com>",
+                'date': f"Mon, {1 + index % 28:02d} Jan 2024 {index % 24:02d}:{index % 60:02d}:00",
+                'body': body,
+                'conversation_id': f"conversation-{index // 3}",
+                'unread': rng.random() < 0.2,
+                'has_attachments': rng.random() < 0.1,
+                'priority': rng.choice(['Low', 'Medium', 'High']),
+                'priority_score': rng.randint(0, 100),
+                'last_modified': "2024-01-01 00:00:00"
+            })
+        storage.save_messages(emails)
+
+def legacy_messages(storage, limit):
+    """Load the cache as the dicts with eager bodies used before EmailRecord"""
+    conn = sqlite3.connect(storage.db_file)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM messages ORDER BY received_at DESC LIMIT ?', (limit,))
+    rows = cursor.fetchall()
+    bodies = storage.blob_store.get_many(cursor, [row['body_key'] for row in rows])
+    conn.close()
+    
+    return [{
+        'id': row['entry_id'],
+        'subject': row['subject'] or '',
+        'from': row['sender'] or '',
+        'to': row['recipients'] or '',
+        'date': row['date'] or '',
+        'body': bodies.get(row['body_key'], ''),
+        'conversation_id': row['conversation_id'],
+        'unread': bool(row['unread']),
+        'has_attachments': bool(row['has_attachments']),
+        'priority': row['priority'] or 'Medium',
+        'priority_score': row['priority_score'] if row['priority_score'] is not None else 50,
+        'content_hash': row['content_hash'],
+        'last_modified': row['last_modified']
+    } for row in rows]
+
+def measure(config_dir, mode, limit):
+    """Load the cache in this process and print the memory it takes as JSON"""
+    storage = StorageService(config_dir)
+    
+    def load():
+        if mode == 'records':
+            return storage.get_cached_messages(limit=limit)
+        return legacy_messages(storage, limit)
+    
+    # Resident memory first, as tracing allocations inflates it
+    rss_before = resident_memory()
+    messages = load()
+    rss_after = resident_memory()
+    count = len(messages)
+    del messages
+    
+    tracemalloc.start()
+    messages = load()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(json.dumps({
+        'count': count,
+        'retained': retained,
+        'rss': rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=50000, help="messages in the synthetic cache")
+    parser.add_argument('--db', help="existing config directory to measure instead of a synthetic one")
+    parser.add_argument('--measure', choices=['records', 'dicts'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure:
+        measure(args.db, args.measure, args.count)
+        return 0
+    
+    directory = None
+    try:
+        config_dir = args.db
+        if not config_dir:
+            directory = tempfile.mkdtemp(prefix="email_records_")
+            config_dir = directory
+            print(f"Filling a cache with {args.count} messages...")
+            fill_cache(StorageService(config_dir), args.count)
+        
+        results = {}
+        for mode in ('dicts', 'records'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--measure', mode,
+                 '--db', config_dir, '--count', str(args.count)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+        
+        for mode, label in (('dicts', "Dicts, eager bodies"), ('records', "EmailRecords")):
+            result = results[mode]
+            rss = f"{result['rss'] / 1024 / 1024:7.1f} MB RSS" if result['rss'] is not None else "RSS n/a"
+            print(f"{label:20} {result['count']:>6} emails  {result['retained'] / 1024 / 1024:7.1f} MB retained  {rss}")
+        
+        ratio = results['dicts']['retained'] / max(1, results['records']['retained'])
+        print(f"Records keep {ratio:.1f}x less memory alive")
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
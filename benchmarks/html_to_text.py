@@ -0,0 +1,142 @@
+# benchmarks/html_to_text.py
+"""Compare the streaming HTML converter with BeautifulSoup on HTML emails
+
+Usage: python benchmarks/html_to_text.py [PATH ...] [--repeat N]
+
+Each PATH is a Maildir directory, an mbox file, or a directory of .html
+and .eml files; the text/html parts of the messages form the corpus.
+Without paths a generated corpus of newsletter-style emails is used,
+which only approximates real-world mail. Both converters' output goes
+through EmailProcessor._clean_text before comparing, as it does when
+emails are parsed. Parity is reported as the share of documents with
+identical text and the mean word-level similarity.
+"""
+import os
+import sys
+import time
+import random
+import mailbox
+import argparse
+from difflib import SequenceMatcher
+from email import message_from_binary_file, message_from_bytes
+from email.policy import default
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.email_processor import EmailProcessor
+from models.html_converter import HtmlTextConverter
+
+def html_parts(message):
+    """Get the decoded text/html parts of a message"""
+    parts = []
+    for part in message.walk():
+        if part.get_content_type() == 'text/html' and part.get_content_disposition() != 'attachment':
+            try:
+                parts.append(part.get_content())
+            except Exception:
+                continue
+    return parts
+
+def load_corpus(paths):
+    """Collect HTML documents from Maildirs, mbox files and directories of .html/.eml files"""
+    documents = []
+    for path in paths:
+        if os.path.isdir(os.path.join(path, 'cur')):
+            for message in mailbox.Maildir(path, factory=None):
+                documents.extend(html_parts(message_from_bytes(message.as_bytes(), policy=default)))
+        elif os.path.isfile(path):
+            for message in mailbox.mbox(path):
+                documents.extend(html_parts(message_from_bytes(message.as_bytes(), policy=default)))
+        else:
+            for name in sorted(os.listdir(path)):
+                full_path = os.path.join(path, name)
+                if name.lower().endswith(('.html', '.htm')):
+                    with open(full_path, encoding='utf-8', errors='replace') as f:
+                        documents.append(f.read())
+                elif name.lower().endswith('.eml'):
+                    with open(full_path, 'rb') as f:
+                        documents.extend(html_parts(message_from_binary_file(f, policy=default)))
+    return documents
+
+def generated_corpus(count=200, seed=1):
+    """Newsletter-style HTML: style blocks, nested layout tables, inline styles, links and pixels"""
+    rng = random.Random(seed)
+    words = ("offer sale account update order shipping invoice team meeting weekly report new free "
+             "limited exclusive members savings review schedule project delivery confirm").split()
+    
+    def sentence():
+        return ' '.join(rng.choice(words) for _ in range(rng.randint(6, 18))).capitalize() + '.'
+    
+    documents = []
+    for _ in range(count):
+        rows = []
+        for _ in range(rng.randint(5, 40)):
+            cells = ''.join(
+                f'<td style="padding:8px;font-family:Arial;color:#333" valign="top">'
+                f'<a href="https://example.com/{rng.randint(1, 10**6)}" style="color:#06c">{sentence()}</a>'
+                f'<br/><span style="font-size:12px">{sentence()} &amp; {sentence()}</span></td>'
+                for _ in range(rng.randint(1, 3))
+            )
+            rows.append(f'<tr>{cells}</tr>')
+        documents.append(
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Newsletter</title>'
+            '<style>' + 'td{padding:0} .x{color:red} ' * rng.randint(20, 200) + '</style>'
+            '<script>var tracking = {id: 1};</script></head><body>'
+            f'<div class="preheader" style="display:none">{sentence()}</div>'
+            '<table width="600" cellpadding="0" cellspacing="0" border="0">'
+            + ''.join(rows) +
+            '</table>'
+            f'<p>{sentence()}</p><p>&copy; 2024 Example &nbsp;|&nbsp; <a href="#">Unsubscribe</a></p>'
+            '<img src="https://example.com/pixel.gif" width="1" height="1">'
+            '</body></html>'
+        )
+    return documents
+
+def run(documents, repeat):
+    soup_processor = EmailProcessor(html_converter=None)
+    fast_processor = EmailProcessor()
+    
+    def timed(processor):
+        best = None
+        outputs = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            outputs = [processor._clean_text(processor._html_to_text(html)) for html in documents]
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, outputs
+    
+    soup_time, soup_texts = timed(soup_processor)
+    fast_time, fast_texts = timed(fast_processor)
+    
+    fallbacks = sum(1 for html in documents if HtmlTextConverter().convert(html) is None)
+    identical = sum(1 for a, b in zip(soup_texts, fast_texts) if a == b)
+    similarity = sum(
+        SequenceMatcher(None, a.split(), b.split(), autojunk=False).ratio()
+        for a, b in zip(soup_texts, fast_texts)
+    ) / max(1, len(documents))
+    
+    size = sum(len(html) for html in documents)
+    print(f"Documents:        {len(documents)} ({size / 1024 / 1024:.1f} MB of HTML)")
+    print(f"BeautifulSoup:    {soup_time:.3f}s")
+    print(f"HtmlTextConverter: {fast_time:.3f}s ({soup_time / fast_time:.1f}x faster)")
+    print(f"Fell back:        {fallbacks}")
+    print(f"Identical text:   {identical}/{len(documents)}")
+    print(f"Word similarity:  {similarity:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', help="Maildir, mbox or directory of .html/.eml files")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per converter; the best is reported")
+    args = parser.parse_args()
+    
+    documents = load_corpus(args.paths) if args.paths else generated_corpus()
+    if not documents:
+        print("No HTML documents found")
+        return 1
+    
+    run(documents, args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# benchmarks/parse_many.py
+"""Measure EmailProcessor.parse_many throughput against the number of worker processes
+
+Usage: python benchmarks/parse_many.py [--count N] [--workers 1,2,4] [--paths]
+
+A synthetic corpus is generated: plain text replies, HTML newsletters and
+multipart/alternative messages with a base64 attachment, in roughly the
+proportions of a typical inbox. By default the messages are passed as
+bytes; with --paths they are written to a temporary directory and passed
+as file paths, as when backfilling a Maildir. Each worker count reports
+messages per second and the speedup over one worker, and its results are
+checked against the single-process run.
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.email_processor import EmailProcessor
+
+WORDS = ("offer account update order shipping invoice team meeting weekly report project delivery "
+         "schedule review confirm thanks please attached regards tomorrow budget draft").split()
+
+def sentence(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + '.'
+
+def generated_message(rng, index):
+    """One synthetic message as bytes"""
+    message = EmailMessage()
+    message['Subject'] = sentence(rng)[:60]
+    message['From'] = f"Sender {index % 97} <sender{index % 97}@example.com>"
+    message['To'] = "me@example.com"
+    message['Date'] = "Mon, 01 Jan 2024 10:00:00 +0000"
+    message['Message-ID'] = f"<{index}@example.com>"
+    
+    kind = rng.random()
+    paragraphs = [sentence(rng) for _ in range(rng.randint(3, 30))]
+    if kind < 0.5:
+        quoted = '\n'.join('> ' + line for line in paragraphs[:5])
+        message.set_content('\n\n'.join(paragraphs) + '\n\n' + quoted)
+    elif kind < 0.8:
+        rows = ''.join(
+            f'<tr><td style="padding:8px;color:#333"><a href="https://example.com/{rng.randint(1, 10**6)}">'
+            f'{text}</a></td></tr>' for text in paragraphs
+        )
+        message.set_content(
+            '<html><head><style>' + 'td{padding:0} ' * rng.randint(20, 200) + '</style></head>'
+            f'<body><table>{rows}</table></body></html>', subtype='html'
+        )
+    else:
+        message.set_content('\n\n'.join(paragraphs))
+        message.add_alternative(''.join(f'<p>{text}</p>' for text in paragraphs), subtype='html')
+        message.add_attachment(
+            rng.randbytes(rng.randint(10, 200) * 1024), maintype='application', subtype='pdf',
+            filename=f"report{index}.pdf"
+        )
+    return message.as_bytes()
+
+def generated_corpus(count, seed=1):
+    rng = random.Random(seed)
+    return [generated_message(rng, index) for index in range(count)]
+
+def run(sources, worker_counts):
+    processor = EmailProcessor()
+    baseline = None
+    single_rate = None
+    
+    for workers in worker_counts:
+        started = time.perf_counter()
+        results = list(processor.parse_many(sources, workers=workers))
+        elapsed = time.perf_counter() - started
+        
+        rate = len(results) / elapsed
+        single_rate = single_rate or (rate if workers == 1 else None)
+        speedup = f"{rate / single_rate:.2f}x" if single_rate else "-"
+        
+        # Compare header objects rebuilt from the workers as plain strings
+        texts = [{key: str(value) for key, value in result.items()} for result in results]
+        if baseline is None:
+            baseline = texts
+        matches = "same results" if texts == baseline else "RESULTS DIFFER"
+        
+        print(f"{workers:>3} workers: {elapsed:7.2f}s  {rate:8.1f} msg/s  {speedup:>6}  {matches}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=2000, help="messages in the corpus")
+    parser.add_argument('--workers', default=None, help="comma-separated worker counts (default 1, 2, 4 ... cores)")
+    parser.add_argument('--paths', action='store_true', help="pass messages as file paths instead of bytes")
+    args = parser.parse_args()
+    
+    if args.workers:
+        worker_counts = [int(count) for count in args.workers.split(',')]
+    else:
+        cores = os.cpu_count() or 1
+        worker_counts = sorted({1, cores} | {2 ** power for power in range(1, 8) if 2 ** power < cores})
+    
+    corpus = generated_corpus(args.count)
+    size = sum(len(raw) for raw in corpus)
+    print(f"Corpus: {len(corpus)} messages ({size / 1024 / 1024:.1f} MB), {os.cpu_count()} cores")
+    
+    directory = None
+    try:
+        if args.paths:
+            directory = tempfile.mkdtemp(prefix="parse_many_")
+            sources = []
+            for index, raw in enumerate(corpus):
+                path = os.path.join(directory, f"{index}.eml")
+                with open(path, 'wb') as f:
+                    f.write(raw)
+                sources.append(path)
+        else:
+            sources = corpus
+        
+        run(sources, worker_counts)
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
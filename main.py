@@ -1,8 +1,6 @@
 import os
 import sys
 import logging
-import json
-from pathlib import Path
 import threading
 import tkinter as tk
 from tkinter import messagebox
@@ -18,7 +16,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def create_default_config():
+def create_default_config(storage):
     """Create default configuration if none exists"""
     default_config = {
         "user": {
@@ -39,18 +37,19 @@ def create_default_config():
             "system_prompt": "",
             "always_review": True,
             "style_samples": []
+        },
+        "storage": {
+            "retention": {
+                "completed_task_days": 90,
+                "draft_body_days": 30,
+                "message_cache_days": 60
+            }
         }
     }
     
-    config_dir = Path.home() / ".email_agent_ollama"
-    config_dir.mkdir(exist_ok=True)
-    
-    config_file = config_dir / "settings.json"
+    storage.save_config(default_config)
     
-    with open(config_file, 'w') as f:
-        json.dump(default_config, f, indent=4)
-    
-    logger.info(f"Created default configuration at {config_file}")
+    logger.info(f"Created default configuration at {storage.config_file}")
     return default_config
 
 def check_ollama_running():
@@ -83,7 +82,7 @@ def main():
     
     # Import modules here to avoid loading them before Ollama check
     from services.storage_service import StorageService
-    from services.outlook_service import OutlookService
+    from services.mail_source import create_mail_source
     from services.ollama_service import OllamaService
     from models.email_processor import EmailProcessor
     from models.priority_engine import PriorityEngine
@@ -96,24 +95,32 @@ def main():
     
     # Load or create configuration
     if not storage.config_exists():
-        config = create_default_config()
+        config = create_default_config(storage)
         logger.info("Using default configuration")
     else:
         config = storage.load_config()
         logger.info("Loaded existing configuration")
     
+    # The email processor is shared with local mail sources and the models
+    email_processor = EmailProcessor()
+    
     # Initialize services
-    outlook_service = OutlookService(config)  # We'll set the root later
+    outlook_service = create_mail_source(config, email_processor)  # We'll set the root later
     ollama_service = OllamaService(
         config["ollama"]["host"], 
         config["ollama"]["model"]
     )
     
     # Initialize models
-    email_processor = EmailProcessor()
     priority_engine = PriorityEngine(config["email"])
-    response_generator = ResponseGenerator(ollama_service, config["user"], config["ollama"])
-    action_extractor = ActionItemExtractor()
+    response_generator = ResponseGenerator(ollama_service, config["user"], config["ollama"], email_processor)
+    action_extractor = ActionItemExtractor(email_processor=email_processor)
+    
+    # Rebuild derived settings only when their section of the config changes
+    storage.subscribe_config("email", priority_engine.update_config)
+    storage.subscribe_config("user", response_generator.update_user_config)
+    storage.subscribe_config("ollama", response_generator.update_ollama_config)
+    storage.subscribe_config("ollama", ollama_service.update_config)
     
     # Start the UI
     app = EmailAgentUI(
@@ -3,14 +3,18 @@ import re
 import logging
 from datetime import datetime, timedelta
 
+from models.email_processor import EmailProcessor
+
 logger = logging.getLogger(__name__)
 
 class ActionItemExtractor:
     """Extracts action items from email content"""
     
-    def __init__(self, ollama_service=None):
+    def __init__(self, ollama_service=None, email_processor=None):
         # Initialize with optional Ollama service
         self.ollama_service = ollama_service
+        # Actions are only taken from the new content, not quoted history
+        self.email_processor = email_processor or EmailProcessor()
         
         # Initialize patterns for action item extraction
         self.request_patterns = [
@@ -37,7 +41,7 @@ class ActionItemExtractor:
         action_items = []
         
         try:
-            body = email_data.get('body', '')
+            body = self.email_processor.new_content(email_data.get('body', ''))
             subject = email_data.get('subject', '')
             
             # Use Ollama for extraction if available
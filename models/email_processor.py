@@ -1,20 +1,98 @@
 # models/email_processor.py
+import io
+import os
 import re
-from email.parser import BytesParser
+import binascii
+import mimetypes
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from email.header import decode_header, make_header
+from email.parser import BytesParser, BytesHeaderParser, BytesFeedParser
 from email.policy import default
 from bs4 import BeautifulSoup
 import logging
 
+from models.html_converter import html_to_text
+
 logger = logging.getLogger(__name__)
 
+# Whitespace other than line breaks, collapsed to one space by _clean_text
+INLINE_SPACE = re.compile(r'[^\S\n]+')
+
+# Spaces around line breaks, and runs of blank lines
+LINE_BREAK = re.compile(r' ?\n ?')
+BLANK_LINES = re.compile(r'\n{3,}')
+
+# Marker lines of forwarded messages; the forwarded text itself is kept
+FORWARD_MARKER = re.compile(
+    r'^(?:-{3,} ?Forwarded message ?-{3,}|Begin forwarded message:)$\n?', re.IGNORECASE | re.MULTILINE
+)
+
+# Lines that start the quoted history of a reply; everything after the first one is quoted
+QUOTE_HEADERS = [
+    # "On Mon, 1 Jan 2024 at 10:00, Jane <jane@example.com> wrote:", which clients may wrap once
+    re.compile(r'^(?:On|Am|Le|El)\b[^\n]*(?:\n[^\n]*)?\b(?:wrote|schrieb|a écrit|escribió) ?:$', re.MULTILINE),
+    re.compile(r'^-{2,} ?Original Message ?-{2,}$', re.IGNORECASE | re.MULTILINE),
+    # Outlook's separator line and "From: ... Sent: ..." header block
+    re.compile(r'^_{10,}$', re.MULTILINE),
+    re.compile(r'^\*?From:\*? [^\n]*\n\*?(?:Sent|Date):\*? ', re.MULTILINE)
+]
+
+# Inline quoted lines
+QUOTED_LINE = re.compile(r'^>[^\n]*(?:\n|$)', re.MULTILINE)
+
+# Lines that always start a signature: the "-- " delimiter and mobile footers
+SIGNATURE_DELIMITER = re.compile(r'^(?:--|Sent from my [^\n]+|Get Outlook for [^\n]+)$', re.IGNORECASE | re.MULTILINE)
+
+# Sign-offs, which only start a signature when a name or contact block follows
+SIGN_OFF = re.compile(
+    r'^(?:(?:best|kind|warm|many)? ?regards|thanks|thank you|cheers|sincerely|best(?: wishes)?),?$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# A line of a name or contact block: short, no list marker, not ending like a sentence or heading
+SIGNATURE_LINE = re.compile(r'^(?![-*+\u2022] |\d+[.)] )[^\n]{1,60}(?<![.?!:;])$')
+
+# At most this many lines may follow a sign-off
+SIGNATURE_MAX_LINES = 6
+
 class EmailProcessor:
-    """Process and parse email data"""
+    """Process and parse email data
+    
+    html_converter(html) turns HTML bodies into text, returning None for
+    input it cannot handle, which then goes to BeautifulSoup. It defaults
+    to the streaming html_to_text; pass None to always use BeautifulSoup.
+    """
+    
+    # Bytes read from a message at a time when scanning it for attachments
+    CHUNK_SIZE = 64 * 1024
+    
+    # Messages larger than this are parsed with parse_email_file
+    STREAM_THRESHOLD = 1024 * 1024
+    
+    # Characters of text kept per body part when streaming
+    MAX_TEXT = 100 * 1024
+    
+    # Bytes read at a time when looking for the end of the headers
+    HEADER_CHUNK = 4096
     
-    def __init__(self):
+    # Messages sent to a parse_many worker per task
+    PARSE_CHUNK = 32
+    
+    def __init__(self, html_converter=html_to_text):
+        self.html_converter = html_converter
         self.parser = BytesParser(policy=default)
+        self.header_parser = BytesHeaderParser(policy=default)
+        # The legacy policy keeps header values as raw strings, which is several
+        # times faster than building header objects for every listed message
+        self.summary_header_parser = BytesHeaderParser()
     
     def parse_email(self, raw_email):
         """Parse raw email into structured format"""
+        if len(raw_email) > self.STREAM_THRESHOLD:
+            return self.parse_email_file(io.BytesIO(raw_email))
+        
         try:
             email_message = self.parser.parsebytes(raw_email)
             
@@ -38,15 +116,216 @@ class EmailProcessor:
         
         except Exception as e:
             logger.error(f"Error parsing email: {str(e)}")
+            return self._parse_error()
+    
+    def read_headers(self, source):
+        """Parse only the header block of a message given as bytes or a binary file
+        
+        A file is read a few KB at a time up to the blank line that ends the
+        headers, so the cost does not depend on the size of the body. Values
+        are raw strings; use header_text() for display fields.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            end = self._header_end(source)
+            return self.summary_header_parser.parsebytes(bytes(source[:end] if end is not None else source))
+        
+        data = b''
+        while True:
+            chunk = source.read(self.HEADER_CHUNK)
+            if not chunk:
+                break
+            data += chunk
+            end = self._header_end(data)
+            if end is not None:
+                data = data[:end]
+                break
+        return self.summary_header_parser.parsebytes(data)
+    
+    def header_text(self, headers, name):
+        """Get a header of read_headers() as text, decoding RFC 2047 encoded words"""
+        value = headers[name]
+        if value is None:
+            return ""
+        
+        value = str(value)
+        if '=?' not in value:
+            return value
+        try:
+            return str(make_header(decode_header(value)))
+        except Exception:
+            return value
+    
+    def _header_end(self, data):
+        """Offset of the blank line that ends the headers, or None if not read yet"""
+        if data.startswith((b'\n', b'\r\n')):
+            return 0
+        
+        ends = [index for index in (data.find(b'\n\n'), data.find(b'\n\r\n')) if index >= 0]
+        return min(ends) + 1 if ends else None
+    
+    def parse_headers(self, raw_email):
+        """Parse the header fields of a message (bytes or a binary file) without its body
+        
+        Returns the fields of parse_email except 'body'. has_attachments is
+        only a hint taken from the top-level content type.
+        """
+        try:
+            headers = self.read_headers(raw_email)
+            return {
+                'subject': self.header_text(headers, 'subject'),
+                'from': self.header_text(headers, 'from'),
+                'to': self.header_text(headers, 'to'),
+                'date': self.header_text(headers, 'date'),
+                'thread_id': self._extract_thread_id(headers),
+                'has_attachments': headers.get_content_type() == 'multipart/mixed'
+            }
+        
+        except Exception as e:
+            logger.error(f"Error parsing email headers: {str(e)}")
+            result = self._parse_error()
+            del result['body']
+            return result
+    
+    def parse_email_file(self, fp, max_text=None):
+        """Parse a message read from a binary file without holding it in memory
+        
+        Parts are found with the same chunked scan as list_attachments.
+        Only text parts go through a BytesFeedParser, fed at most enough
+        raw bytes for max_text characters; attachment payloads are skipped
+        without being decoded (extract_attachment spools one on request).
+        Returns the same dict as parse_email.
+        """
+        max_text = max_text or self.MAX_TEXT
+        try:
+            texts = {}
+            found = {'attachments': False}
+            
+            def visit(headers):
+                if self._is_attachment(headers):
+                    found['attachments'] = True
+                    return None
+                
+                content_type = headers.get_content_type()
+                if content_type not in ('text/plain', 'text/html') or content_type in texts:
+                    return None
+                return self._text_part_feeder(headers, max_text, texts)
+            
+            reader = _ChunkReader(fp, self.CHUNK_SIZE)
+            message_headers = self._read_headers(reader)
+            self._scan_part(reader, message_headers, [], visit)
+            
+            if 'text/plain' in texts:
+                body = texts['text/plain']
+            elif 'text/html' in texts:
+                body = self._html_to_text(texts['text/html'])
+            else:
+                body = ""
+            
             return {
-                'subject': 'Error parsing email',
-                'from': '',
-                'to': '',
-                'date': '',
-                'thread_id': None,
-                'has_attachments': False,
-                'body': 'There was an error parsing this email.'
+                'subject': message_headers['subject'] or "",
+                'from': message_headers['from'] or "",
+                'to': message_headers['to'] or "",
+                'date': message_headers['date'] or "",
+                'thread_id': self._extract_thread_id(message_headers),
+                'has_attachments': found['attachments'],
+                'body': self._clean_text(body)
             }
+        
+        except Exception as e:
+            logger.error(f"Error parsing email: {str(e)}")
+            return self._parse_error()
+    
+    def parse_many(self, sources, workers=None, chunk_size=None, max_pending=None):
+        """Parse many messages on a process pool, yielding the results in input order
+        
+        sources is an iterable of raw messages (bytes) or paths of message
+        files; a path is opened in the worker and parsed with
+        parse_email_file, so large messages are never copied between
+        processes. Messages go to the workers chunk_size at a time, and at
+        most max_pending chunks (twice the workers by default) are queued,
+        running or waiting to be consumed, so memory stays bounded however
+        long sources is and however slowly the results are read. workers
+        defaults to the CPU count; with one worker everything is parsed in
+        this process. Yields the dicts of parse_email.
+        """
+        workers = workers or os.cpu_count() or 1
+        chunk_size = chunk_size or self.PARSE_CHUNK
+        max_pending = max_pending or workers * 2
+        items = iter(sources)
+        
+        if workers <= 1:
+            for item in items:
+                yield self._parse_item(item)
+            return
+        
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_parse_worker, initargs=(self.html_converter,)
+        )
+        pending = deque()
+        try:
+            while True:
+                # Only read more input once earlier results have been consumed
+                while len(pending) < max_pending:
+                    chunk = list(islice(items, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_parse_chunk, chunk))
+                
+                if not pending:
+                    break
+                yield from pending.popleft().result()
+        finally:
+            # Also runs when the caller stops iterating early
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _parse_item(self, item):
+        """Parse one parse_many source: raw bytes or the path of a message file"""
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            return self.parse_email(bytes(item))
+        
+        try:
+            with open(item, 'rb') as f:
+                return self.parse_email_file(f)
+        except OSError as e:
+            logger.error(f"Error reading email file: {str(e)}")
+            return self._parse_error()
+    
+    def _text_part_feeder(self, headers, max_text, texts):
+        """Feed a text part into a BytesFeedParser, stopping once it holds enough for max_text"""
+        feed_parser = BytesFeedParser(policy=default)
+        feed_parser.feed(headers.as_bytes())
+        
+        # Quoted-printable and base64 take up to about 4 bytes per character of UTF-8 text
+        budget = [max_text * 4]
+        
+        def feed(data):
+            if data is None:
+                part = feed_parser.close()
+                try:
+                    text = part.get_content()
+                except LookupError:
+                    # Unknown charset
+                    text = part.get_payload(decode=True).decode('utf-8', errors='replace')
+                texts[part.get_content_type()] = text[:max_text]
+                return
+            
+            # Whole lines only, so a cut never splits an encoded unit
+            if budget[0] > 0:
+                budget[0] -= len(data)
+                feed_parser.feed(data)
+        return feed
+    
+    def _parse_error(self):
+        """Result returned for a message that could not be parsed"""
+        return {
+            'subject': 'Error parsing email',
+            'from': '',
+            'to': '',
+            'date': '',
+            'thread_id': None,
+            'has_attachments': False,
+            'body': 'There was an error parsing this email.'
+        }
     
     def _extract_body(self, email_message):
         """Extract text content from email body, handling HTML and plaintext"""
@@ -81,6 +360,14 @@ class EmailProcessor:
         
     def _html_to_text(self, html):
         """Convert HTML to plaintext"""
+        if self.html_converter:
+            try:
+                text = self.html_converter(html)
+                if text is not None:
+                    return text
+            except Exception as e:
+                logger.debug(f"HTML converter failed, using BeautifulSoup: {str(e)}")
+        
         try:
             soup = BeautifulSoup(html, features="html.parser")
             return soup.get_text(separator='\n')
@@ -89,15 +376,262 @@ class EmailProcessor:
             return "Error extracting HTML content"
     
     def _clean_text(self, text):
-        """Clean up extracted text"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        # Remove lengthy email signatures
-        text = re.sub(r'--+\s*.*$', '', text, flags=re.MULTILINE)
-        # Remove forwarded message markers
-        text = re.sub(r'-{3,}.*Forwarded message.*-{3,}', '', text)
-        return text
+        """Collapse spaces within lines and runs of blank lines
+        
+        Line breaks and forwarded-message markers are kept for segment_reply.
+        """
+        text = INLINE_SPACE.sub(' ', text.replace('\r\n', '\n'))
+        text = LINE_BREAK.sub('\n', text)
+        return BLANK_LINES.sub('\n\n', text).strip()
+    
+    def segment_reply(self, text):
+        """Split a reply body into its new content, quoted history and signature
+        
+        Quoted history starts at the first attribution line ("On ... wrote:",
+        "-----Original Message-----" or an Outlook "From:/Sent:" block);
+        inline "> " lines are quoted too. A forwarded message counts as new
+        content. The signature starts at a "--" line, a mobile footer or a
+        sign-off followed only by a short name or contact block. Returns a
+        dict of 'new', 'quoted' and 'signature' text.
+        """
+        text = self._clean_text(text or '')
+        
+        # Headers inside a forwarded message do not start quoted history
+        forward = FORWARD_MARKER.search(text)
+        searched = text[:forward.start()] if forward else text
+        
+        quote_start = min(
+            (match.start() for match in (pattern.search(searched) for pattern in QUOTE_HEADERS) if match),
+            default=len(text)
+        )
+        reply, history = FORWARD_MARKER.sub('', text[:quote_start]), text[quote_start:]
+        
+        quoted_lines = QUOTED_LINE.findall(reply)
+        reply = QUOTED_LINE.sub('', reply)
+        
+        signature_start = self._signature_start(reply)
+        reply, signature = reply[:signature_start], reply[signature_start:]
+        
+        return {
+            'new': BLANK_LINES.sub('\n\n', reply).strip(),
+            'quoted': (''.join(quoted_lines) + history).strip(),
+            'signature': signature.strip()
+        }
+    
+    def _signature_start(self, reply):
+        """Offset where the signature of a reply starts, or its length if it has none"""
+        starts = [match.start() for match in SIGNATURE_DELIMITER.finditer(reply) if match.start() > 0]
+        
+        for match in SIGN_OFF.finditer(reply):
+            if match.start() == 0:
+                continue
+            lines = [line for line in reply[match.end():].split('\n') if line]
+            if len(lines) <= SIGNATURE_MAX_LINES and all(SIGNATURE_LINE.match(line) for line in lines):
+                starts.append(match.start())
+                break
+        
+        return min(starts, default=len(reply))
+    
+    def new_content(self, text):
+        """Get only the new content of a reply body, or the whole body if nothing is left"""
+        return self.segment_reply(text)['new'] or (text or '').strip()
+    
+    def list_attachments(self, fp):
+        """List the attachments of a message read from a binary file
+        
+        The message is scanned a chunk at a time and attachment contents are
+        only counted, so memory use does not grow with their size. Returns
+        dicts with 'index', 'name', 'size' (decoded bytes) and
+        'content_type'.
+        """
+        try:
+            attachments = []
             
+            def visit(headers):
+                if not self._is_attachment(headers):
+                    return None
+                
+                info = self._attachment_info(headers, len(attachments))
+                attachments.append(info)
+                
+                def count(data):
+                    info['size'] += len(data)
+                return self._decoder(headers, count)
+            
+            self._scan_parts(fp, visit)
+            return attachments
+        
+        except Exception as e:
+            logger.error(f"Error listing attachments: {str(e)}")
+            return []
+    
+    def extract_attachment(self, fp, index, out):
+        """Decode attachment number index of a message into the binary file out
+        
+        Like list_attachments this streams, holding at most a chunk of the
+        attachment in memory. Returns the attachment's info dict, or None if
+        the message has no such attachment.
+        """
+        try:
+            found = []
+            
+            def visit(headers):
+                if not self._is_attachment(headers):
+                    return None
+                
+                position = len(found)
+                info = self._attachment_info(headers, position)
+                found.append(info)
+                if position != index:
+                    return None
+                
+                def write(data):
+                    info['size'] += len(data)
+                    out.write(data)
+                return self._decoder(headers, write)
+            
+            self._scan_parts(fp, visit)
+            return found[index] if index < len(found) else None
+        
+        except Exception as e:
+            logger.error(f"Error extracting attachment: {str(e)}")
+            return None
+    
+    def _is_attachment(self, headers):
+        """Check whether a leaf part is an attachment rather than body text"""
+        disposition = headers.get_content_disposition()
+        if disposition == 'attachment':
+            return True
+        return bool(headers.get_filename()) or headers.get_content_maintype() not in ('text', 'multipart')
+    
+    def _attachment_info(self, headers, index):
+        """Describe an attachment from its part headers; size is filled in while decoding"""
+        content_type = headers.get_content_type()
+        name = headers.get_filename()
+        if not name:
+            name = f"attachment{index + 1}{mimetypes.guess_extension(content_type) or ''}"
+        return {'index': index, 'name': name, 'size': 0, 'content_type': content_type}
+    
+    def _decoder(self, headers, write):
+        """Wrap write so it receives the part body decoded from its transfer encoding
+        
+        Returns a function taking raw body chunks; it is called with None
+        once the part ends to flush what is still buffered.
+        """
+        encoding = str(headers.get('Content-Transfer-Encoding', '')).strip().lower()
+        pending = [b'']
+        
+        if encoding == 'base64':
+            def decode(data):
+                if data is None:
+                    if pending[0]:
+                        write(binascii.a2b_base64(pending[0] + b'=' * (-len(pending[0]) % 4)))
+                    return
+                
+                data = pending[0] + b''.join(data.split())
+                usable = len(data) - len(data) % 4
+                pending[0] = data[usable:]
+                if usable:
+                    write(binascii.a2b_base64(data[:usable]))
+            return decode
+        
+        if encoding == 'quoted-printable':
+            def decode(data):
+                if data is None:
+                    if pending[0]:
+                        write(binascii.a2b_qp(pending[0]))
+                    return
+                
+                # Decode whole lines so soft line breaks and =XX escapes stay intact
+                data = pending[0] + data
+                end = data.rfind(b'\n') + 1
+                if not end and len(data) > self.CHUNK_SIZE:
+                    end = len(data) - 2
+                pending[0] = data[end:]
+                if end:
+                    write(binascii.a2b_qp(data[:end]))
+            return decode
+        
+        def decode(data):
+            if data is not None:
+                write(data)
+        return decode
+    
+    def _scan_parts(self, fp, visit):
+        """Walk the leaf parts of a MIME message read from fp a chunk at a time
+        
+        visit(headers) is called with the headers of each leaf part and
+        returns a function that is fed the raw body chunks of that part,
+        then None, or returns None to skip the part.
+        """
+        reader = _ChunkReader(fp, self.CHUNK_SIZE)
+        headers = self._read_headers(reader)
+        self._scan_part(reader, headers, [], visit)
+    
+    def _read_headers(self, reader):
+        """Read a header block up to the blank line that ends it"""
+        lines = []
+        while True:
+            chunk = reader.read()
+            if chunk is None or chunk in (b'\n', b'\r\n'):
+                break
+            lines.append(chunk)
+        return self.header_parser.parsebytes(b''.join(lines))
+    
+    def _scan_part(self, reader, headers, boundaries, visit):
+        """Scan one part; returns the boundary line that ended it, or None at the end"""
+        if headers.get_content_maintype() == 'multipart' and headers.get_boundary():
+            return self._scan_multipart(reader, headers.get_boundary().encode(), boundaries, visit)
+        return self._read_body(reader, boundaries, visit(headers))
+    
+    def _scan_multipart(self, reader, boundary, boundaries, visit):
+        """Scan the subparts of a multipart up to its closing boundary"""
+        delimiter = b'--' + boundary
+        boundaries.append(delimiter)
+        try:
+            # Skip the preamble
+            line = self._read_body(reader, boundaries, None)
+            while line is not None:
+                line = line.rstrip()
+                if line == delimiter + b'--':
+                    break
+                if line != delimiter:
+                    # An enclosing multipart ended without closing this one
+                    return line
+                line = self._scan_part(reader, self._read_headers(reader), boundaries, visit)
+        finally:
+            boundaries.pop()
+        
+        # Skip the epilogue
+        return self._read_body(reader, boundaries, None)
+    
+    def _read_body(self, reader, boundaries, sink):
+        """Feed body chunks to sink until a boundary line; returns that line or None"""
+        line_ending = b''
+        while True:
+            chunk = reader.read()
+            if chunk is None:
+                break
+            
+            if reader.line_start and chunk.startswith(b'--') and self._is_boundary(chunk, boundaries):
+                # The line break before a boundary belongs to the boundary
+                if sink:
+                    sink(None)
+                return chunk
+            
+            if sink:
+                body = chunk.rstrip(b'\r\n')
+                sink(line_ending + body)
+                line_ending = chunk[len(body):]
+        
+        if sink:
+            sink(None)
+        return None
+    
+    def _is_boundary(self, line, boundaries):
+        line = line.rstrip()
+        return any(line == delimiter or line == delimiter + b'--' for delimiter in boundaries)
+    
     def _extract_thread_id(self, email_message):
         """Extract thread ID from email headers"""
         # Check headers used by various email systems
@@ -162,4 +696,32 @@ class EmailProcessor:
         else:
             summary = first_para
         
-        return summary
\ No newline at end of file
+        return summary
+
+# EmailProcessor of a parse_many worker process
+_worker_processor = None
+
+def _init_parse_worker(html_converter):
+    global _worker_processor
+    _worker_processor = EmailProcessor(html_converter=html_converter)
+
+def _parse_chunk(items):
+    return [_worker_processor._parse_item(item) for item in items]
+
+class _ChunkReader:
+    """Reads a binary file in lines of at most size bytes, noting where lines start"""
+    
+    def __init__(self, fp, size):
+        self.fp = fp
+        self.size = size
+        self.line_start = True
+        self._at_line_start = True
+    
+    def read(self):
+        """Get the next line or piece of a long line, or None at the end"""
+        chunk = self.fp.readline(self.size)
+        if not chunk:
+            return None
+        self.line_start = self._at_line_start
+        self._at_line_start = chunk.endswith(b'\n')
+        return chunk
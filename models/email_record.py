@@ -0,0 +1,202 @@
+# models/email_record.py
+import sys
+import logging
+from dataclasses import dataclass, field, fields
+
+logger = logging.getLogger(__name__)
+
+class _Unset:
+    """Value of a field that was never set; it reads as a missing key"""
+    __slots__ = ()
+    
+    def __repr__(self):
+        return '<unset>'
+    
+    def __bool__(self):
+        return False
+    
+    def __reduce__(self):
+        return '_UNSET'
+
+_UNSET = _Unset()
+
+@dataclass(slots=True, eq=False)
+class EmailRecord:
+    """Compact email with a slot per common field instead of a dict
+    
+    Emails were passed around as dicts with a dozen keys each; a record
+    holds them in slots, interns the sender and recipient strings, which
+    repeat across an inbox, and can load its body on first access through
+    body_loader. It keeps the dict interface the pipeline already uses
+    (email['from'], get, update, pop, 'partial' in email, dict(email)), so
+    records and dicts are interchangeable. Fields never set read as missing
+    keys; keys without a slot go to a small overflow dict.
+    """
+    
+    id: str = _UNSET
+    subject: str = _UNSET
+    sender: str = _UNSET  # the 'from' key
+    to: str = _UNSET
+    date: str = _UNSET
+    thread_id: str = _UNSET
+    conversation_id: str = _UNSET
+    unread: bool = _UNSET
+    has_attachments: bool = _UNSET
+    priority: str = _UNSET
+    priority_score: int = _UNSET
+    content_hash: str = _UNSET
+    last_modified: str = _UNSET
+    mailbox: str = _UNSET
+    folder: str = _UNSET
+    partial: bool = _UNSET
+    body_loader: object = field(default=None, repr=False)
+    _body: str = field(default=_UNSET, init=False, repr=False)
+    _extra: dict = field(default=None, init=False, repr=False)
+    
+    def __post_init__(self):
+        self.sender = _intern(self.sender)
+        self.to = _intern(self.to)
+    
+    @classmethod
+    def from_dict(cls, data, body_loader=None):
+        """Build a record from an email dict"""
+        record = cls(body_loader=body_loader)
+        record.update(data)
+        return record
+    
+    @property
+    def body(self):
+        """The body text, loaded through body_loader on first access"""
+        loader = self.body_loader
+        if self._body is _UNSET and loader is not None:
+            try:
+                body = loader()
+            except Exception as e:
+                logger.error(f"Error loading email body: {str(e)}")
+                body = ""
+            # A concurrent first access may load it twice, but never sees it missing
+            self._body = body
+            self.body_loader = None
+        return self._body
+    
+    @property
+    def body_loaded(self):
+        return self._body is not _UNSET
+    
+    def _lookup(self, key):
+        if key == 'body':
+            return self.body
+        name = _ATTRIBUTES.get(key)
+        if name:
+            return getattr(self, name)
+        return self._extra.get(key, _UNSET) if self._extra else _UNSET
+    
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+    
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is _UNSET else value
+    
+    def __setitem__(self, key, value):
+        if key == 'body':
+            self._body = value
+            self.body_loader = None
+            return
+        
+        name = _ATTRIBUTES.get(key)
+        if name:
+            setattr(self, name, _intern(value) if name in _INTERNED else value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        
+        if key == 'body':
+            self._body = _UNSET
+            self.body_loader = None
+        elif key in _ATTRIBUTES:
+            setattr(self, _ATTRIBUTES[key], _UNSET)
+        else:
+            del self._extra[key]
+    
+    def __contains__(self, key):
+        if key == 'body':
+            return self._body is not _UNSET or self.body_loader is not None
+        name = _ATTRIBUTES.get(key)
+        if name:
+            return getattr(self, name) is not _UNSET
+        return bool(self._extra) and key in self._extra
+    
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+    
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+    
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, 'items') else other
+        for key, value in items:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+    
+    def keys(self):
+        """Keys that are set; listing them loads nothing, reading 'body' does"""
+        keys = [key for key, name in _ATTRIBUTES.items() if getattr(self, name) is not _UNSET]
+        if 'body' in self:
+            keys.append('body')
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def __len__(self):
+        return len(self.keys())
+    
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+    
+    def values(self):
+        return [self[key] for key in self.keys()]
+    
+    def to_dict(self):
+        """Get a plain dict copy, loading the body"""
+        return dict(self.items())
+    
+    def copy(self):
+        """Get a shallow copy that shares an unloaded body's loader"""
+        record = EmailRecord(**{name: getattr(self, name) for name in _ATTRIBUTES.values()})
+        record.body_loader = self.body_loader
+        record._body = self._body
+        record._extra = dict(self._extra) if self._extra else None
+        return record
+
+# Dict keys stored in slots, mapped to their attribute
+_ATTRIBUTES = {
+    ('from' if item.name == 'sender' else item.name): item.name
+    for item in fields(EmailRecord) if item.name not in ('body_loader', '_body', '_extra')
+}
+
+# Fields whose values repeat across emails and are interned
+_INTERNED = {'sender', 'to'}
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
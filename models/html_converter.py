@@ -0,0 +1,108 @@
+# models/html_converter.py
+import re
+from html.parser import HTMLParser
+
+# Elements whose content is never shown as text
+SKIP_TAGS = {'script', 'style', 'head', 'title', 'noscript', 'template'}
+
+# Elements that start on a new line
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'center', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody',
+    'tfoot', 'thead', 'tr', 'ul'
+}
+
+# Table cells are separated within their row
+CELL_TAGS = {'td', 'th'}
+
+# Elements without an end tag
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+    'source', 'track', 'wbr'
+}
+
+class HtmlTextConverter(HTMLParser):
+    """Streaming HTML to text conversion on html.parser, without building a tree
+    
+    Text inside SKIP_TAGS is dropped, block elements start new lines and
+    table cells are separated by tabs. Input is considered malformed, and
+    convert() returns None so the caller can fall back to a tolerant
+    parser, if a skipped element is never closed (its end tag would
+    otherwise swallow the rest of the document) or if too many end tags
+    match no open element.
+    """
+    
+    # Stray end tags tolerated before giving up: at least this many...
+    MIN_STRAY_TAGS = 5
+    # ...or this share of all tags
+    MAX_STRAY_SHARE = 0.1
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._pieces = []
+        self._skipping = []
+        self._open = {}
+        self._tags = 0
+        self._stray = 0
+    
+    def convert(self, html):
+        """Get the text of an HTML document, or None if it looks malformed"""
+        self.feed(html)
+        self.close()
+        
+        if self._skipping or self._stray > max(self.MIN_STRAY_TAGS, self._tags * self.MAX_STRAY_SHARE):
+            return None
+        
+        text = ''.join(self._pieces)
+        text = re.sub(r'[ \t\r\f\v]*\n\s*\n\s*', '\n\n', text)
+        text = re.sub(r'[ \t\r\f\v]*\n[ \t\r\f\v]*', '\n', text)
+        return text.strip()
+    
+    def handle_starttag(self, tag, attrs):
+        self._tags += 1
+        
+        if tag == 'body':
+            # A head that was never closed ends where the body starts
+            self._skipping = [name for name in self._skipping if name not in ('head', 'title')]
+        
+        if tag in SKIP_TAGS:
+            self._skipping.append(tag)
+        elif tag not in VOID_TAGS:
+            self._open[tag] = self._open.get(tag, 0) + 1
+        
+        if tag in BLOCK_TAGS:
+            self._pieces.append('\n')
+        elif tag in CELL_TAGS:
+            self._pieces.append('\t')
+    
+    def handle_startendtag(self, tag, attrs):
+        self._tags += 1
+        if tag in BLOCK_TAGS:
+            self._pieces.append('\n')
+    
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if tag in self._skipping:
+                while self._skipping.pop() != tag:
+                    pass
+            return
+        
+        if tag in VOID_TAGS:
+            return
+        
+        if self._open.get(tag):
+            self._open[tag] -= 1
+        else:
+            self._stray += 1
+        
+        if tag in BLOCK_TAGS:
+            self._pieces.append('\n')
+    
+    def handle_data(self, data):
+        if not self._skipping:
+            self._pieces.append(data)
+
+def html_to_text(html):
+    """Convert HTML to text with HtmlTextConverter; None means the input needs a tolerant parser"""
+    return HtmlTextConverter().convert(html)
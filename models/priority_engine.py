@@ -9,13 +9,18 @@ class PriorityEngine:
     """Engine to determine email priority based on various factors"""
     
     def __init__(self, email_config):
-        self.config = email_config
-        self.important_contacts = self.config.get("important_contacts", [])
-        self.vip_contacts = self.config.get("vip_contacts", [])
         self.urgency_keywords = [
             "urgent", "asap", "immediately", "deadline", "important",
             "critical", "emergency", "priority", "attention", "needed"
         ]
+        self.update_config(email_config)
+    
+    def update_config(self, email_config):
+        """Rebuild the contact lookups from the email configuration"""
+        self.config = email_config
+        # Sets of lowercase addresses, matching _extract_email_address
+        self.important_contacts = {c.strip().lower() for c in self.config.get("important_contacts", [])}
+        self.vip_contacts = {c.strip().lower() for c in self.config.get("vip_contacts", [])}
         
     def prioritize_email(self, email_data):
         """Calculate priority score for an email (0-100)"""
@@ -4,19 +4,31 @@ import json
 import datetime
 import re
 
+from models.email_processor import EmailProcessor
+
 logger = logging.getLogger(__name__)
 
 class ResponseGenerator:
     """Generates email responses using AI"""
     
-    def __init__(self, ollama_service, user_config, ollama_config):
+    def __init__(self, ollama_service, user_config, ollama_config, email_processor=None):
         self.ollama_service = ollama_service
         self.ai_service = ollama_service
+        # Splits off quoted history and signatures so only the new text is sent
+        self.email_processor = email_processor or EmailProcessor()
+        self.update_user_config(user_config)
+        self.update_ollama_config(ollama_config)
+    
+    def update_user_config(self, user_config):
+        """Apply changed user settings"""
         self.user_config = user_config
-        self.ollama_config = ollama_config
         self.user_name = user_config.get('name', 'User')
         self.user_role = user_config.get('role', 'Professional')
         self.communication_style = user_config.get('communication_style', 'professional')
+    
+    def update_ollama_config(self, ollama_config):
+        """Apply changed Ollama settings"""
+        self.ollama_config = ollama_config
         
         # Load style samples if available
         self.style_samples = ollama_config.get('style_samples', [])
@@ -63,7 +75,8 @@ class ResponseGenerator:
             }
     
     def _build_prompt(self, email_data, email_history=None):
-        """Build a simplified prompt for Ollama"""
+        """Build a simplified prompt for Ollama from the new content of the email"""
+        content = self.email_processor.new_content(email_data.get('body', ''))
         prompt = f"""
         Write a reply to this email thread, i need response on top of last email:
 
@@ -71,7 +84,7 @@ class ResponseGenerator:
         SUBJECT: {email_data.get('subject', '')}
 
         EMAIL CONTENT:
-        {" ".join(email_data.get('body', '').splitlines())}
+        {" ".join(content.splitlines())}
 
         Keep the reply short and professional.
         """
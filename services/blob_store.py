@@ -0,0 +1,92 @@
+# services/blob_store.py
+import re
+import zlib
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BlobStore:
+    """Content-addressed, compressed and reference-counted storage for email bodies
+    
+    A body is split into segments at the headers Outlook and most mail clients
+    put above quoted earlier messages, so the quoted history that long threads
+    repeat in every reply is stored only once. Each segment is kept in the
+    blobs table under the SHA-256 of its text, zlib-compressed, with a count
+    of the keys that reference it. A key is the comma separated list of the
+    segment hashes of a body; the empty key stands for an empty body.
+    
+    All methods take a cursor so they run inside the caller's transaction.
+    """
+    
+    # Lines that start a quoted earlier message
+    QUOTE_BOUNDARY = re.compile(
+        r'^(?:-{2,}\s*Original Message\s*-{2,}|From:[^\r\n]*\r?\n(?:Sent|Date):|On [^\r\n]+ wrote:\s*$)',
+        re.IGNORECASE | re.MULTILINE
+    )
+    
+    # Bound parameters per IN (...) query
+    CHUNK_SIZE = 500
+    
+    def segments(self, text):
+        """Split a body into its own text and the quoted messages below it"""
+        starts = [match.start() for match in self.QUOTE_BOUNDARY.finditer(text) if match.start() > 0]
+        bounds = [0] + starts + [len(text)]
+        return [text[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+    
+    def put(self, cursor, text):
+        """Store a body, taking a reference on each of its segments, and return its key"""
+        if not text:
+            return ''
+        
+        hashes = []
+        for segment in self.segments(text):
+            data = segment.encode('utf-8', errors='replace')
+            digest = hashlib.sha256(data).hexdigest()
+            cursor.execute('''
+            INSERT INTO blobs (hash, data, size, refcount) VALUES (?, ?, ?, 1)
+            ON CONFLICT(hash) DO UPDATE SET refcount = refcount + 1
+            ''', (digest, zlib.compress(data, 6), len(data)))
+            hashes.append(digest)
+        
+        return ','.join(hashes)
+    
+    def release(self, cursor, key):
+        """Drop the references a key holds; unreferenced segments are removed by collect_garbage"""
+        if not key:
+            return
+        cursor.executemany(
+            'UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?',
+            [(digest,) for digest in key.split(',')]
+        )
+    
+    def get(self, cursor, key):
+        """Get the body stored under a key"""
+        return self.get_many(cursor, [key]).get(key, '')
+    
+    def get_many(self, cursor, keys):
+        """Get the bodies stored under several keys as a dict keyed by key"""
+        keys = [key for key in set(keys) if key]
+        digests = list({digest for key in keys for digest in key.split(',')})
+        
+        segments = {}
+        for start in range(0, len(digests), self.CHUNK_SIZE):
+            chunk = digests[start:start + self.CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT hash, data FROM blobs WHERE hash IN ({placeholders})', chunk)
+            for digest, data in cursor.fetchall():
+                segments[digest] = zlib.decompress(data).decode('utf-8', errors='replace')
+        
+        bodies = {'': ''}
+        for key in keys:
+            missing = [digest for digest in key.split(',') if digest not in segments]
+            if missing:
+                logger.error(f"Missing {len(missing)} body segment(s) for blob key")
+            bodies[key] = ''.join(segments.get(digest, '') for digest in key.split(','))
+        
+        return bodies
+    
+    def collect_garbage(self, cursor):
+        """Delete segments no key references any more and return how many went"""
+        cursor.execute('DELETE FROM blobs WHERE refcount <= 0')
+        return cursor.rowcount
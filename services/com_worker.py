@@ -0,0 +1,118 @@
+# services/com_worker.py
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+
+# pywin32 only exists on Windows
+try:
+    import pythoncom
+except ImportError:
+    pythoncom = None
+
+logger = logging.getLogger(__name__)
+
+class ComWorker:
+    """Runs jobs on one long-lived single-threaded apartment (STA) thread
+    
+    COM objects may only be used from the apartment that created them, so
+    everything touching Outlook is submitted here instead of initializing
+    COM on whichever thread happens to call. COM is initialized once when
+    the thread starts and uninitialized when it stops. Every job gets a
+    Future; a job submitted with the key of a job that is still waiting in
+    the queue is not queued again but shares that job's Future. While idle
+    the thread pumps window messages, which is how COM delivers events.
+    """
+    
+    # Seconds between message pumps while idle, so event sinks get called
+    PUMP_INTERVAL = 0.1
+    
+    def __init__(self, name="outlook-com"):
+        self._queue = queue.Queue()
+        self._pending = {}        # coalescing key -> Future of the queued job
+        self._lock = threading.Lock()
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    def submit(self, func, *args, key=None, **kwargs):
+        """Queue func(*args, **kwargs) and return a Future of its result"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("COM worker is stopped")
+            
+            if key is not None and key in self._pending:
+                return self._pending[key]
+            
+            future = Future()
+            if key is not None:
+                self._pending[key] = future
+            self._queue.put((func, args, kwargs, key, future))
+            return future
+    
+    def call(self, func, *args, key=None, **kwargs):
+        """Run func on the worker and wait for its result
+        
+        Called from the worker thread itself (a job calling another
+        service method) the function runs directly instead of deadlocking.
+        """
+        if self.in_worker():
+            return func(*args, **kwargs)
+        return self.submit(func, *args, key=key, **kwargs).result()
+    
+    def in_worker(self):
+        """Check whether the current thread is the worker thread"""
+        return threading.current_thread() is self._thread
+    
+    def stop(self, timeout=10):
+        """Finish the queued jobs and stop the thread"""
+        with self._lock:
+            if self._closed:
+                return True
+            self._closed = True
+            self._queue.put(None)
+        
+        if not self.in_worker():
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
+    
+    def _next_job(self):
+        """Wait for the next job, dispatching COM events (such as ItemAdd) meanwhile"""
+        if pythoncom is None:
+            return self._queue.get()
+        
+        while True:
+            try:
+                return self._queue.get(timeout=self.PUMP_INTERVAL)
+            except queue.Empty:
+                pythoncom.PumpWaitingMessages()
+    
+    def _run(self):
+        """Worker thread main loop"""
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        
+        try:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    break
+                
+                func, args, kwargs, key, future = job
+                with self._lock:
+                    # Later submissions with this key queue a fresh job
+                    if key is not None and self._pending.get(key) is future:
+                        del self._pending[key]
+                
+                if not future.set_running_or_notify_cancel():
+                    continue
+                
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as e:
+                    logger.error(f"Error in COM job {getattr(func, '__name__', func)}: {str(e)}")
+                    future.set_exception(e)
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
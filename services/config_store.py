@@ -0,0 +1,122 @@
+# services/config_store.py
+import os
+import json
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+class ConfigStore:
+    """In-memory copy of settings.json that is only re-read when the file changes
+    
+    The file is re-parsed only when its mtime, inode or size differ from the
+    last read, so load() is a single stat() on the hot path. Saves write a
+    temporary file next to settings.json and rename it over the original, so
+    a crash mid-write never leaves a truncated config behind. Subscribers
+    register for a top-level section ("user", "email", ...) and are called
+    with the new section only when its contents actually changed.
+    """
+    
+    def __init__(self, config_file):
+        self.config_file = Path(config_file)
+        self._config = None
+        self._file_key = None
+        self._sections = {}       # section name -> serialized contents, for change detection
+        self._subscribers = {}    # section name -> list of callbacks
+        self._lock = threading.RLock()
+    
+    def exists(self):
+        """Check if the configuration file exists"""
+        return self.config_file.exists()
+    
+    def _stat_key(self):
+        """Identify the current version of the file on disk"""
+        stat = os.stat(self.config_file)
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+    
+    def load(self):
+        """Get the configuration, re-reading the file only if it changed"""
+        with self._lock:
+            file_key = self._stat_key()
+            if self._config is not None and file_key == self._file_key:
+                return self._config
+            
+            with open(self.config_file, 'r') as f:
+                config = json.load(f)
+            
+            self._file_key = file_key
+            self._apply(config)
+            return self._config
+    
+    def reload_if_changed(self):
+        """Pick up edits made to the file by other programs; returns True if it was re-read"""
+        try:
+            with self._lock:
+                if self._config is not None and self._stat_key() == self._file_key:
+                    return False
+                self.load()
+                return True
+        except Exception as e:
+            logger.error(f"Error reloading configuration: {str(e)}")
+            return False
+    
+    def save(self, config):
+        """Atomically replace the configuration file and notify subscribers of changed sections"""
+        with self._lock:
+            self.config_file.parent.mkdir(parents=True, exist_ok=True)
+            
+            fd, temp_path = tempfile.mkstemp(
+                dir=self.config_file.parent, prefix='.settings-', suffix='.tmp'
+            )
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(config, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.config_file)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            
+            self._file_key = self._stat_key()
+            self._apply(config)
+    
+    def subscribe(self, section, callback):
+        """Register callback(section_config), called when the section changes"""
+        with self._lock:
+            self._subscribers.setdefault(section, []).append(callback)
+    
+    def unsubscribe(self, section, callback):
+        """Unregister a section subscriber"""
+        with self._lock:
+            callbacks = self._subscribers.get(section, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+    
+    def _apply(self, config):
+        """Make config current and notify subscribers of the sections that differ"""
+        sections = {
+            name: json.dumps(value, sort_keys=True, default=str)
+            for name, value in config.items()
+        }
+        
+        # Nothing to compare against on the first load
+        changed = []
+        if self._config is not None:
+            changed = [
+                name for name in set(sections) | set(self._sections)
+                if sections.get(name) != self._sections.get(name)
+            ]
+        
+        self._config = config
+        self._sections = sections
+        
+        for name in changed:
+            for callback in list(self._subscribers.get(name, [])):
+                try:
+                    callback(config.get(name, {}))
+                except Exception as e:
+                    logger.error(f"Error in config subscriber for '{name}': {str(e)}")
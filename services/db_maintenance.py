@@ -0,0 +1,264 @@
+# services/db_maintenance.py
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+class DatabaseMaintenance:
+    """Scheduled ANALYZE/VACUUM/optimize runs and size reports for the local database"""
+    
+    ANALYZE_INTERVAL = 7 * 24 * 3600   # seconds between ANALYZE runs
+    VACUUM_INTERVAL = 30 * 24 * 3600   # minimum seconds between full VACUUMs
+    VACUUM_THRESHOLD = 0.25            # fraction of free pages that makes a VACUUM worthwhile
+    
+    def __init__(self, db_file):
+        self.db_file = Path(db_file)
+    
+    def _connect(self):
+        """Open a connection that waits on locks instead of failing"""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+    
+    def _get_meta(self, conn, key):
+        """Read a value from storage_meta, if the table exists"""
+        try:
+            row = conn.execute('SELECT value FROM storage_meta WHERE key = ?', (key,)).fetchone()
+            return row[0] if row else None
+        except sqlite3.OperationalError:
+            return None
+    
+    def _set_meta(self, conn, key, value):
+        """Write a value to storage_meta"""
+        conn.execute('''
+        INSERT INTO storage_meta (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (key, str(value)))
+        conn.commit()
+    
+    def report(self):
+        """Collect size and fragmentation figures for the database"""
+        conn = self._connect()
+        
+        try:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            
+            tables = {}
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            ).fetchall():
+                tables[name] = {'rows': conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]}
+            
+            # Per-table sizes need the dbstat virtual table, which not every build has
+            try:
+                for name, size in conn.execute(
+                    'SELECT name, SUM(pgsize) FROM dbstat GROUP BY name'
+                ).fetchall():
+                    if name in tables:
+                        tables[name]['bytes'] = size
+            except sqlite3.OperationalError:
+                pass
+            
+            wal_file = Path(str(self.db_file) + '-wal')
+            
+            return {
+                'path': str(self.db_file),
+                'file_size': os.path.getsize(self.db_file),
+                'wal_size': os.path.getsize(wal_file) if wal_file.exists() else 0,
+                'page_size': page_size,
+                'page_count': page_count,
+                'freelist_count': freelist_count,
+                'fragmentation': freelist_count / page_count if page_count else 0.0,
+                'schema_version': conn.execute('PRAGMA user_version').fetchone()[0],
+                'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0],
+                'auto_vacuum': conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+                'last_analyze': self._get_meta(conn, 'last_analyze'),
+                'last_vacuum': self._get_meta(conn, 'last_vacuum'),
+                'tables': tables
+            }
+        
+        finally:
+            conn.close()
+    
+    def optimize(self):
+        """Run PRAGMA optimize, which is cheap and only analyzes what needs it"""
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA optimize')
+            return True
+        except Exception as e:
+            logger.error(f"Error optimizing database: {str(e)}")
+            return False
+        finally:
+            conn.close()
+    
+    def analyze(self):
+        """Refresh query planner statistics"""
+        conn = self._connect()
+        try:
+            conn.execute('ANALYZE')
+            self._set_meta(conn, 'last_analyze', int(time.time()))
+            return True
+        except Exception as e:
+            logger.error(f"Error analyzing database: {str(e)}")
+            return False
+        finally:
+            conn.close()
+    
+    def vacuum(self):
+        """Rebuild the database file, switching it to incremental auto-vacuum"""
+        conn = self._connect()
+        try:
+            # Only takes effect on existing databases through the VACUUM below
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            self._set_meta(conn, 'last_vacuum', int(time.time()))
+            return True
+        except Exception as e:
+            logger.error(f"Error vacuuming database: {str(e)}")
+            return False
+        finally:
+            conn.close()
+    
+    def run_scheduled(self, now=None):
+        """Run whichever of ANALYZE and optimize is due; returns the names of those run
+        
+        VACUUM locks out every other connection for as long as it rewrites
+        the file, longer than the UI waits on a lock, so it is left to
+        vacuum_if_due once the app is closing.
+        """
+        now = now or time.time()
+        performed = []
+        
+        try:
+            conn = self._connect()
+            try:
+                last_analyze = int(self._get_meta(conn, 'last_analyze') or 0)
+            finally:
+                conn.close()
+            
+            if now - last_analyze >= self.ANALYZE_INTERVAL and self.analyze():
+                performed.append('analyze')
+            elif self.optimize():
+                performed.append('optimize')
+            
+            if performed:
+                logger.info(f"Database maintenance ran: {', '.join(performed)}")
+        
+        except Exception as e:
+            logger.error(f"Error running database maintenance: {str(e)}")
+        
+        return performed
+    
+    def vacuum_if_due(self, now=None):
+        """VACUUM if the last one is old enough and enough pages are free"""
+        now = now or time.time()
+        
+        try:
+            conn = self._connect()
+            try:
+                last_vacuum = int(self._get_meta(conn, 'last_vacuum') or 0)
+            finally:
+                conn.close()
+            
+            if now - last_vacuum < self.VACUUM_INTERVAL:
+                return False
+            if self.report()['fragmentation'] < self.VACUUM_THRESHOLD:
+                return False
+            
+            if self.vacuum():
+                logger.info("Database maintenance ran: vacuum")
+                return True
+            return False
+        
+        except Exception as e:
+            logger.error(f"Error running database maintenance: {str(e)}")
+            return False
+
+def _format_size(size):
+    """Format a byte count for humans"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
+def main(argv=None):
+    """Command line entry point: python -m services.db_maintenance <command>"""
+    from services.migrations import MigrationRunner
+    from services.retention import RetentionManager
+    
+    parser = argparse.ArgumentParser(description="Inspect and maintain the Email Agent database")
+    parser.add_argument(
+        '--db',
+        default=str(Path.home() / ".email_agent_ollama" / "email_data.db"),
+        help="Path to email_data.db"
+    )
+    parser.add_argument(
+        'command',
+        choices=['report', 'migrate', 'optimize', 'analyze', 'vacuum', 'archive'],
+        nargs='?',
+        default='report'
+    )
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+    
+    if not Path(args.db).exists():
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+    
+    maintenance = DatabaseMaintenance(args.db)
+    
+    if args.command == 'migrate':
+        runner = MigrationRunner(args.db)
+        version = runner.migrate()
+        runner.run_background_steps()
+        print(f"Schema version: {version}")
+        return 0
+    elif args.command == 'optimize':
+        return 0 if maintenance.optimize() else 1
+    elif args.command == 'analyze':
+        return 0 if maintenance.analyze() else 1
+    elif args.command == 'archive':
+        results = RetentionManager(args.db).run()
+        if results is None:
+            return 1
+        for action, count in results.items():
+            print(f"{action.replace('_', ' ').capitalize()}: {count}")
+        return 0
+    elif args.command == 'vacuum':
+        before = maintenance.report()['file_size']
+        if not maintenance.vacuum():
+            return 1
+        after = maintenance.report()['file_size']
+        print(f"Vacuumed: {_format_size(before)} -> {_format_size(after)}")
+        return 0
+    
+    report = maintenance.report()
+    
+    if args.json:
+        print(json.dumps(report, indent=4))
+        return 0
+    
+    print(f"Database:       {report['path']}")
+    print(f"File size:      {_format_size(report['file_size'])} (WAL {_format_size(report['wal_size'])})")
+    print(f"Pages:          {report['page_count']} x {report['page_size']} bytes")
+    print(f"Free pages:     {report['freelist_count']} ({report['fragmentation']:.1%} fragmentation)")
+    print(f"Schema version: {report['schema_version']}")
+    print(f"Journal mode:   {report['journal_mode']}, auto_vacuum {report['auto_vacuum']}")
+    print("Tables:")
+    for name, info in report['tables'].items():
+        size = f", {_format_size(info['bytes'])}" if 'bytes' in info else ''
+        print(f"  {name:<20} {info['rows']} rows{size}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+# services/fake_outlook.py
+import re
+import logging
+import itertools
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Default folder ids used by OutlookService (OlDefaultFolders)
+FOLDER_SENT = 5
+FOLDER_INBOX = 6
+FOLDER_DRAFTS = 16
+
+# Schema names of table columns that are not item properties
+TABLE_PROPERTIES = {
+    "http://schemas.microsoft.com/mapi/proptag/0x0E1B000B": lambda item: item.Attachments.Count > 0  # PR_HASATTACH
+}
+
+class FakePropertyAccessor:
+    """PropertyAccessor reading MAPI properties from a dict of schema name -> value"""
+    
+    def __init__(self, properties):
+        self._properties = properties
+    
+    def GetProperty(self, name):
+        if name not in self._properties:
+            raise KeyError(f"Property not found: {name}")
+        return self._properties[name]
+
+class FakeAttachment:
+    """Attachment of a fake mail item holding its content in memory"""
+    
+    def __init__(self, name, content_type, data):
+        self.FileName = name
+        self.Size = len(data)
+        self.PropertyAccessor = FakePropertyAccessor({
+            "http://schemas.microsoft.com/mapi/proptag/0x370E001F": content_type  # PR_ATTACH_MIME_TAG
+        })
+        self._data = data
+    
+    def SaveAsFile(self, path):
+        with open(path, 'wb') as f:
+            f.write(self._data)
+
+class FakeAttachments:
+    """Attachments collection of a fake mail item
+    
+    Takes (name, content type, bytes) tuples, or a count of empty
+    placeholder attachments.
+    """
+    
+    def __init__(self, attachments=0):
+        if isinstance(attachments, int):
+            attachments = [(f"attachment{i + 1}.bin", "application/octet-stream", b'') for i in range(attachments)]
+        self._attachments = [FakeAttachment(*attachment) for attachment in attachments]
+    
+    @property
+    def Count(self):
+        return len(self._attachments)
+    
+    def Item(self, index):
+        # COM collections are 1-based
+        return self._attachments[index - 1]
+
+class FakeMailItem:
+    """In-memory stand-in for an Outlook MailItem"""
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, application, **fields):
+        self._application = application
+        self._folder = None
+        self.EntryID = fields.get('EntryID') or f"FAKE{next(self._ids):012d}"
+        self.Subject = fields.get('Subject', '')
+        self.SenderName = fields.get('SenderName', '')
+        self.SenderEmailAddress = fields.get('SenderEmailAddress', '')
+        self.To = fields.get('To', '')
+        self.Body = fields.get('Body', '')
+        self.UnRead = fields.get('UnRead', True)
+        self.ConversationID = fields.get('ConversationID') or self.EntryID
+        self.ReceivedTime = fields.get('ReceivedTime') or datetime.now()
+        self.SentOn = fields.get('SentOn') or self.ReceivedTime
+        self.LastModificationTime = fields.get('LastModificationTime') or self.ReceivedTime
+        self.Attachments = FakeAttachments(fields.get('attachments') or fields.get('attachment_count', 0))
+    
+    def __getattr__(self, name):
+        # COM property names are case-insensitive ("[Unread]" in restrictions)
+        for attribute in vars(self):
+            if attribute.lower() == name.lower():
+                return getattr(self, attribute)
+        raise AttributeError(name)
+    
+    @property
+    def Parent(self):
+        return self._folder
+    
+    def Save(self):
+        """Persist changes; unsaved new items go to Drafts like in Outlook"""
+        self.LastModificationTime = datetime.now().replace(microsecond=0)
+        if self._folder is None:
+            self._application.namespace.GetDefaultFolder(FOLDER_DRAFTS)._add(self)
+    
+    def Move(self, folder):
+        """Move the item to another folder and return it"""
+        if self._folder is not None:
+            self._folder._remove(self)
+        folder._add(self)
+        return self
+    
+    def Send(self):
+        """'Send' the item by filing it in Sent Items"""
+        self.SentOn = datetime.now().replace(microsecond=0)
+        self.ReceivedTime = self.SentOn
+        self.UnRead = False
+        self.Move(self._application.namespace.GetDefaultFolder(FOLDER_SENT))
+
+class FakeItems:
+    """Items collection supporting the Restrict/Sort/Item calls OutlookService makes"""
+    
+    _RESTRICTION = re.compile(r"\[(\w+)\]\s*(>=|<=|=|>|<)\s*'?([^']*)'?$")
+    
+    def __init__(self, items):
+        self._items = list(items)
+    
+    @property
+    def Count(self):
+        return len(self._items)
+    
+    def Item(self, index):
+        """1-based item access like COM collections"""
+        return self._items[index - 1]
+    
+    def __iter__(self):
+        return iter(list(self._items))
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def Sort(self, field, descending=False):
+        """Sort in place by a bracketed property name"""
+        name = field.strip('[]')
+        self._items.sort(key=lambda item: getattr(item, name), reverse=bool(descending))
+    
+    def Restrict(self, criteria):
+        """Filter with a single '[Property] op value' comparison"""
+        match = self._RESTRICTION.match(criteria.strip())
+        if not match:
+            raise ValueError(f"Unsupported restriction: {criteria}")
+        
+        name, op, raw = match.groups()
+        value = self._parse_value(raw)
+        
+        compare = {
+            '=': lambda a, b: a == b,
+            '>': lambda a, b: a > b,
+            '<': lambda a, b: a < b,
+            '>=': lambda a, b: a >= b,
+            '<=': lambda a, b: a <= b
+        }[op]
+        
+        return FakeItems(item for item in self._items if compare(getattr(item, name), value))
+    
+    def _parse_value(self, raw):
+        """Interpret a restriction value the way Outlook would"""
+        if raw.lower() in ('true', 'false'):
+            return raw.lower() == 'true'
+        for fmt in ("%m/%d/%Y %H:%M %p", "%m/%d/%Y %I:%M %p", "%m/%d/%Y"):
+            try:
+                return datetime.strptime(raw, fmt)
+            except ValueError:
+                continue
+        return raw
+
+class FakeColumns:
+    """Column set of a fake table"""
+    
+    def __init__(self, names):
+        self._names = list(names)
+    
+    def RemoveAll(self):
+        self._names = []
+    
+    def Add(self, name):
+        self._names.append(name)
+
+class FakeTable:
+    """Read-only rows of selected columns, like the Table returned by Folder.GetTable"""
+    
+    DEFAULT_COLUMNS = ['EntryID', 'Subject', 'CreationTime', 'LastModificationTime', 'MessageClass']
+    
+    def __init__(self, items):
+        self._items = items
+        self._position = 0
+        self.Columns = FakeColumns(self.DEFAULT_COLUMNS)
+    
+    @property
+    def EndOfTable(self):
+        return self._position >= len(self._items)
+    
+    def Sort(self, field, descending=False):
+        """Sort the rows by a bracketed property name"""
+        self._items.Sort(field, descending)
+    
+    def GetArray(self, max_rows):
+        """Return up to max_rows rows from the current position as a tuple of tuples"""
+        items = self._items._items[self._position:self._position + max_rows]
+        self._position += len(items)
+        return tuple(tuple(self._value(item, name) for name in self.Columns._names) for item in items)
+    
+    def _value(self, item, name):
+        if name in TABLE_PROPERTIES:
+            return TABLE_PROPERTIES[name](item)
+        return getattr(item, name)
+
+class FakeFolders:
+    """Subfolder collection of a fake folder"""
+    
+    def __init__(self, application):
+        self._application = application
+        self._folders = []
+    
+    @property
+    def Count(self):
+        return len(self._folders)
+    
+    def Item(self, index):
+        """Get a subfolder by 1-based index or by name"""
+        if isinstance(index, str):
+            for folder in self._folders:
+                if folder.Name == index:
+                    return folder
+            raise KeyError(index)
+        return self._folders[index - 1]
+    
+    def Add(self, name):
+        """Create a subfolder"""
+        folder = FakeFolder(self._application, name)
+        self._folders.append(folder)
+        return folder
+    
+    def __iter__(self):
+        return iter(list(self._folders))
+
+class FakeFolder:
+    """In-memory stand-in for an Outlook MAPIFolder"""
+    
+    def __init__(self, application, name):
+        self._application = application
+        self.Name = name
+        self.StoreID = "FAKESTORE"
+        self._items = []
+        self.Folders = FakeFolders(application)
+    
+    @property
+    def Items(self):
+        return FakeItems(self._items)
+    
+    def GetTable(self, criteria=None, table_contents=0):
+        """Get a table of the items matching an optional restriction"""
+        items = FakeItems(self._items)
+        return FakeTable(items.Restrict(criteria) if criteria else items)
+    
+    def _add(self, item):
+        item._folder = self
+        self._items.append(item)
+        self._application._index[item.EntryID] = item
+    
+    def _remove(self, item):
+        self._items.remove(item)
+        item._folder = None
+
+class FakeAccounts:
+    """Accounts collection with a single account"""
+    Count = 1
+
+class FakeSession:
+    """Session object exposing the configured accounts"""
+    
+    def __init__(self):
+        self.Accounts = FakeAccounts()
+
+class FakeNamespace:
+    """In-memory stand-in for the MAPI namespace"""
+    
+    def __init__(self, application):
+        self._application = application
+        self.Folders = FakeFolders(application)
+        store = self.Folders.Add("Mailbox")
+        self._default_folders = {
+            FOLDER_INBOX: store.Folders.Add("Inbox"),
+            FOLDER_SENT: store.Folders.Add("Sent Items"),
+            FOLDER_DRAFTS: store.Folders.Add("Drafts")
+        }
+    
+    def GetDefaultFolder(self, folder_id):
+        return self._default_folders[folder_id]
+    
+    def GetItemFromID(self, entry_id, store_id=None):
+        item = self._application._index.get(entry_id)
+        if item is None or item._folder is None:
+            raise KeyError(f"Item not found: {entry_id}")
+        return item
+
+class FakeOutlookApplication:
+    """COM-shaped in-memory Outlook used to run OutlookService without Windows
+    
+    Pass it as OutlookService(config, application=...). Messages are added
+    with add_message or loaded from a Maildir or mbox with load_mailbox.
+    """
+    
+    def __init__(self):
+        self._index = {}
+        self.Session = FakeSession()
+        self.namespace = FakeNamespace(self)
+    
+    def GetNamespace(self, name):
+        return self.namespace
+    
+    def CreateItem(self, item_type):
+        """Create an unsaved mail item"""
+        return FakeMailItem(self, UnRead=False)
+    
+    def add_message(self, folder_id=FOLDER_INBOX, **fields):
+        """Add a mail item with the given COM property values to a default folder"""
+        item = FakeMailItem(self, **fields)
+        self.namespace.GetDefaultFolder(folder_id)._add(item)
+        return item
+    
+    def add_email(self, email_data, folder_id=FOLDER_INBOX):
+        """Add a mail item built from an email dict in the shape MailSource returns"""
+        sender = email_data.get('from', '')
+        match = re.match(r'\s*(.*?)\s*<([^>]*)>', sender)
+        sender_name, sender_address = match.groups() if match else (sender, sender)
+        
+        try:
+            received = datetime.strptime(email_data.get('date', ''), "%a, %d %b %Y %H:%M:%S")
+        except ValueError:
+            received = datetime.now().replace(microsecond=0)
+        
+        return self.add_message(
+            folder_id,
+            Subject=email_data.get('subject', ''),
+            SenderName=sender_name,
+            SenderEmailAddress=sender_address,
+            To=email_data.get('to', ''),
+            Body=email_data.get('body', ''),
+            UnRead=email_data.get('unread', True),
+            ConversationID=email_data.get('conversation_id'),
+            ReceivedTime=received,
+            attachment_count=1 if email_data.get('has_attachments') else 0
+        )
+    
+    def load_mailbox(self, path, email_processor=None):
+        """Fill the inbox from a Maildir directory or an mbox file; returns the message count"""
+        from pathlib import Path
+        from services.local_mail_source import MaildirSource, MboxSource
+        
+        path = Path(path).expanduser()
+        source = MaildirSource(path, email_processor) if path.is_dir() else MboxSource(path, email_processor)
+        if not source.initialize():
+            return 0
+        
+        count = 0
+        for key in source.mailbox.iterkeys():
+            try:
+                self.add_email(source._build_email(None, source.mailbox, key))
+                count += 1
+            except Exception as e:
+                logger.error(f"Error loading message {key}: {str(e)}")
+        
+        logger.info(f"Loaded {count} messages into the fake Outlook inbox")
+        return count
@@ -0,0 +1,765 @@
+# services/local_mail_source.py
+import os
+import hashlib
+import logging
+import mailbox
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid, parsedate_to_datetime
+from pathlib import Path
+
+from models.email_processor import EmailProcessor
+from models.email_record import EmailRecord
+from services.mail_source import MailSource, format_date, spool_path
+
+logger = logging.getLogger(__name__)
+
+class LocalMailSource(MailSource):
+    """Mail source backed by a local mailbox, parsed with EmailProcessor
+    
+    The inbox is the mailbox at path. Archived, sent and draft messages go
+    to sibling mailboxes (see _open_folder). Sending only files the message
+    in the sent mailbox, which is enough to drive the pipeline end to end.
+    Header summaries are cached per message and email bodies are only
+    parsed when first read, so listing costs about one header read per
+    message.
+    """
+    
+    ARCHIVE_FOLDER = "Archive"
+    SENT_FOLDER = "Sent"
+    DRAFTS_FOLDER = "Drafts"
+    
+    # Prefix of the ids of messages in the drafts mailbox
+    DRAFT_PREFIX = "draft:"
+    
+    # Keys are only unique within one mailbox, so ids outside the inbox carry their folder
+    FOLDER_PREFIXES = {
+        SENT_FOLDER: "sent:",
+        ARCHIVE_FOLDER: "archive:",
+        DRAFTS_FOLDER: DRAFT_PREFIX
+    }
+    
+    def __init__(self, path, email_processor=None):
+        self.path = Path(path).expanduser() if path else None
+        self.email_processor = email_processor or EmailProcessor()
+        self.mailbox = None
+        self._folders = {}
+        self._summaries = {}  # (folder, key) -> header summary
+        self._initialized = False
+        self._lock = threading.RLock()
+    
+    def _open(self, path):
+        """Open the inbox mailbox"""
+        raise NotImplementedError
+    
+    def _open_folder(self, name):
+        """Open (creating if needed) the mailbox of a secondary folder"""
+        raise NotImplementedError
+    
+    def _stable_id(self, folder, box, key):
+        """Get the part of a message's id that identifies it within its mailbox"""
+        return str(key)
+    
+    def _to_key(self, folder, box, email_id):
+        """Convert the mailbox part of an email id back into a mailbox key"""
+        return email_id
+    
+    def _flush(self, box):
+        """Write pending changes of a mailbox to disk"""
+        box.flush()
+    
+    def _is_unread(self, box, key, headers):
+        """Check the read flag of a message"""
+        raise NotImplementedError
+    
+    def _read_unread(self, box, key):
+        """Read the read flag of a message from the mailbox itself"""
+        return self._is_unread(box, key, self._read_headers(box, key))
+    
+    def _modified(self, folder, box, key, summary):
+        """Get the modification stamp of a message"""
+        return summary['received'].strftime("%Y-%m-%d %H:%M:%S")
+    
+    def _mark_read(self, box, key):
+        """Set the read flag of a message"""
+        raise NotImplementedError
+    
+    def initialize(self):
+        """Open the mailbox"""
+        try:
+            if not self.path:
+                logger.error("No mailbox path configured")
+                return False
+            
+            with self._lock:
+                self.mailbox = self._open(self.path)
+                self._initialized = True
+            
+            logger.info(f"Opened local mailbox {self.path} with {len(self.mailbox)} messages")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error opening mailbox {self.path}: {str(e)}")
+            return False
+    
+    def _ensure_connection(self):
+        """Open the mailbox if it is not open yet"""
+        if not self._initialized:
+            return self.initialize()
+        return True
+    
+    def is_connected(self):
+        """Check whether the mailbox is open"""
+        return self._initialized
+    
+    def _folder(self, name):
+        """Get a secondary folder mailbox, opening it once"""
+        if name not in self._folders:
+            self._folders[name] = self._open_folder(name)
+        return self._folders[name]
+    
+    def _box(self, folder=None):
+        """Get the mailbox of a folder; None is the inbox"""
+        return self.mailbox if folder is None else self._folder(folder)
+    
+    def _email_id(self, folder, box, key):
+        """Get the id of a message, prefixed with its folder outside the inbox"""
+        return f"{self.FOLDER_PREFIXES.get(folder, '')}{self._stable_id(folder, box, key)}"
+    
+    def _locate(self, email_id):
+        """Get the (folder, mailbox, key) of an id, or None if no message has it"""
+        folder = None
+        for name, prefix in self.FOLDER_PREFIXES.items():
+            if email_id.startswith(prefix):
+                folder, email_id = name, email_id[len(prefix):]
+                break
+        
+        box = self._box(folder)
+        try:
+            key = self._to_key(folder, box, email_id)
+        except (KeyError, ValueError):
+            return None
+        return (folder, box, key) if key in box else None
+    
+    def _read_headers(self, box, key):
+        """Parse only the header block of a message"""
+        with box.get_file(key) as f:
+            return self.email_processor.read_headers(f)
+    
+    def _conversation_id(self, headers):
+        """Use the Message-ID that started the thread as the conversation id"""
+        references = (headers['References'] or '').split()
+        if references:
+            return references[0]
+        return headers['In-Reply-To'] or headers['Message-ID']
+    
+    def _summary(self, folder, box, key):
+        """Get the cached header fields, read flag and conversation id of a message"""
+        cache_key = (folder, key)
+        summary = self._summaries.get(cache_key)
+        if summary is None:
+            headers = self._read_headers(box, key)
+            try:
+                received = parsedate_to_datetime(headers['Date'])
+                if received.tzinfo is not None:
+                    received = received.astimezone().replace(tzinfo=None)
+            except Exception:
+                received = datetime.min
+            
+            summary = {
+                'received': received,
+                'unread': self._is_unread(box, key, headers),
+                'conversation_id': self._conversation_id(headers),
+                'subject': self.email_processor.header_text(headers, 'Subject'),
+                'from': self.email_processor.header_text(headers, 'From'),
+                'to': self.email_processor.header_text(headers, 'To'),
+                'message_id': (headers['Message-ID'] or '').strip(),
+                # Without reading the body, a mixed multipart is the best hint
+                'has_attachments': headers.get_content_type() == 'multipart/mixed'
+            }
+            self._summaries[cache_key] = summary
+        return summary
+    
+    def _unread(self, folder, box, key):
+        """Read the read flag of a message fresh, as another program may have changed it"""
+        summary = self._summary(folder, box, key)
+        summary['unread'] = self._read_unread(box, key)
+        return summary['unread']
+    
+    def _cached_stub(self, email_id, unread, last_modified, known_versions):
+        """Get the stub of an unchanged message, or None if it must be read"""
+        if known_versions and known_versions.get(email_id) == last_modified:
+            return {
+                'id': email_id,
+                'unread': unread,
+                'last_modified': last_modified,
+                'cached': True
+            }
+        return None
+    
+    def _build_email(self, folder, box, key, known_versions=None):
+        """Build an EmailRecord from the header summary; the body is parsed on first access"""
+        summary = self._summary(folder, box, key)
+        email_id = self._email_id(folder, box, key)
+        unread = self._unread(folder, box, key)
+        last_modified = self._modified(folder, box, key, summary)
+        
+        stub = self._cached_stub(email_id, unread, last_modified, known_versions)
+        if stub:
+            return stub
+        
+        def load_body():
+            with self._lock:
+                with box.get_file(key) as f:
+                    return self.email_processor.parse_email_file(f)['body']
+        
+        return EmailRecord(
+            id=email_id,
+            subject=summary['subject'],
+            sender=summary['from'],
+            to=summary['to'],
+            date=format_date(summary['received']) if summary['received'] != datetime.min else '',
+            thread_id=summary['conversation_id'],
+            unread=unread,
+            has_attachments=summary['has_attachments'],
+            conversation_id=summary['conversation_id'],
+            last_modified=last_modified,
+            body_loader=load_body
+        )
+    
+    def _newest_keys(self, box, predicate):
+        """Inbox keys of messages matching predicate(summary), newest first"""
+        keys = []
+        for key in box.iterkeys():
+            summary = self._summary(None, box, key)
+            if predicate(summary):
+                keys.append((summary['received'], key))
+        keys.sort(reverse=True)
+        return [key for _, key in keys]
+    
+    def get_unread_emails(self, limit=20, known_versions=None):
+        """Get unread emails from the inbox, newest first"""
+        if not self._ensure_connection():
+            return []
+        
+        try:
+            with self._lock:
+                box = self._box()
+                keys = self._newest_keys(box, lambda summary: summary['unread'])[:limit]
+                return [self._build_email(None, box, key, known_versions) for key in keys]
+        
+        except Exception as e:
+            logger.error(f"Error retrieving unread emails: {str(e)}")
+            return []
+    
+    def get_recent_emails(self, days=2, limit=50, known_versions=None):
+        """Get emails received in the last few days, newest first"""
+        if not self._ensure_connection():
+            return []
+        
+        try:
+            cutoff = datetime.now() - timedelta(days=days)
+            with self._lock:
+                box = self._box()
+                keys = self._newest_keys(box, lambda summary: summary['received'] >= cutoff)[:limit]
+                return [self._build_email(None, box, key, known_versions) for key in keys]
+        
+        except Exception as e:
+            logger.error(f"Error retrieving recent emails: {str(e)}")
+            return []
+    
+    def _build_partial_email(self, box, key, known_versions=None):
+        """Build a bodiless inbox email from the header summary alone"""
+        summary = self._summary(None, box, key)
+        email_id = self._email_id(None, box, key)
+        unread = self._unread(None, box, key)
+        last_modified = self._modified(None, box, key, summary)
+        
+        stub = self._cached_stub(email_id, unread, last_modified, known_versions)
+        if stub:
+            return stub
+        
+        return EmailRecord(
+            id=email_id,
+            subject=summary['subject'],
+            sender=summary['from'],
+            to=summary['to'],
+            date=format_date(summary['received']),
+            unread=unread,
+            has_attachments=summary['has_attachments'],
+            conversation_id=summary['conversation_id'],
+            last_modified=last_modified,
+            partial=True
+        )
+    
+    def list_emails(self, unread_only=False, days=2, limit=50, known_versions=None, since=None):
+        """Get inbox emails for the list view from header summaries, without parsing bodies"""
+        if not self._ensure_connection():
+            return []
+        
+        try:
+            cutoff = since or datetime.now() - timedelta(days=days)
+            with self._lock:
+                box = self._box()
+                if unread_only:
+                    keys = self._newest_keys(box, lambda summary: summary['unread'])[:limit]
+                else:
+                    keys = self._newest_keys(box, lambda summary: summary['received'] >= cutoff)[:limit]
+                return [self._build_partial_email(box, key, known_versions) for key in keys]
+        
+        except Exception as e:
+            logger.error(f"Error listing emails: {str(e)}")
+            return []
+    
+    def get_folder_state(self, since=None, modified_since=None):
+        """Get the read flags and modification stamps of inbox messages
+        
+        Flags are read from the mailbox rather than the summaries, since
+        another mail program may have changed them. Changing a flag does not
+        always touch the stamp (a Maildir rename keeps the mtime), so
+        modified_since does not narrow the result.
+        """
+        if not self._ensure_connection():
+            return None
+        
+        try:
+            state = {}
+            with self._lock:
+                box = self._box()
+                for key in box.iterkeys():
+                    summary = self._summary(None, box, key)
+                    if since and summary['received'] < since:
+                        continue
+                    state[self._email_id(None, box, key)] = {
+                        'unread': self._unread(None, box, key),
+                        'last_modified': self._modified(None, box, key, summary)
+                    }
+            return state
+        
+        except Exception as e:
+            logger.error(f"Error reading inbox state: {str(e)}")
+            return None
+    
+    def get_thread_emails(self, conversation_id, limit=10):
+        """Get the inbox, sent and archived emails of a conversation, oldest first"""
+        if not conversation_id or not self._ensure_connection():
+            return []
+        
+        try:
+            thread = []
+            with self._lock:
+                for folder, box, folder_name in self._folder_boxes():
+                    for key in box.iterkeys():
+                        summary = self._summary(folder, box, key)
+                        if summary['conversation_id'] == conversation_id:
+                            thread.append((summary['received'], folder, box, key, folder_name))
+                
+                thread.sort(key=lambda entry: entry[0])
+                
+                emails = []
+                for _, folder, box, key, folder_name in thread[:limit]:
+                    email_data = self._build_email(folder, box, key)
+                    email_data['folder'] = folder_name
+                    emails.append(email_data)
+                return emails
+        
+        except Exception as e:
+            logger.error(f"Error retrieving thread emails: {str(e)}")
+            return []
+    
+    def _folder_boxes(self):
+        """(cache folder, mailbox, folder name) of the folders searched for thread members"""
+        return [
+            (None, self._box(), 'inbox'),
+            (self.SENT_FOLDER, self._box(self.SENT_FOLDER), 'sent'),
+            (self.ARCHIVE_FOLDER, self._box(self.ARCHIVE_FOLDER), 'archive')
+        ]
+    
+    def _folder_name(self, folder):
+        """Get the 'folder' value of emails from a cache folder"""
+        return 'inbox' if folder is None else folder.lower()
+    
+    def get_emails_by_ids(self, email_ids):
+        """Get emails by id from the folder the id names"""
+        if not email_ids or not self._ensure_connection():
+            return {}
+        
+        try:
+            emails = {}
+            with self._lock:
+                for email_id in email_ids:
+                    located = self._locate(email_id)
+                    if located is None:
+                        continue
+                    folder, box, key = located
+                    email_data = self._build_email(folder, box, key)
+                    email_data['folder'] = self._folder_name(folder)
+                    emails[email_id] = email_data
+            return emails
+        
+        except Exception as e:
+            logger.error(f"Error retrieving emails by id: {str(e)}")
+            return {}
+    
+    def get_conversation_entries(self, folder='sent', since=None, limit=500):
+        """List conversation membership of the inbox or sent mailbox, newest first"""
+        if not self._ensure_connection():
+            return []
+        
+        try:
+            with self._lock:
+                cache_folder = self.SENT_FOLDER if folder == 'sent' else None
+                box = self._box(cache_folder)
+                
+                entries = []
+                for key in box.iterkeys():
+                    summary = self._summary(cache_folder, box, key)
+                    if since and summary['received'] < since:
+                        continue
+                    entries.append((summary['received'], {
+                        'id': self._email_id(cache_folder, box, key),
+                        'conversation_id': summary['conversation_id'],
+                        'folder': folder,
+                        'date': format_date(summary['received'])
+                    }))
+                
+                entries.sort(key=lambda entry: entry[0], reverse=True)
+                return [entry for _, entry in entries[:limit]]
+        
+        except Exception as e:
+            logger.error(f"Error listing {folder} conversations: {str(e)}")
+            return []
+    
+    def mark_as_read(self, email_id):
+        """Mark an email as read"""
+        if not self._ensure_connection():
+            return False
+        
+        try:
+            with self._lock:
+                located = self._locate(email_id)
+                if located is None:
+                    return False
+                folder, box, key = located
+                self._mark_read(box, key)
+                summary = self._summaries.get((folder, key))
+                if summary:
+                    summary['unread'] = False
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error marking email as read: {str(e)}")
+            return False
+    
+    def _move(self, source, key, target):
+        """Move a message between mailboxes and return its key in the target"""
+        message = source.get_message(key)
+        target.lock()
+        try:
+            new_key = target.add(message)
+            self._flush(target)
+        finally:
+            target.unlock()
+        
+        source.lock()
+        try:
+            source.remove(key)
+            self._flush(source)
+        finally:
+            source.unlock()
+        return new_key
+    
+    def archive_email(self, email_id):
+        """Move an inbox email to the archive mailbox"""
+        if not self._ensure_connection():
+            return False
+        
+        try:
+            with self._lock:
+                located = self._locate(email_id)
+                if located is None or located[0] is not None:
+                    return False
+                _, box, key = located
+                self._move(box, key, self._box(self.ARCHIVE_FOLDER))
+                self._summaries.pop((None, key), None)
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error archiving email: {str(e)}")
+            return False
+    
+    def list_attachments(self, email_id):
+        """List an email's attachments by scanning its MIME structure"""
+        if not self._ensure_connection():
+            return []
+        
+        try:
+            with self._lock:
+                located = self._locate(email_id)
+                if located is None:
+                    return []
+                _, box, key = located
+                with box.get_file(key) as f:
+                    return self.email_processor.list_attachments(f)
+        
+        except Exception as e:
+            logger.error(f"Error listing attachments: {str(e)}")
+            return []
+    
+    def save_attachment(self, email_id, index, path=None):
+        """Decode an attachment to disk a chunk at a time"""
+        if not self._ensure_connection():
+            return None
+        
+        target = None
+        try:
+            with self._lock:
+                located = self._locate(email_id)
+                if located is None:
+                    return None
+                _, box, key = located
+                
+                target = path or spool_path(None)
+                with box.get_file(key) as f, open(target, 'wb') as out:
+                    info = self.email_processor.extract_attachment(f, index, out)
+            
+            if info is None:
+                os.remove(target)
+                return None
+            
+            if path is None:
+                # The name is only known once the part has been read
+                named = spool_path(info['name'])
+                os.replace(target, named)
+                target = named
+            return target
+        
+        except Exception as e:
+            logger.error(f"Error saving attachment: {str(e)}")
+            return None
+    
+    def _new_message(self, to_email, subject, body):
+        """Build a message from the user"""
+        message = EmailMessage()
+        message['To'] = to_email or ''
+        message['Subject'] = subject or ''
+        message['Date'] = formatdate(localtime=True)
+        message['Message-ID'] = make_msgid()
+        message.set_content(body or '')
+        return message
+    
+    def send_email(self, draft_id=None, to_email=None, subject=None, body=None):
+        """'Send' an email by filing it in the sent mailbox"""
+        if not self._ensure_connection():
+            return False
+        
+        try:
+            with self._lock:
+                sent = self._box(self.SENT_FOLDER)
+                if draft_id:
+                    located = self._locate(str(draft_id))
+                    if located is None or located[0] != self.DRAFTS_FOLDER:
+                        logger.error(f"Draft {draft_id} not found")
+                        return False
+                    _, drafts, key = located
+                    self._move(drafts, key, sent)
+                else:
+                    sent.lock()
+                    try:
+                        sent.add(self._new_message(to_email, subject, body))
+                        self._flush(sent)
+                    finally:
+                        sent.unlock()
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error sending email: {str(e)}")
+            return False
+    
+    def create_draft(self, to_email, subject, body):
+        """Store a draft in the drafts mailbox"""
+        if not self._ensure_connection():
+            return None
+        
+        try:
+            with self._lock:
+                drafts = self._box(self.DRAFTS_FOLDER)
+                drafts.lock()
+                try:
+                    key = drafts.add(self._new_message(to_email, subject, body))
+                    self._flush(drafts)
+                finally:
+                    drafts.unlock()
+                draft_id = self._email_id(self.DRAFTS_FOLDER, drafts, key)
+            
+            return {
+                'id': draft_id,
+                'subject': subject,
+                'to': to_email,
+                'body': body
+            }
+        
+        except Exception as e:
+            logger.error(f"Error creating draft: {str(e)}")
+            return None
+
+class MaildirSource(LocalMailSource):
+    """Mail source reading a Maildir; other folders are Maildir++ subfolders"""
+    
+    def _open(self, path):
+        return mailbox.Maildir(path, factory=None, create=False)
+    
+    def _open_folder(self, name):
+        if name in self.mailbox.list_folders():
+            return self.mailbox.get_folder(name)
+        return self.mailbox.add_folder(name)
+    
+    def _folder_path(self, folder):
+        """Directory of a folder: the Maildir itself, or its Maildir++ '.name' subfolder"""
+        return self.path if folder is None else self.path / f".{folder}"
+    
+    def _is_unread(self, box, key, headers):
+        # Maildir keeps flags in the file name; reading them without the message needs Python 3.13
+        if hasattr(box, 'get_flags'):
+            return 'S' not in box.get_flags(key)
+        return 'S' not in box.get_message(key).get_flags()
+    
+    def _read_unread(self, box, key):
+        return self._is_unread(box, key, None)
+    
+    def _modified(self, folder, box, key, summary):
+        # Each message is a file, so its mtime is a real modification stamp
+        message = box.get_message(key)
+        info = message.get_info()
+        name = f"{key}{box.colon}{info}" if info else key
+        mtime = os.path.getmtime(self._folder_path(folder) / message.get_subdir() / name)
+        return datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+    
+    def _mark_read(self, box, key):
+        message = box.get_message(key)
+        message.add_flag('S')
+        message.set_subdir('cur')
+        box[key] = message
+
+class MboxSource(LocalMailSource):
+    """Mail source reading an mbox file; other folders are sibling mbox files
+    
+    mbox keys are positions in the file and are renumbered whenever it is
+    reopened, so messages are identified by their Message-ID instead.
+    Another program may append to or rewrite the file at any time, so every
+    access compares its size and mtime with the last ones seen and reopens
+    it when they differ: new mail gets listed, and the next flush does not
+    clash with the external change. Messages keep their received time as
+    modification stamp, since the file mtime changes with any message and a
+    message only changes by its Status flag, which is read fresh.
+    """
+    
+    def __init__(self, path, email_processor=None):
+        super().__init__(path, email_processor)
+        self._stamps = {}  # mbox path -> (size, mtime) when last read or written
+        self._tails = {}  # mbox path -> (span, digest) of its last message then
+        self._indexes = {}  # mbox path -> {stable id: key}
+    
+    def _open(self, path):
+        if not Path(path).exists():
+            raise FileNotFoundError(path)
+        return self._opened(mailbox.mbox(path, create=False))
+    
+    def _open_folder(self, name):
+        folder_path = self.path.with_name(f"{self.path.stem}.{name.lower()}{self.path.suffix}")
+        return self._opened(mailbox.mbox(folder_path, create=True))
+    
+    def _stamp(self, box):
+        """Get the size and mtime of an mbox file, or None if it cannot be read"""
+        try:
+            stat = os.stat(box._path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+    
+    def _digest(self, box, span):
+        """Hash the bytes of a span of an mbox file"""
+        start, stop = span
+        with open(box._path, 'rb') as f:
+            f.seek(start)
+            return hashlib.sha1(f.read(stop - start)).digest()
+    
+    def _record(self, box):
+        """Remember the stamp and last message of an mbox as this process last saw it"""
+        self._stamps[box._path] = self._stamp(box)
+        self._indexes.pop(box._path, None)
+        if box._toc:
+            span = box._toc[max(box._toc)]
+            self._tails[box._path] = (span, self._digest(box, span))
+        else:
+            self._tails.pop(box._path, None)
+    
+    def _opened(self, box):
+        """Read the table of contents of a freshly opened mbox and record it"""
+        len(box)
+        self._record(box)
+        return box
+    
+    def _box(self, folder=None):
+        box = super()._box(folder)
+        if self._stamp(box) != self._stamps.get(box._path):
+            box = self._reopen(folder, box)
+        return box
+    
+    def _reopen(self, folder, box):
+        """Reopen an mbox another program changed; summaries survive only a pure append"""
+        old_toc = box._toc or {}
+        tail = self._tails.get(box._path)
+        box.close()
+        
+        if folder is None:
+            box = self.mailbox = self._open(self.path)
+        else:
+            box = self._folders[folder] = self._open_folder(folder)
+        
+        # New mail leaves every old message where it was, down to its last byte
+        appended = all(box._toc.get(key) == span for key, span in old_toc.items())
+        if appended and tail:
+            appended = self._digest(box, tail[0]) == tail[1]
+        if not appended:
+            for cache_key in [cache_key for cache_key in self._summaries if cache_key[0] == folder]:
+                del self._summaries[cache_key]
+        return box
+    
+    def _flush(self, box):
+        box.flush()
+        # The box already knows the layout it wrote, so only an external change reopens it
+        self._record(box)
+    
+    def _stable_id(self, folder, box, key):
+        summary = self._summary(folder, box, key)
+        if summary['message_id']:
+            return summary['message_id']
+        
+        # Without a Message-ID, hash the headers that identify the message
+        fingerprint = f"{summary['received']}|{summary['from']}|{summary['subject']}"
+        return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+    
+    def _to_key(self, folder, box, email_id):
+        index = self._indexes.get(box._path)
+        if index is None:
+            index = {}
+            for key in box.iterkeys():
+                # The first copy of a message saved twice answers for both
+                index.setdefault(self._stable_id(folder, box, key), key)
+            self._indexes[box._path] = index
+        return index[email_id]
+    
+    def _is_unread(self, box, key, headers):
+        return 'R' not in (headers['Status'] or '')
+    
+    def _mark_read(self, box, key):
+        message = box.get_message(key)
+        message.add_flag('R')
+        box.lock()
+        try:
+            box[key] = message
+            self._flush(box)
+        finally:
+            box.unlock()
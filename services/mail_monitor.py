@@ -0,0 +1,126 @@
+# services/mail_monitor.py
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class MailMonitor:
+    """Polls a mailbox for new emails on a background thread
+    
+    Each poll is an incremental SyncEngine.sync, so an idle poll costs a
+    couple of small mailbox queries. The interval starts at the configured
+    refresh interval, drops to min_interval after new mail arrives and
+    backs off by BACKOFF per idle poll up to max_interval. It is also kept
+    long enough that polling stays within cpu_budget (share of process CPU
+    time) and mailbox_budget (share of wall time spent waiting on the
+    mailbox, i.e. COM calls for Outlook), and is jittered so several
+    clients do not poll in lockstep. wake() polls early, after a short
+    batch window, for backends that report new items as events.
+    """
+    
+    BACKOFF = 1.5
+    
+    def __init__(self, sync_engine, callback, root=None, interval=300, min_interval=15,
+                 max_interval=None, jitter=0.1, cpu_budget=0.02, mailbox_budget=0.05, batch_window=2.0):
+        self.sync_engine = sync_engine
+        self.callback = callback
+        self.root = root
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.cpu_budget = cpu_budget
+        self.mailbox_budget = mailbox_budget
+        self.batch_window = batch_window  # seconds to gather events before polling
+        self.set_interval(interval, max_interval)
+        
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def set_interval(self, interval, max_interval=None):
+        """Change the base polling interval in seconds"""
+        self.interval = max(self.min_interval, float(interval))
+        self.max_interval = max_interval or self.interval * 4
+        self._current = self.interval
+    
+    def start(self):
+        """Start polling"""
+        if self._thread and self._thread.is_alive():
+            return True
+        
+        self._stop_event.clear()
+        self._wake_event.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-monitor", daemon=True)
+        self._thread.start()
+        return True
+    
+    def stop(self, timeout=5):
+        """Stop polling and wait for a running poll to finish"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        return True
+    
+    def wake(self):
+        """Poll soon; safe to call from any thread"""
+        self._wake_event.set()
+    
+    def _run(self):
+        """Monitor thread main loop"""
+        while not self._stop_event.is_set():
+            woken = self._wake_event.wait(self._jittered(self._current))
+            if self._stop_event.is_set():
+                break
+            
+            if woken:
+                # Let a burst of arrivals finish before syncing them in one go
+                self._stop_event.wait(self.batch_window)
+                self._wake_event.clear()
+            
+            self._poll()
+    
+    def _poll(self):
+        """Run one sync, deliver new emails and pick the next interval"""
+        started = time.monotonic()
+        cpu_started = time.process_time()
+        
+        try:
+            result = self.sync_engine.sync()
+        except Exception as e:
+            logger.error(f"Error polling for new emails: {str(e)}")
+            result = None
+        
+        elapsed = time.monotonic() - started
+        cpu = time.process_time() - cpu_started
+        
+        added = result['added'] if result else []
+        if added:
+            self._deliver(added)
+        
+        self._current = self._next_interval(bool(added), elapsed, cpu)
+        logger.debug(f"Polled mailbox in {elapsed:.2f}s, next poll in {self._current:.0f}s")
+    
+    def _next_interval(self, active, elapsed, cpu):
+        """Tighten after activity, back off when idle, and stay within the budgets"""
+        if active:
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval, self._current * self.BACKOFF)
+        
+        return max(interval, elapsed / self.mailbox_budget, cpu / self.cpu_budget)
+    
+    def _jittered(self, interval):
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+    
+    def _deliver(self, emails):
+        """Pass a batch of new emails to the callback on the Tk thread"""
+        try:
+            if self.root is not None:
+                self.root.after(0, lambda: self.callback(emails))
+            else:
+                self.callback(emails)
+        except Exception as e:
+            logger.error(f"Error delivering new emails: {str(e)}")
@@ -0,0 +1,278 @@
+# services/mail_source.py
+import os
+import re
+import shutil
+import logging
+import tempfile
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from services.mail_monitor import MailMonitor
+
+logger = logging.getLogger(__name__)
+
+# Date format of the 'date' field in email dicts, as produced by OutlookService
+DATE_FORMAT = "%a, %d %b %Y %H:%M:%S"
+
+# Attachments saved without a destination are spooled here
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "mail-response-ai-attachments")
+
+class MailSource:
+    """Interface of the mailbox backends the UI reads from and sends through
+    
+    Emails are dicts with 'id', 'subject', 'from', 'to', 'date' (DATE_FORMAT),
+    'body', 'unread', 'has_attachments', 'conversation_id' and
+    'last_modified'. Backends that receive known_versions (id -> last
+    modification stamp) may return unchanged emails as stubs holding only
+    'id', 'unread', 'last_modified' and 'cached': True.
+    """
+    
+    def initialize(self):
+        """Connect to the mailbox; returns True on success"""
+        raise NotImplementedError
+    
+    def is_connected(self):
+        """Check whether the mailbox is currently available"""
+        raise NotImplementedError
+    
+    def get_unread_emails(self, limit=20, known_versions=None):
+        """Get unread emails, newest first"""
+        raise NotImplementedError
+    
+    def get_recent_emails(self, days=2, limit=50, known_versions=None):
+        """Get emails received in the last few days, newest first"""
+        raise NotImplementedError
+    
+    def list_emails(self, unread_only=False, days=2, limit=50, known_versions=None, since=None):
+        """Get inbox emails for the list view, newest first
+        
+        since (a datetime) replaces the days window when given. Backends
+        that can read selected columns in bulk return the emails without
+        'body' and with 'partial': True; the body is then fetched with
+        get_emails_by_ids when the email is opened. By default this is a
+        full fetch.
+        """
+        if unread_only:
+            return self.get_unread_emails(limit=limit, known_versions=known_versions)
+        if since:
+            days = (datetime.now() - since).total_seconds() / 86400
+        return self.get_recent_emails(days=days, limit=limit, known_versions=known_versions)
+    
+    def get_folder_state(self, since=None, modified_since=None):
+        """Get the unread flag and modification stamp of inbox emails
+        
+        Covers emails received at or after since and, if modified_since is
+        given, only those modified at or after it. Returns a dict of id ->
+        {'unread': bool, 'last_modified': str}, or None if the backend
+        cannot list this cheaply.
+        """
+        return None
+    
+    def get_thread_emails(self, conversation_id, limit=10):
+        """Get the emails of a conversation, oldest first"""
+        raise NotImplementedError
+    
+    def get_emails_by_ids(self, email_ids):
+        """Get emails by id from any folder as a dict keyed by id; unknown ids are left out"""
+        raise NotImplementedError
+    
+    def get_conversation_entries(self, folder='sent', since=None, limit=500):
+        """List conversation membership of a folder's emails, newest first
+        
+        Returns dicts with only 'id', 'conversation_id', 'folder' and 'date'
+        for emails dated at or after since (a datetime), for indexing.
+        """
+        return []
+    
+    def mark_as_read(self, email_id):
+        """Mark an email as read"""
+        raise NotImplementedError
+    
+    def archive_email(self, email_id):
+        """Move an email out of the inbox into the archive"""
+        raise NotImplementedError
+    
+    def mark_as_read_many(self, email_ids):
+        """Mark several emails as read; returns a dict of id -> success"""
+        return {email_id: self.mark_as_read(email_id) for email_id in email_ids}
+    
+    def archive_many(self, email_ids):
+        """Archive several emails; returns a dict of id -> success"""
+        return {email_id: self.archive_email(email_id) for email_id in email_ids}
+    
+    def send_email(self, draft_id=None, to_email=None, subject=None, body=None):
+        """Send an email, either from a draft ID or new information"""
+        raise NotImplementedError
+    
+    def send_many(self, messages):
+        """Send several new emails
+        
+        messages are dicts with 'id', 'to_email', 'subject' and 'body'.
+        Returns a dict of id -> None when sent, or an error message.
+        """
+        results = {}
+        for message in messages:
+            sent = self.send_email(
+                to_email=message['to_email'], subject=message.get('subject'), body=message.get('body')
+            )
+            results[message['id']] = None if sent else "Send failed"
+        return results
+    
+    def create_draft(self, to_email, subject, body):
+        """Create a draft email and return it as a dict, or None"""
+        raise NotImplementedError
+    
+    def list_attachments(self, email_id):
+        """List an email's attachments without reading their contents
+        
+        Returns dicts with 'index', 'name', 'size' (bytes) and
+        'content_type', or an empty list if there are none or the email
+        cannot be found.
+        """
+        return []
+    
+    def save_attachment(self, email_id, index, path=None):
+        """Write attachment number index of an email to path, by default a new spool file
+        
+        The content is streamed to disk rather than read into memory.
+        Returns the path written, or None on failure.
+        """
+        return None
+    
+    def mailboxes(self):
+        """Get the sources to sync, keyed by mailbox name; '' is the default inbox"""
+        return {'': self}
+    
+    def start_monitoring(self, callback, root=None, sync_engine=None, interval=300):
+        """Watch for new emails and pass batches of them to callback on root's thread
+        
+        Polls with sync_engine (a SyncEngine over this source) from a
+        MailMonitor, woken early by watch_inbox events where the backend has
+        them. Without a sync engine there is nothing to poll with.
+        """
+        if sync_engine is None:
+            logger.info("No sync engine given; new emails are picked up on refresh")
+            return False
+        
+        self.stop_monitoring()
+        
+        self._monitor = MailMonitor(sync_engine, callback, root, interval=interval)
+        self._monitor.start()
+        
+        if self.watch_inbox(self._monitor.wake):
+            logger.info("Monitoring the inbox with new-item events and polling")
+        else:
+            logger.info(f"Monitoring the inbox by polling every {interval} seconds or less")
+        return True
+    
+    def stop_monitoring(self):
+        """Stop watching for new emails"""
+        monitor = getattr(self, '_monitor', None)
+        if monitor:
+            self.unwatch_inbox()
+            monitor.stop()
+            self._monitor = None
+        return True
+    
+    def set_monitoring_interval(self, interval):
+        """Change the base polling interval of a running monitor"""
+        monitor = getattr(self, '_monitor', None)
+        if monitor:
+            monitor.set_interval(interval)
+    
+    def watch_inbox(self, on_change):
+        """Call on_change() when items arrive in the inbox; returns False if unsupported"""
+        return False
+    
+    def unwatch_inbox(self):
+        """Stop the events registered by watch_inbox"""
+        return True
+    
+    def close(self):
+        """Release the mailbox when the application exits"""
+        return True
+
+def format_date(value):
+    """Convert a datetime or RFC 2822 date header into DATE_FORMAT in local time"""
+    try:
+        if not isinstance(value, datetime):
+            value = parsedate_to_datetime(value)
+        if value.tzinfo is not None:
+            value = value.astimezone().replace(tzinfo=None)
+        return value.strftime(DATE_FORMAT)
+    except Exception:
+        return value if isinstance(value, str) else ''
+
+def spool_path(filename):
+    """Get the path of a new empty file in the attachment spool named after filename"""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    stem, extension = os.path.splitext(os.path.basename(filename or 'attachment'))
+    stem = re.sub(r'[^\w.-]+', '_', stem)[:50] or 'attachment'
+    handle, path = tempfile.mkstemp(prefix=f"{stem}-", suffix=extension[:10], dir=SPOOL_DIR)
+    os.close(handle)
+    return path
+
+def clear_spool():
+    """Delete spooled attachments; files still open elsewhere are left behind"""
+    shutil.rmtree(SPOOL_DIR, ignore_errors=True)
+
+def create_mail_source(config, email_processor=None):
+    """Create the mail source selected by config["email"]["source"]
+    
+    The source setting is a dict with a "type" of "outlook" (the default),
+    "maildir", "mbox" or "fake_outlook", and a "path" for the local types.
+    "fake_outlook" runs OutlookService against an in-memory Outlook object
+    model filled from the Maildir or mbox at "path". Outlook sources may
+    name a "store" and a "/"-separated "folder" to read instead of the
+    default Inbox.
+    
+    Further accounts or folders to sync go in a "mailboxes" list of the
+    same dicts, each with a unique "name"; the sources are then combined
+    in a MailboxSet.
+    """
+    source = config.get("email", {}).get("source") or {}
+    primary = _create_source(source, config, email_processor)
+    
+    mailboxes = source.get("mailboxes") or []
+    if not mailboxes:
+        return primary
+    
+    from services.mailbox_set import MailboxSet
+    
+    sources = {'': primary}
+    for mailbox in mailboxes:
+        name = str(mailbox.get("name") or "").replace(MailboxSet.SEPARATOR, "_")
+        if not name or name in sources:
+            logger.error(f"Skipping mailbox without a unique name: {mailbox}")
+            continue
+        sources[name] = _create_source(mailbox, config, email_processor)
+    
+    return MailboxSet(sources)
+
+def _create_source(source, config, email_processor=None):
+    """Create one mail source from a source setting dict"""
+    source_type = source.get("type", "outlook")
+    path = source.get("path")
+    
+    if source_type == "maildir":
+        from services.local_mail_source import MaildirSource
+        return MaildirSource(path, email_processor)
+    
+    if source_type == "mbox":
+        from services.local_mail_source import MboxSource
+        return MboxSource(path, email_processor)
+    
+    from services.outlook_service import OutlookService
+    
+    if source_type == "fake_outlook":
+        from services.fake_outlook import FakeOutlookApplication
+        application = FakeOutlookApplication()
+        if path:
+            application.load_mailbox(path, email_processor)
+        return OutlookService(config, application=application, store=source.get("store"), folder=source.get("folder"))
+    
+    if source_type != "outlook":
+        logger.error(f"Unknown mail source type '{source_type}', using Outlook")
+    
+    # Each OutlookService has its own COM worker, so mailboxes sync in parallel
+    return OutlookService(config, store=source.get("store"), folder=source.get("folder"))
@@ -0,0 +1,272 @@
+# services/mailbox_set.py
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from services.mail_source import MailSource, DATE_FORMAT
+
+logger = logging.getLogger(__name__)
+
+class MailboxSet(MailSource):
+    """Several mail sources (accounts or folders) presented as one
+    
+    sources maps mailbox names to MailSource objects; the '' entry is the
+    primary mailbox, which sends, drafts and indexes sent items. Emails
+    from the other mailboxes get ids of the form "<name>#<id>" and a
+    'mailbox' field, so every id routes back to the source it came from
+    and ids of different mailboxes never collide in the cache. Reads that
+    cover all mailboxes run on every source in parallel.
+    """
+    
+    SEPARATOR = '#'
+    
+    def __init__(self, sources):
+        if '' not in sources:
+            raise ValueError("A mailbox set needs a primary ('') mailbox")
+        
+        self.sources = dict(sources)
+        self.primary = self.sources['']
+        self._executor = ThreadPoolExecutor(max_workers=len(self.sources), thread_name_prefix="mailbox")
+    
+    def _wrap_id(self, name, email_id):
+        return f"{name}{self.SEPARATOR}{email_id}" if name else email_id
+    
+    def _split_id(self, email_id):
+        """Get the mailbox name and source id of an id"""
+        name, separator, source_id = email_id.partition(self.SEPARATOR)
+        if separator and name in self.sources:
+            return name, source_id
+        return '', email_id
+    
+    def _group_ids(self, email_ids):
+        """Group ids by mailbox as name -> source ids"""
+        groups = {}
+        for email_id in email_ids:
+            name, source_id = self._split_id(email_id)
+            groups.setdefault(name, []).append(source_id)
+        return groups
+    
+    def _tag(self, name, email):
+        """Give an email from a mailbox its set-wide id"""
+        if name and email:
+            email['id'] = self._wrap_id(name, email['id'])
+            email['mailbox'] = name
+        return email
+    
+    def _split_versions(self, known_versions):
+        """Split set-wide known_versions into name -> source id -> version"""
+        versions = {}
+        for email_id, version in (known_versions or {}).items():
+            name, source_id = self._split_id(email_id)
+            versions.setdefault(name, {})[source_id] = version
+        return versions
+    
+    def _each(self, call, names=None):
+        """Run call(name, source) for several mailboxes in parallel; returns name -> result"""
+        names = list(self.sources) if names is None else list(names)
+        futures = {name: self._executor.submit(call, name, self.sources[name]) for name in names}
+        
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Error in mailbox {name or 'inbox'}: {str(e)}")
+                results[name] = None
+        return results
+    
+    def _merge_newest(self, results, limit, reverse=True):
+        """Merge tagged email lists by date, newest first unless reverse is False"""
+        emails = []
+        for name, listed in results.items():
+            emails.extend(self._tag(name, email) for email in listed or [])
+        
+        def received(email):
+            try:
+                return datetime.strptime(email.get('date', ''), DATE_FORMAT)
+            except (TypeError, ValueError):
+                pass
+            
+            # Unchanged emails come back as stubs without a date
+            try:
+                return datetime.strptime(email.get('last_modified', ''), "%Y-%m-%d %H:%M:%S")
+            except (TypeError, ValueError):
+                return datetime.min
+        
+        emails.sort(key=received, reverse=reverse)
+        
+        # Keep the newest either way
+        return emails[:limit] if reverse else emails[-limit:]
+    
+    def mailboxes(self):
+        """Get a source per mailbox for MailboxSync"""
+        return {name: self.primary if not name else MailboxView(self, name) for name in self.sources}
+    
+    def initialize(self):
+        """Connect every mailbox; succeeds if the primary one connects"""
+        results = self._each(lambda name, source: source.initialize())
+        for name, connected in results.items():
+            if name and not connected:
+                logger.error(f"Could not open mailbox {name}")
+        return bool(results[''])
+    
+    def is_connected(self):
+        """Check whether the primary mailbox is available"""
+        return self.primary.is_connected()
+    
+    def get_unread_emails(self, limit=20, known_versions=None):
+        """Get unread emails of all mailboxes, newest first"""
+        versions = self._split_versions(known_versions)
+        results = self._each(lambda name, source: source.get_unread_emails(
+            limit=limit, known_versions=versions.get(name)
+        ))
+        return self._merge_newest(results, limit)
+    
+    def get_recent_emails(self, days=2, limit=50, known_versions=None):
+        """Get recent emails of all mailboxes, newest first"""
+        versions = self._split_versions(known_versions)
+        results = self._each(lambda name, source: source.get_recent_emails(
+            days=days, limit=limit, known_versions=versions.get(name)
+        ))
+        return self._merge_newest(results, limit)
+    
+    def list_emails(self, unread_only=False, days=2, limit=50, known_versions=None, since=None):
+        """List the emails of all mailboxes, newest first"""
+        versions = self._split_versions(known_versions)
+        results = self._each(lambda name, source: source.list_emails(
+            unread_only=unread_only, days=days, limit=limit, known_versions=versions.get(name), since=since
+        ))
+        return self._merge_newest(results, limit)
+    
+    def get_folder_state(self, since=None, modified_since=None):
+        """Get the flags of all mailboxes, or None if no mailbox can list them"""
+        results = self._each(lambda name, source: source.get_folder_state(
+            since=since, modified_since=modified_since
+        ))
+        if all(state is None for state in results.values()):
+            return None
+        
+        states = {}
+        for name, state in results.items():
+            for source_id, flags in (state or {}).items():
+                states[self._wrap_id(name, source_id)] = flags
+        return states
+    
+    def get_thread_emails(self, conversation_id, limit=10):
+        """Get the emails of a conversation from all mailboxes, oldest first"""
+        results = self._each(lambda name, source: source.get_thread_emails(conversation_id, limit=limit))
+        return self._merge_newest(results, limit, reverse=False)
+    
+    def get_emails_by_ids(self, email_ids):
+        """Get emails by id, asking each mailbox only for its own ids"""
+        groups = self._group_ids(email_ids)
+        results = self._each(lambda name, source: source.get_emails_by_ids(groups[name]), names=groups)
+        
+        emails = {}
+        for name, found in results.items():
+            for email in (found or {}).values():
+                email = self._tag(name, email)
+                emails[email['id']] = email
+        return emails
+    
+    def get_conversation_entries(self, folder='sent', since=None, limit=500):
+        """List conversation membership of the primary mailbox"""
+        return self.primary.get_conversation_entries(folder, since=since, limit=limit)
+    
+    def mark_as_read(self, email_id):
+        """Mark an email as read in its mailbox"""
+        name, source_id = self._split_id(email_id)
+        return self.sources[name].mark_as_read(source_id)
+    
+    def archive_email(self, email_id):
+        """Archive an email within its mailbox"""
+        name, source_id = self._split_id(email_id)
+        return self.sources[name].archive_email(source_id)
+    
+    def _many(self, method, email_ids):
+        """Run a bulk method on each mailbox with its own ids; returns id -> success"""
+        groups = self._group_ids(email_ids)
+        results = self._each(lambda name, source: getattr(source, method)(groups[name]), names=groups)
+        
+        merged = {}
+        for name, done in results.items():
+            for source_id in groups[name]:
+                merged[self._wrap_id(name, source_id)] = bool(done and done.get(source_id))
+        return merged
+    
+    def mark_as_read_many(self, email_ids):
+        """Mark emails as read, one bulk call per mailbox"""
+        return self._many('mark_as_read_many', email_ids)
+    
+    def archive_many(self, email_ids):
+        """Archive emails, one bulk call per mailbox"""
+        return self._many('archive_many', email_ids)
+    
+    def list_attachments(self, email_id):
+        """List the attachments of an email in its mailbox"""
+        name, source_id = self._split_id(email_id)
+        return self.sources[name].list_attachments(source_id)
+    
+    def save_attachment(self, email_id, index, path=None):
+        """Save an attachment of an email in its mailbox"""
+        name, source_id = self._split_id(email_id)
+        return self.sources[name].save_attachment(source_id, index, path=path)
+    
+    def send_email(self, draft_id=None, to_email=None, subject=None, body=None):
+        """Send from the primary mailbox"""
+        return self.primary.send_email(draft_id=draft_id, to_email=to_email, subject=subject, body=body)
+    
+    def send_many(self, messages):
+        """Send from the primary mailbox"""
+        return self.primary.send_many(messages)
+    
+    def create_draft(self, to_email, subject, body):
+        """Create a draft in the primary mailbox"""
+        return self.primary.create_draft(to_email, subject, body)
+    
+    def watch_inbox(self, on_change):
+        """Watch every mailbox that supports new-item events"""
+        results = self._each(lambda name, source: source.watch_inbox(on_change))
+        return any(results.values())
+    
+    def unwatch_inbox(self):
+        """Stop the events of every mailbox"""
+        self._each(lambda name, source: source.unwatch_inbox())
+        return True
+    
+    def close(self):
+        """Close every mailbox"""
+        self.stop_monitoring()
+        results = self._each(lambda name, source: source.close())
+        self._executor.shutdown(wait=False)
+        return all(results.values())
+
+class MailboxView(MailSource):
+    """One secondary mailbox of a MailboxSet, with set-wide ids, for its SyncEngine"""
+    
+    def __init__(self, mailbox_set, name):
+        self.mailbox_set = mailbox_set
+        self.name = name
+        self.source = mailbox_set.sources[name]
+    
+    def _tag(self, email):
+        return self.mailbox_set._tag(self.name, email)
+    
+    def is_connected(self):
+        return self.source.is_connected()
+    
+    def list_emails(self, unread_only=False, days=2, limit=50, known_versions=None, since=None):
+        versions = self.mailbox_set._split_versions(known_versions).get(self.name)
+        emails = self.source.list_emails(
+            unread_only=unread_only, days=days, limit=limit, known_versions=versions, since=since
+        )
+        return [self._tag(email) for email in emails]
+    
+    def get_folder_state(self, since=None, modified_since=None):
+        state = self.source.get_folder_state(since=since, modified_since=modified_since)
+        if state is None:
+            return None
+        return {self.mailbox_set._wrap_id(self.name, source_id): flags for source_id, flags in state.items()}
+    
+    def get_emails_by_ids(self, email_ids):
+        return self.mailbox_set.get_emails_by_ids(email_ids)
@@ -0,0 +1,449 @@
+# services/migrations.py
+import sqlite3
+import logging
+import threading
+import time
+import pickle
+
+from services.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+class Migration:
+    """A versioned change to the local database schema
+    
+    schema(cursor) runs inside the transaction that bumps PRAGMA user_version
+    and must be quick. Slow work such as index builds or backfills goes in
+    background steps: callables taking a connection that do one chunk of
+    work per call in their own short transaction and return True once the
+    step is complete.
+    """
+    
+    def __init__(self, version, description, schema=None, background=()):
+        self.version = version
+        self.description = description
+        self.schema = schema
+        self.background = list(background)
+
+def index_step(name, definition):
+    """Build a background step that creates one index"""
+    def step(conn):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+        conn.commit()
+        return True
+    step.__name__ = f"create_{name}"
+    return step
+
+def _create_message_cache(cursor):
+    """Local mirror of mailbox messages, keyed by Outlook EntryID"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS messages (
+        entry_id TEXT PRIMARY KEY,
+        subject TEXT,
+        sender TEXT,
+        recipients TEXT,
+        date TEXT,
+        received_at TEXT,
+        body TEXT,
+        conversation_id TEXT,
+        unread INTEGER DEFAULT 0,
+        has_attachments INTEGER DEFAULT 0,
+        priority TEXT,
+        priority_score INTEGER,
+        content_hash TEXT,
+        last_modified TEXT,
+        cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_messages_received_at
+    ON messages (received_at DESC)
+    ''')
+
+def _create_change_log(cursor):
+    """Change log and triggers used for incremental reloads of tasks and drafts"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_change_log_table
+    ON change_log (table_name, version)
+    ''')
+    
+    # Small key/value table for storage bookkeeping
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS storage_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''')
+    
+    # Record every mutation of the tracked tables
+    for table in ('tasks', 'drafts'):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_log_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', NEW.id, 'insert');
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_log_update AFTER UPDATE ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', NEW.id, 'update');
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_log_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', OLD.id, 'delete');
+        END
+        ''')
+
+def _add_column(cursor, table, column, definition):
+    """Add a column unless an earlier, interrupted run already did"""
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _add_task_completed_at(cursor):
+    """Record when a task was completed so retention can age it out"""
+    _add_column(cursor, 'tasks', 'completed_at', 'TIMESTAMP')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tasks_set_completed_at AFTER UPDATE OF status ON tasks
+    WHEN NEW.status = 'Completed' AND OLD.status IS NOT 'Completed'
+    BEGIN
+        UPDATE tasks SET completed_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+    END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tasks_insert_completed_at AFTER INSERT ON tasks
+    WHEN NEW.status = 'Completed' AND NEW.completed_at IS NULL
+    BEGIN
+        UPDATE tasks SET completed_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+    END
+    ''')
+
+def _backfill_completed_at(conn):
+    """Use created_at as the completion time of tasks completed before migration 4"""
+    cursor = conn.execute('''
+    UPDATE tasks SET completed_at = created_at
+    WHERE id IN (
+        SELECT id FROM tasks WHERE status = 'Completed' AND completed_at IS NULL LIMIT 500
+    )
+    ''')
+    conn.commit()
+    return cursor.rowcount < 500
+
+def _create_blob_store(cursor):
+    """Shared body storage; see BlobStore"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        data BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    
+    # NULL until the body has been moved into the blob store
+    _add_column(cursor, 'messages', 'body_key', 'TEXT')
+    _add_column(cursor, 'drafts', 'body_key', 'TEXT')
+
+def _move_message_bodies(conn):
+    """Move cached message bodies into the blob store, a chunk at a time"""
+    blob_store = BlobStore()
+    cursor = conn.cursor()
+    rows = cursor.execute(
+        'SELECT entry_id, body FROM messages WHERE body_key IS NULL LIMIT 200'
+    ).fetchall()
+    
+    for entry_id, body in rows:
+        key = blob_store.put(cursor, body or '')
+        cursor.execute(
+            'UPDATE messages SET body_key = ?, body = NULL WHERE entry_id = ?',
+            (key, entry_id)
+        )
+    
+    conn.commit()
+    return len(rows) < 200
+
+def _move_draft_bodies(conn):
+    """Move the original email bodies of drafts into the blob store, a chunk at a time"""
+    blob_store = BlobStore()
+    cursor = conn.cursor()
+    rows = cursor.execute(
+        'SELECT id, original_email FROM drafts WHERE body_key IS NULL LIMIT 100'
+    ).fetchall()
+    
+    for draft_id, blob in rows:
+        try:
+            original_email = pickle.loads(blob)
+        except Exception:
+            original_email = None
+        
+        if isinstance(original_email, dict) and original_email.get('body'):
+            key = blob_store.put(cursor, original_email.pop('body'))
+            cursor.execute(
+                'UPDATE drafts SET body_key = ?, original_email = ? WHERE id = ?',
+                (key, pickle.dumps(original_email), draft_id)
+            )
+        else:
+            cursor.execute("UPDATE drafts SET body_key = '' WHERE id = ?", (draft_id,))
+    
+    conn.commit()
+    return len(rows) < 100
+
+def _create_conversation_index(cursor):
+    """Conversation id -> EntryIDs of its messages in any folder"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS conversation_index (
+        conversation_id TEXT NOT NULL,
+        entry_id TEXT NOT NULL,
+        folder TEXT,
+        received_at TEXT,
+        PRIMARY KEY (conversation_id, entry_id)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_conversation_index_entry
+    ON conversation_index (entry_id)
+    ''')
+
+def _index_cached_conversations(conn):
+    """Add the conversations of already cached messages to the index"""
+    conn.execute('''
+    INSERT OR IGNORE INTO conversation_index (conversation_id, entry_id, folder, received_at)
+    SELECT conversation_id, entry_id, 'inbox', received_at FROM messages
+    WHERE conversation_id IS NOT NULL AND conversation_id != ''
+    ''')
+    conn.commit()
+    return True
+
+def _add_partial_flag(cursor):
+    """Mark cached messages whose body has not been fetched yet"""
+    _add_column(cursor, 'messages', 'partial', 'INTEGER NOT NULL DEFAULT 0')
+
+def _create_outbox(cursor):
+    """Queue of emails waiting to be sent by the outbox worker"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        draft_id INTEGER,
+        to_email TEXT NOT NULL,
+        subject TEXT,
+        body TEXT,
+        status TEXT NOT NULL DEFAULT 'Queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TEXT,
+        last_error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sent_at TEXT
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_outbox_due
+    ON outbox (status, next_attempt_at)
+    ''')
+
+def _add_mailbox_column(cursor):
+    """Record which mailbox a cached message was synced from; '' is the default inbox"""
+    _add_column(cursor, 'messages', 'mailbox', "TEXT NOT NULL DEFAULT ''")
+
+# Ordered list of all migrations; append new ones with the next version number
+MIGRATIONS = [
+    Migration(1, "Add message cache", schema=_create_message_cache),
+    Migration(2, "Add change log", schema=_create_change_log),
+    Migration(3, "Add indexes for paged task and message queries", background=[
+        index_step("idx_tasks_due_order", "tasks (COALESCE(due_date, ''), id)"),
+        index_step("idx_tasks_status", "tasks (status, COALESCE(due_date, ''), id)"),
+        index_step("idx_messages_unread", "messages (unread, received_at DESC)"),
+        index_step("idx_messages_conversation", "messages (conversation_id)"),
+    ]),
+    Migration(4, "Track task completion time", schema=_add_task_completed_at, background=[
+        _backfill_completed_at,
+        index_step("idx_drafts_status", "drafts (status, id)"),
+    ]),
+    Migration(5, "Store bodies in a shared blob store", schema=_create_blob_store, background=[
+        _move_message_bodies,
+        _move_draft_bodies,
+    ]),
+    Migration(6, "Add conversation index", schema=_create_conversation_index, background=[
+        _index_cached_conversations,
+    ]),
+    Migration(7, "Allow caching messages without their body", schema=_add_partial_flag),
+    Migration(8, "Add outbox", schema=_create_outbox),
+    Migration(9, "Sync several mailboxes into the message cache", schema=_add_mailbox_column, background=[
+        index_step("idx_messages_mailbox", "messages (mailbox, received_at)"),
+    ]),
+]
+
+class MigrationRunner:
+    """Applies pending migrations to a database using PRAGMA user_version"""
+    
+    def __init__(self, db_file, migrations=None, chunk_pause=0.05):
+        self.db_file = db_file
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+        self.chunk_pause = chunk_pause  # seconds between background chunks
+        self._background_thread = None
+        self._stop_event = threading.Event()
+    
+    def _connect(self):
+        """Open a connection that waits on locks instead of failing"""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+    
+    def current_version(self):
+        """Get the schema version of the database"""
+        conn = self._connect()
+        try:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+        finally:
+            conn.close()
+    
+    @property
+    def latest_version(self):
+        """Version the database has once all migrations are applied"""
+        return self.migrations[-1].version if self.migrations else 0
+    
+    def pending_migrations(self):
+        """Get migrations whose schema step has not been applied yet"""
+        version = self.current_version()
+        return [m for m in self.migrations if m.version > version]
+    
+    def migrate(self):
+        """Apply all pending schema steps and return the new version"""
+        conn = self._connect()
+        
+        try:
+            # WAL lets the UI keep reading while background steps write
+            conn.execute('PRAGMA journal_mode = WAL')
+            
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            
+            for migration in self.migrations:
+                if migration.version <= version:
+                    continue
+                
+                logger.info(f"Applying migration {migration.version}: {migration.description}")
+                
+                cursor = conn.cursor()
+                try:
+                    cursor.execute('BEGIN')
+                    if migration.schema:
+                        migration.schema(cursor)
+                    # PRAGMA does not accept bound parameters
+                    cursor.execute(f'PRAGMA user_version = {int(migration.version)}')
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                
+                version = migration.version
+            
+            return version
+        
+        finally:
+            conn.close()
+    
+    def _completed_steps(self, conn, migration):
+        """Number of background steps of a migration that have finished"""
+        try:
+            row = conn.execute(
+                'SELECT value FROM storage_meta WHERE key = ?',
+                (f'migration_{migration.version}_steps_done',)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # storage_meta does not exist before migration 2
+            return 0
+        return int(row[0]) if row else 0
+    
+    def pending_background_steps(self):
+        """Get (migration, step index) pairs still waiting to run"""
+        version = self.current_version()
+        conn = self._connect()
+        
+        try:
+            pending = []
+            for migration in self.migrations:
+                if migration.version > version or not migration.background:
+                    continue
+                done = self._completed_steps(conn, migration)
+                for index in range(done, len(migration.background)):
+                    pending.append((migration, index))
+            return pending
+        
+        finally:
+            conn.close()
+    
+    def run_background_steps(self):
+        """Run pending background steps chunk by chunk until done or stopped"""
+        pending = self.pending_background_steps()
+        if not pending:
+            return True
+        
+        conn = self._connect()
+        
+        try:
+            for migration, index in pending:
+                step = migration.background[index]
+                logger.info(f"Running background step {step.__name__} of migration {migration.version}")
+                
+                while not step(conn):
+                    if self._stop_event.is_set():
+                        return False
+                    # Give foreground connections a chance at the lock
+                    time.sleep(self.chunk_pause)
+                
+                conn.execute('''
+                INSERT INTO storage_meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                ''', (f'migration_{migration.version}_steps_done', str(index + 1)))
+                conn.commit()
+                
+                if self._stop_event.is_set():
+                    return False
+            
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error running background migration: {str(e)}")
+            return False
+        
+        finally:
+            conn.close()
+    
+    def start_background(self, on_complete=None):
+        """Run background steps on a daemon thread, then call on_complete()"""
+        if self._background_thread and self._background_thread.is_alive():
+            return self._background_thread
+        
+        def worker():
+            if self.run_background_steps() and on_complete:
+                try:
+                    on_complete()
+                except Exception as e:
+                    logger.error(f"Error after background migrations: {str(e)}")
+        
+        self._stop_event.clear()
+        self._background_thread = threading.Thread(target=worker, name="db-migrations", daemon=True)
+        self._background_thread.start()
+        return self._background_thread
+    
+    def stop_background(self, timeout=5):
+        """Ask the background thread to stop after its current chunk"""
+        self._stop_event.set()
+        if self._background_thread:
+            self._background_thread.join(timeout)
@@ -15,6 +15,11 @@ class OllamaService:
         self.max_retries = 3
         self.retry_delay = 2  # seconds
     
+    def update_config(self, ollama_config):
+        """Switch to a changed host or model"""
+        self.host = ollama_config.get("host", self.host).rstrip('/')
+        self.model = ollama_config.get("model", self.model)
+    
     def ping(self):
         """Ping Ollama to check if it's running"""
         try:
@@ -0,0 +1,168 @@
+# services/outbox.py
+import time
+import random
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+class OutboxWorker:
+    """Sends the emails queued in the outbox table on a background thread
+    
+    Emails go out in batches of up to batch_size through
+    MailSource.send_many, which OutlookService runs as a single COM job,
+    and at most max_per_minute are sent in any rolling minute. A failed
+    email is retried after base_delay * 2 ** attempts seconds (capped at
+    max_delay, with jitter); after max_attempts it is marked 'Failed' and
+    its draft returns to the draft list. The queue lives in the database,
+    so emails queued before the app closed are sent on the next start;
+    emails that were mid-send are marked 'Failed' instead, as they may
+    already have gone out.
+    """
+    
+    def __init__(self, storage_service, mail_source, on_progress=None, batch_size=10,
+                 max_per_minute=30, max_attempts=5, base_delay=30, max_delay=3600, poll_interval=30):
+        self.storage_service = storage_service
+        self.mail_source = mail_source
+        self.on_progress = on_progress  # called with get_progress() after every change
+        self.batch_size = batch_size
+        self.max_per_minute = max_per_minute
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        
+        self._sent_times = deque()  # monotonic times of recent sends, for the rate limit
+        self._sent_count = 0
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start draining the outbox"""
+        if self._thread and self._thread.is_alive():
+            return True
+        
+        # Emails that were being sent when the app stopped may or may not have
+        # gone out; resending could duplicate them, so the user decides
+        self.storage_service.fail_interrupted_outbox()
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+        self._thread.start()
+        return True
+    
+    def send(self, messages):
+        """Queue emails and return their outbox ids without waiting for them to be sent
+        
+        messages are dicts with 'to_email', 'subject', 'body' and an
+        optional 'draft_id'.
+        """
+        outbox_ids = self.storage_service.enqueue_outbox(messages)
+        if outbox_ids:
+            self._report_progress()
+            self._wake_event.set()
+        return outbox_ids
+    
+    def retry_failed(self):
+        """Queue the emails that failed for good again"""
+        count = self.storage_service.requeue_outbox()
+        if count:
+            self._report_progress()
+            self._wake_event.set()
+        return count
+    
+    def get_progress(self):
+        """Get the outbox counts per status plus the number sent since start"""
+        counts = self.storage_service.get_outbox_counts()
+        return {
+            'queued': counts.get('Queued', 0) + counts.get('Sending', 0),
+            'failed': counts.get('Failed', 0),
+            'sent': self._sent_count
+        }
+    
+    def close(self, timeout=10):
+        """Stop after the batch in progress; queued emails stay in the outbox"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+        return True
+    
+    def _run(self):
+        """Sender thread main loop"""
+        while not self._stop_event.is_set():
+            try:
+                wait = self._send_batch()
+            except Exception as e:
+                logger.error(f"Error draining outbox: {str(e)}")
+                wait = self.poll_interval
+            
+            if wait > 0:
+                self._wake_event.wait(wait)
+                self._wake_event.clear()
+    
+    def _send_batch(self):
+        """Send one batch of due emails; returns seconds to wait before the next"""
+        allowed = self._rate_allowance()
+        if allowed <= 0:
+            return 60 - (time.monotonic() - self._sent_times[0])
+        
+        messages = self.storage_service.claim_outbox(min(self.batch_size, allowed))
+        if not messages:
+            due = self.storage_service.next_outbox_attempt()
+            if due is None:
+                return self.poll_interval
+            return min(self.poll_interval, max(0.5, (due - datetime.now()).total_seconds()))
+        
+        try:
+            results = self.mail_source.send_many(messages) or {}
+        except Exception as e:
+            # Nothing is known to have gone out; every claimed email backs off and retries
+            logger.error(f"Error sending outbox batch: {str(e)}")
+            results = {message['id']: str(e) for message in messages}
+        
+        sent_ids = []
+        retries = {}
+        failures = {}
+        for message in messages:
+            error = results.get(message['id'], "No result from mail source")
+            if error is None:
+                sent_ids.append(message['id'])
+            elif message['attempts'] + 1 >= self.max_attempts:
+                failures[message['id']] = error
+            else:
+                retries[message['id']] = (self._next_attempt(message['attempts']), error)
+        
+        now = time.monotonic()
+        self._sent_times.extend([now] * len(sent_ids))
+        self._sent_count += len(sent_ids)
+        
+        self.storage_service.finish_outbox(sent_ids, retries, failures)
+        self._report_progress()
+        
+        if failures:
+            logger.error(f"Giving up on {len(failures)} outbox emails")
+        return 0
+    
+    def _rate_allowance(self):
+        """Number of emails that may still be sent in the current rolling minute"""
+        cutoff = time.monotonic() - 60
+        while self._sent_times and self._sent_times[0] <= cutoff:
+            self._sent_times.popleft()
+        return self.max_per_minute - len(self._sent_times)
+    
+    def _next_attempt(self, attempts):
+        """Exponential backoff with jitter for a failed email"""
+        delay = min(self.max_delay, self.base_delay * 2 ** attempts)
+        return datetime.now() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+    
+    def _report_progress(self):
+        if self.on_progress:
+            try:
+                self.on_progress(self.get_progress())
+            except Exception as e:
+                logger.error(f"Error reporting outbox progress: {str(e)}")
@@ -1,37 +1,189 @@
 # services/outlook_service.py
-import win32com.client
-import pythoncom
 import logging
 import time
 import threading
 from datetime import datetime, timedelta
 import re
 import os
+import mimetypes
+
+from models.email_record import EmailRecord
+from services.mail_source import MailSource, spool_path
+from services.com_worker import ComWorker
+
+# pywin32 only exists on Windows; other platforms can still run against a
+# COM-shaped application object such as services.fake_outlook
+try:
+    import win32com.client
+except ImportError:
+    win32com = None
 
 logger = logging.getLogger(__name__)
 
-class OutlookService:
-    """Simplified service for interacting with Outlook"""
+# PR_HASATTACH; attachments have no built-in table column
+PR_HASATTACH = "http://schemas.microsoft.com/mapi/proptag/0x0E1B000B"
+
+# PR_ATTACH_MIME_TAG; only set on some attachments
+PR_ATTACH_MIME_TAG = "http://schemas.microsoft.com/mapi/proptag/0x370E001F"
+
+class OutlookService(MailSource):
+    """Simplified service for interacting with Outlook
+    
+    All COM calls run on a single worker thread that owns the Outlook
+    objects, so the public methods can be called from any thread. They block
+    until the job is done; submit() queues the same calls and returns a
+    Future instead. Identical reads, mark-as-read and archive requests that
+    are still waiting in the queue are merged into one job.
+    """
+    
+    # Methods whose identical queued calls share one job
+    COALESCED = {
+        'initialize', 'get_unread_emails', 'get_recent_emails', 'list_emails', 'get_folder_state',
+        'get_emails_by_ids', 'list_attachments',
+        'get_conversation_entries', 'get_thread_emails', 'mark_as_read', 'archive_email',
+        'mark_as_read_many', 'archive_many'
+    }
+    
+    # Columns the inbox list needs, read in bulk through Folder.GetTable
+    LIST_COLUMNS = [
+        'EntryID', 'Subject', 'SenderName', 'SenderEmailAddress', 'ReceivedTime',
+        'UnRead', 'ConversationID', 'LastModificationTime', PR_HASATTACH
+    ]
     
-    def __init__(self, config):
+    def __init__(self, config, application=None, store=None, folder=None):
         self.config = config
+        self._application = application
+        self.store = store    # display name of the store to read; the default store if None
+        self.folder = folder  # "/"-separated folder path in that store; its Inbox if None
         self.outlook = None
         self.namespace = None
         self.inbox = None
         self.drafts = None
         self.sent_items = None
+        self._archive_folder = None
+        self._store_id = None
         self._initialized = False
-        self._monitoring = False
-        self._monitor_thread = None
+        self._inbox_items = None
+        self._inbox_events = None
+        self._worker = ComWorker()
+    
+    def submit(self, method, *args, **kwargs):
+        """Queue a call of a public method (by name) on the COM thread and return its Future"""
+        key = self._job_key(method, args, kwargs)
+        return self._worker.submit(getattr(self, f"_{method}"), *args, key=key, **kwargs)
+    
+    def _call(self, method, *args, **kwargs):
+        """Run a method on the COM thread and wait for its result"""
+        key = self._job_key(method, args, kwargs)
+        return self._worker.call(getattr(self, f"_{method}"), *args, key=key, **kwargs)
+    
+    def _job_key(self, method, args, kwargs):
+        """Identify a request for coalescing, or None if it must always run
+        
+        known_versions only decides which emails come back as stubs, and any
+        caller's versions come from the same local store, so it is left out.
+        """
+        if method not in self.COALESCED:
+            return None
+        options = sorted((name, value) for name, value in kwargs.items() if name != 'known_versions')
+        return repr((method, args, options))
+    
+    def close(self):
+        """Finish queued jobs and release the COM thread"""
+        self.stop_monitoring()
+        return self._worker.stop()
     
     def initialize(self):
+        """Initialize connection to Outlook"""
+        return self._call('initialize')
+    
+    def get_unread_emails(self, limit=20, known_versions=None):
+        """Get unread emails from inbox"""
+        return self._call('get_unread_emails', limit=limit, known_versions=known_versions)
+    
+    def get_recent_emails(self, days=2, limit=50, known_versions=None):
+        """Get recent emails from inbox"""
+        return self._call('get_recent_emails', days=days, limit=limit, known_versions=known_versions)
+    
+    def list_emails(self, unread_only=False, days=2, limit=50, known_versions=None, since=None):
+        """Get inbox emails for the list view without their bodies"""
+        return self._call(
+            'list_emails', unread_only=unread_only, days=days, limit=limit,
+            known_versions=known_versions, since=since
+        )
+    
+    def get_folder_state(self, since=None, modified_since=None):
+        """Get the unread flag and modification stamp of inbox items"""
+        return self._call('get_folder_state', since=since, modified_since=modified_since)
+    
+    def get_emails_by_ids(self, entry_ids):
+        """Get emails by EntryID from any folder as a dict keyed by EntryID"""
+        return self._call('get_emails_by_ids', list(entry_ids or []))
+    
+    def get_conversation_entries(self, folder='sent', since=None, limit=500):
+        """List EntryID and ConversationID of a folder's items, newest first"""
+        return self._call('get_conversation_entries', folder=folder, since=since, limit=limit)
+    
+    def get_thread_emails(self, conversation_id, limit=10):
+        """Get all emails in a conversation thread"""
+        return self._call('get_thread_emails', conversation_id, limit=limit)
+    
+    def watch_inbox(self, on_change):
+        """Call on_change() from the COM thread when items arrive in the inbox"""
+        return self._call('watch_inbox', on_change)
+    
+    def unwatch_inbox(self):
+        """Stop the inbox ItemAdd subscription"""
+        return self._call('unwatch_inbox')
+    
+    def mark_as_read(self, email_id):
+        """Mark an email as read"""
+        return self._call('mark_as_read', email_id)
+    
+    def archive_email(self, email_id):
+        """Archive an email (move to Archive folder)"""
+        return self._call('archive_email', email_id)
+    
+    def mark_as_read_many(self, email_ids):
+        """Mark emails as read; returns EntryID -> success"""
+        return self._call('mark_as_read_many', list(email_ids))
+    
+    def archive_many(self, email_ids):
+        """Archive emails; returns EntryID -> success"""
+        return self._call('archive_many', list(email_ids))
+    
+    def list_attachments(self, email_id):
+        """List an email's attachments without opening their contents"""
+        return self._call('list_attachments', email_id)
+    
+    def save_attachment(self, email_id, index, path=None):
+        """Have Outlook write an attachment to disk; returns the path or None"""
+        return self._call('save_attachment', email_id, index, path=path)
+    
+    def send_email(self, draft_id=None, to_email=None, subject=None, body=None):
+        """Send an email, either from a draft ID or new information"""
+        return self._call('send_email', draft_id=draft_id, to_email=to_email, subject=subject, body=body)
+    
+    def send_many(self, messages):
+        """Send several new emails in one job; returns id -> None or an error message"""
+        return self._call('send_many', [dict(message) for message in messages])
+    
+    def create_draft(self, to_email, subject, body):
+        """Create a draft email"""
+        return self._call('create_draft', to_email, subject, body)
+    
+    def _initialize(self):
         """Initialize connection to Outlook"""
         try:
-            # Initialize COM
-            pythoncom.CoInitialize()
-            
-            # Connect to Outlook
-            self.outlook = win32com.client.Dispatch("Outlook.Application")
+            if self._application is not None:
+                self.outlook = self._application
+            else:
+                if win32com is None:
+                    logger.error("pywin32 is not installed; Outlook is only available on Windows")
+                    return False
+                
+                # Connect to Outlook
+                self.outlook = win32com.client.Dispatch("Outlook.Application")
             self.namespace = self.outlook.GetNamespace("MAPI")
             
             # Test connection
@@ -44,7 +196,7 @@ class OutlookService:
             
             # Try to access folders but don't fail if individual folders fail
             try:
-                self.inbox = self.namespace.GetDefaultFolder(6)  # 6 = olFolderInbox
+                self.inbox = self._open_inbox()
                 # Test access to items
                 test_count = self.inbox.Items.Count
                 logger.info(f"Accessed inbox with {test_count} items")
@@ -64,6 +216,10 @@ class OutlookService:
                 logger.error(f"Error accessing sent items folder: {str(e)}")
                 self.sent_items = None
             
+            # Folder handles of a previous connection are stale
+            self._archive_folder = None
+            self._store_id = None
+            
             # Success if we can at least access the inbox
             self._initialized = self.inbox is not None
             return self._initialized
@@ -72,14 +228,77 @@ class OutlookService:
             logger.error(f"Error connecting to Outlook: {str(e)}")
             return False
     
+    def _open_inbox(self):
+        """Open the folder read as the inbox: the default Inbox unless a store or folder is configured"""
+        if not self.store and not self.folder:
+            return self.namespace.GetDefaultFolder(6)  # 6 = olFolderInbox
+        
+        folder = self._store_root()
+        for name in (self.folder or "Inbox").split("/"):
+            folder = folder.Folders.Item(name)
+        return folder
+    
+    def _store_root(self):
+        """Get the root folder of the configured store"""
+        if self.store:
+            return self.namespace.Folders.Item(self.store)
+        return self.namespace.Folders.Item(1)
+    
     def _ensure_connection(self):
         """Ensure we have a connection to Outlook"""
         if not self._initialized:
-            return self.initialize()
+            return self._initialize()
         return True
     
-    def get_unread_emails(self, limit=20):
-        """Get unread emails from inbox"""
+    def is_connected(self):
+        """Check whether a connection to Outlook is currently established"""
+        return self._initialized
+    
+    def _item_to_email(self, item, unread=None, known_versions=None):
+        """Convert an Outlook mail item into an EmailRecord
+        
+        If the item's EntryID is in known_versions with the same modification
+        stamp, only the identifying fields are read and the result is marked
+        as cached so the caller can take the rest from the local store.
+        """
+        last_modified = None
+        try:
+            last_modified = item.LastModificationTime.strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            pass
+        
+        entry_id = item.EntryID
+        if unread is None:
+            unread = item.UnRead
+        
+        if known_versions and last_modified and known_versions.get(entry_id) == last_modified:
+            return {
+                'id': entry_id,
+                'unread': unread,
+                'last_modified': last_modified,
+                'cached': True
+            }
+        
+        record = EmailRecord(
+            id=entry_id,
+            subject=item.Subject or "(No Subject)",
+            sender=item.SenderName + " <" + item.SenderEmailAddress + ">",
+            to=item.To,
+            date=item.ReceivedTime.strftime("%a, %d %b %Y %H:%M:%S"),
+            unread=unread,
+            has_attachments=item.Attachments.Count > 0,
+            conversation_id=item.ConversationID if hasattr(item, 'ConversationID') else None,
+            last_modified=last_modified
+        )
+        record['body'] = item.Body
+        return record
+    
+    def _get_unread_emails(self, limit=20, known_versions=None):
+        """Get unread emails from inbox
+        
+        known_versions maps EntryID to the last modification stamp already
+        held locally; unchanged items are returned without their body.
+        """
         if not self._ensure_connection():
             return []
             
@@ -97,17 +316,7 @@ class OutlookService:
                     break
                     
                 try:
-                    email_data = {
-                        'id': item.EntryID,
-                        'subject': item.Subject or "(No Subject)",
-                        'from': item.SenderName + " <" + item.SenderEmailAddress + ">",
-                        'to': item.To,
-                        'date': item.ReceivedTime.strftime("%a, %d %b %Y %H:%M:%S"),
-                        'body': item.Body,
-                        'unread': True,
-                        'has_attachments': item.Attachments.Count > 0,
-                        'conversation_id': item.ConversationID if hasattr(item, 'ConversationID') else None
-                    }
+                    email_data = self._item_to_email(item, unread=True, known_versions=known_versions)
                     
                     emails.append(email_data)
                     count += 1
@@ -122,11 +331,14 @@ class OutlookService:
             logger.error(f"Error retrieving unread emails: {str(e)}")
             # Reset connection for next attempt
             self._initialized = False
-            pythoncom.CoUninitialize()
             return []
     
-    def get_recent_emails(self, days=2, limit=50):
-        """Get recent emails from inbox"""
+    def _get_recent_emails(self, days=2, limit=50, known_versions=None):
+        """Get recent emails from inbox
+        
+        known_versions maps EntryID to the last modification stamp already
+        held locally; unchanged items are returned without their body.
+        """
         if not self._ensure_connection():
             return []
             
@@ -148,17 +360,7 @@ class OutlookService:
                     break
                     
                 try:
-                    email_data = {
-                        'id': item.EntryID,
-                        'subject': item.Subject or "(No Subject)",
-                        'from': item.SenderName + " <" + item.SenderEmailAddress + ">",
-                        'to': item.To,
-                        'date': item.ReceivedTime.strftime("%a, %d %b %Y %H:%M:%S"),
-                        'body': item.Body,
-                        'unread': item.UnRead,
-                        'has_attachments': item.Attachments.Count > 0,
-                        'conversation_id': item.ConversationID if hasattr(item, 'ConversationID') else None
-                    }
+                    email_data = self._item_to_email(item, known_versions=known_versions)
                     
                     emails.append(email_data)
                     count += 1
@@ -175,13 +377,182 @@ class OutlookService:
             self._initialized = False
             return []
     
-    def get_thread_emails(self, conversation_id, limit=10):
+    def _list_emails(self, unread_only=False, days=2, limit=50, known_versions=None, since=None):
+        """Read the list view columns of inbox items in one table query
+        
+        Only LIST_COLUMNS are fetched, a whole page per COM call, instead of
+        opening every item and reading its properties one at a time. Falls
+        back to a full fetch if this Outlook cannot build the table.
+        """
+        if not self._ensure_connection():
+            return []
+        
+        if since:
+            days = (datetime.now() - since).total_seconds() / 86400
+        
+        if unread_only:
+            criteria = "[Unread]=True"
+        else:
+            date_filter = since or datetime.now() - timedelta(days=days)
+            criteria = f"[ReceivedTime] >= '{date_filter.strftime('%m/%d/%Y %H:%M %p')}'"
+        
+        try:
+            table = self.inbox.GetTable(criteria, 0)  # 0 = olUserItems
+            table.Columns.RemoveAll()
+            for column in self.LIST_COLUMNS:
+                table.Columns.Add(column)
+            table.Sort("[ReceivedTime]", True)  # Descending order
+        except Exception as e:
+            logger.warning(f"Table access unavailable, fetching full items: {str(e)}")
+            if unread_only:
+                return self._get_unread_emails(limit=limit, known_versions=known_versions)
+            return self._get_recent_emails(days=days, limit=limit, known_versions=known_versions)
+        
+        try:
+            rows = table.GetArray(limit) if not table.EndOfTable else ()
+            
+            emails = []
+            for row in rows or ():
+                try:
+                    emails.append(self._row_to_email(dict(zip(self.LIST_COLUMNS, row)), known_versions))
+                except Exception as e:
+                    logger.error(f"Error processing email row: {str(e)}")
+                    continue
+            
+            return emails
+            
+        except Exception as e:
+            logger.error(f"Error listing emails: {str(e)}")
+            # Reset connection for next attempt
+            self._initialized = False
+            return []
+    
+    def _get_folder_state(self, since=None, modified_since=None):
+        """Read EntryID, UnRead and LastModificationTime of inbox items in bulk"""
+        if not self._ensure_connection():
+            return None
+        
+        # A table takes a single restriction; received time is checked per row
+        if modified_since:
+            criteria = f"[LastModificationTime] >= '{modified_since.strftime('%m/%d/%Y %H:%M %p')}'"
+        elif since:
+            criteria = f"[ReceivedTime] >= '{since.strftime('%m/%d/%Y %H:%M %p')}'"
+        else:
+            criteria = ""
+        
+        columns = ['EntryID', 'UnRead', 'LastModificationTime', 'ReceivedTime']
+        
+        try:
+            table = self.inbox.GetTable(criteria, 0)  # 0 = olUserItems
+            table.Columns.RemoveAll()
+            for column in columns:
+                table.Columns.Add(column)
+            
+            state = {}
+            while not table.EndOfTable:
+                for entry_id, unread, modified, received in table.GetArray(500) or ():
+                    if since and modified_since and received.replace(tzinfo=None) < since:
+                        continue
+                    state[entry_id] = {
+                        'unread': bool(unread),
+                        'last_modified': modified.strftime("%Y-%m-%d %H:%M:%S")
+                    }
+            
+            return state
+            
+        except Exception as e:
+            logger.error(f"Error reading inbox state: {str(e)}")
+            return None
+    
+    def _row_to_email(self, row, known_versions=None):
+        """Convert a GetTable row into a bodiless EmailRecord"""
+        last_modified = None
+        try:
+            last_modified = row['LastModificationTime'].strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            pass
+        
+        entry_id = row['EntryID']
+        unread = bool(row['UnRead'])
+        
+        if known_versions and last_modified and known_versions.get(entry_id) == last_modified:
+            return {
+                'id': entry_id,
+                'unread': unread,
+                'last_modified': last_modified,
+                'cached': True
+            }
+        
+        return EmailRecord(
+            id=entry_id,
+            subject=row['Subject'] or "(No Subject)",
+            sender=(row['SenderName'] or "") + " <" + (row['SenderEmailAddress'] or "") + ">",
+            date=row['ReceivedTime'].strftime("%a, %d %b %Y %H:%M:%S"),
+            unread=unread,
+            has_attachments=bool(row[PR_HASATTACH]),
+            conversation_id=row['ConversationID'],
+            last_modified=last_modified,
+            partial=True
+        )
+    
+    def _get_emails_by_ids(self, entry_ids):
+        """Get emails by EntryID from any folder as a dict keyed by EntryID"""
+        if not entry_ids or not self._ensure_connection():
+            return {}
+        
+        emails = {}
+        for entry_id in entry_ids:
+            try:
+                item = self.namespace.GetItemFromID(entry_id)
+                emails[entry_id] = self._item_to_email(item)
+            except Exception as e:
+                # Deleted, or moved to another store
+                logger.debug(f"Could not open item {entry_id}: {str(e)}")
+        
+        return emails
+    
+    def _get_conversation_entries(self, folder='sent', since=None, limit=500):
+        """List EntryID and ConversationID of a folder's items, newest first"""
+        if not self._ensure_connection():
+            return []
+        
+        folder_obj = self.sent_items if folder == 'sent' else self.inbox
+        date_field = 'SentOn' if folder == 'sent' else 'ReceivedTime'
+        if not folder_obj:
+            return []
+        
+        try:
+            items = folder_obj.Items
+            if since:
+                items = items.Restrict(f"[{date_field}] >= '{since.strftime('%m/%d/%Y %H:%M %p')}'")
+            items.Sort(f"[{date_field}]", True)  # Descending order
+            
+            entries = []
+            for item in items:
+                if len(entries) >= limit:
+                    break
+                
+                try:
+                    entries.append({
+                        'id': item.EntryID,
+                        'conversation_id': item.ConversationID,
+                        'folder': folder,
+                        'date': getattr(item, date_field).strftime("%a, %d %b %Y %H:%M:%S")
+                    })
+                except Exception:
+                    continue
+            
+            return entries
+            
+        except Exception as e:
+            logger.error(f"Error listing {folder} conversations: {str(e)}")
+            return []
+    
+    def _get_thread_emails(self, conversation_id, limit=10):
         """Get all emails in a conversation thread - simpler approach"""
         if not conversation_id:
             return []
             
-        # Reinitialize COM for this operation
-        self._initialized = False
         if not self._ensure_connection():
             return []
             
@@ -237,14 +608,14 @@ class OutlookService:
                         except:
                             date_str = "(unknown date)"
                         
-                        email_data = {
-                            'id': item.EntryID,
-                            'subject': subject,
-                            'from': f"{sender_name} <{sender_email}>",
-                            'date': date_str,
-                            'body': item.Body,
-                            'folder': folder_name
-                        }
+                        email_data = EmailRecord(
+                            id=item.EntryID,
+                            subject=subject,
+                            sender=f"{sender_name} <{sender_email}>",
+                            date=date_str,
+                            folder=folder_name
+                        )
+                        email_data['body'] = item.Body
                         
                         thread_emails.append(email_data)
                         
@@ -273,63 +644,182 @@ class OutlookService:
                 pass
             
         return thread_emails
-
-
-    def start_monitoring(self, callback, root=None):
-        """Simplified monitoring - just do an initial refresh"""
-        logger.info("Email monitoring is disabled in this version for stability")
-        # You could implement a simpler version here if needed
-        return True
     
-    def mark_as_read(self, email_id):
-        """Mark an email as read"""
-        if not self._ensure_connection():
+    
+    def _watch_inbox(self, on_change):
+        """Subscribe to the inbox ItemAdd event on the COM thread"""
+        # The in-memory application has no event source
+        if win32com is None or self._application is not None or not self._ensure_connection():
             return False
-            
+        
+        class InboxEvents:
+            def OnItemAdd(self, item):
+                self.on_change()
+        
         try:
-            item = self.namespace.GetItemFromID(email_id)
-            item.UnRead = False
-            item.Save()
+            # The Items collection must stay referenced or its events stop
+            self._inbox_items = self.inbox.Items
+            self._inbox_events = win32com.client.WithEvents(self._inbox_items, InboxEvents)
+            self._inbox_events.on_change = on_change
             return True
-            
+        
         except Exception as e:
-            logger.error(f"Error marking email as read: {str(e)}")
+            logger.error(f"Error subscribing to inbox events: {str(e)}")
             return False
     
-    def archive_email(self, email_id):
-        """Archive an email (move to Archive folder)"""
+    def _unwatch_inbox(self):
+        """Drop the inbox event subscription"""
+        events = getattr(self, '_inbox_events', None)
+        if events is not None and hasattr(events, 'close'):
+            events.close()
+        self._inbox_events = None
+        self._inbox_items = None
+        return True
+    
+    def _mark_as_read(self, email_id):
+        """Mark an email as read"""
+        return self._mark_as_read_many([email_id]).get(email_id, False)
+    
+    def _mark_as_read_many(self, email_ids):
+        """Mark emails as read in one job; returns EntryID -> success"""
         if not self._ensure_connection():
-            return False
+            return {email_id: False for email_id in email_ids}
             
-        try:
-            item = self.namespace.GetItemFromID(email_id)
-            
-            # Find or create Archive folder
-            archive_folder = None
+        results = {}
+        for email_id, item in self._get_items(email_ids).items():
+            try:
+                if item is None:
+                    raise LookupError("item not found")
+                if item.UnRead:
+                    item.UnRead = False
+                    item.Save()
+                results[email_id] = True
+            except Exception as e:
+                logger.error(f"Error marking email as read: {str(e)}")
+                results[email_id] = False
             
+        return results
+    
+    def _archive_email(self, email_id):
+        """Archive an email (move to Archive folder)"""
+        return self._archive_many([email_id]).get(email_id, False)
+    
+    def _archive_many(self, email_ids):
+        """Move emails to the Archive folder in one job; returns EntryID -> success"""
+        if not self._ensure_connection():
+            return {email_id: False for email_id in email_ids}
+        
+        archive_folder = self._get_archive_folder()
+        if archive_folder is None:
+            return {email_id: False for email_id in email_ids}
+        
+        results = {}
+        for email_id, item in self._get_items(email_ids).items():
             try:
-                # Try to find existing Archive folder
-                for folder in self.namespace.Folders.Item(1).Folders:
-                    if folder.Name == "Archive":
-                        archive_folder = folder
-                        break
-                
-                # Create if not found
-                if not archive_folder:
-                    archive_folder = self.namespace.Folders.Item(1).Folders.Add("Archive")
+                if item is None:
+                    raise LookupError("item not found")
+                item.Move(archive_folder)
+                results[email_id] = True
             except Exception as e:
-                logger.error(f"Error finding/creating Archive folder: {str(e)}")
-                return False
+                logger.error(f"Error archiving email: {str(e)}")
+                results[email_id] = False
+        
+        return results
+    
+    def _get_items(self, email_ids):
+        """Open items by EntryID, looking only in the inbox's store; None where not found"""
+        if self._store_id is None:
+            try:
+                self._store_id = self.inbox.StoreID
+            except Exception:
+                self._store_id = ''
+        
+        items = {}
+        for email_id in email_ids:
+            try:
+                if self._store_id:
+                    items[email_id] = self.namespace.GetItemFromID(email_id, self._store_id)
+                else:
+                    items[email_id] = self.namespace.GetItemFromID(email_id)
+            except Exception as e:
+                logger.debug(f"Could not open item {email_id}: {str(e)}")
+                items[email_id] = None
+        return items
+    
+    def _list_attachments(self, email_id):
+        """Read the name, size and type of each attachment of an item"""
+        if not self._ensure_connection():
+            return []
             
-            # Move item
-            item.Move(archive_folder)
-            return True
+        try:
+            item = self._get_items([email_id])[email_id]
+            if item is None:
+                return []
+            
+            attachments = []
+            for position in range(item.Attachments.Count):
+                attachment = item.Attachments.Item(position + 1)
+                attachments.append(self._attachment_info(attachment, position))
+            return attachments
             
         except Exception as e:
-            logger.error(f"Error archiving email: {str(e)}")
-            return False
+            logger.error(f"Error listing attachments: {str(e)}")
+            return []
     
-    def send_email(self, draft_id=None, to_email=None, subject=None, body=None):
+    def _attachment_info(self, attachment, index):
+        """Describe an attachment; Size is Outlook's, which includes a little MAPI overhead"""
+        name = attachment.FileName
+        try:
+            content_type = attachment.PropertyAccessor.GetProperty(PR_ATTACH_MIME_TAG)
+        except Exception:
+            content_type = None
+        
+        return {
+            'index': index,
+            'name': name,
+            'size': attachment.Size,
+            'content_type': content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        }
+    
+    def _save_attachment(self, email_id, index, path=None):
+        """Save an attachment with SaveAsFile, which streams it to disk inside Outlook"""
+        if not self._ensure_connection():
+            return None
+        
+        try:
+            item = self._get_items([email_id])[email_id]
+            if item is None or not 0 <= index < item.Attachments.Count:
+                return None
+            
+            attachment = item.Attachments.Item(index + 1)
+            target = path or spool_path(attachment.FileName)
+            attachment.SaveAsFile(target)
+            return target
+        
+        except Exception as e:
+            logger.error(f"Error saving attachment: {str(e)}")
+            return None
+    
+    def _get_archive_folder(self):
+        """Find or create the Archive folder once per connection"""
+        if self._archive_folder is not None:
+            return self._archive_folder
+        
+        try:
+            root_folder = self._store_root()
+            for folder in root_folder.Folders:
+                if folder.Name == "Archive":
+                    self._archive_folder = folder
+                    break
+            else:
+                self._archive_folder = root_folder.Folders.Add("Archive")
+            return self._archive_folder
+        
+        except Exception as e:
+            logger.error(f"Error finding/creating Archive folder: {str(e)}")
+            return None
+    
+    def _send_email(self, draft_id=None, to_email=None, subject=None, body=None):
         """Send an email, either from a draft ID or new information"""
         if not self._ensure_connection():
             return False
@@ -353,7 +843,27 @@ class OutlookService:
             logger.error(f"Error sending email: {str(e)}")
             return False
     
-    def create_draft(self, to_email, subject, body):
+    def _send_many(self, messages):
+        """Create and send mail items for a batch of messages"""
+        if not self._ensure_connection():
+            return {message['id']: "Not connected to Outlook" for message in messages}
+        
+        results = {}
+        for message in messages:
+            try:
+                mail_item = self.outlook.CreateItem(0)  # 0 = olMailItem
+                mail_item.To = message['to_email']
+                mail_item.Subject = message.get('subject') or ''
+                mail_item.Body = message.get('body') or ''
+                mail_item.Send()
+                results[message['id']] = None
+            except Exception as e:
+                logger.error(f"Error sending email: {str(e)}")
+                results[message['id']] = str(e)
+        
+        return results
+    
+    def _create_draft(self, to_email, subject, body):
         """Create a draft email"""
         if not self._ensure_connection():
             return None
@@ -0,0 +1,134 @@
+# services/prefetcher.py
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class DetailPrefetcher:
+    """Loads the details of emails the user is likely to open next into an LRU cache
+    
+    loader(email) returns the details of an email (its thread history and
+    action items for the inbox), with the email as loaded, body included,
+    under 'email' when it worked on a copy. prefetch() replaces the list of
+    emails to warm, which one background thread works through in order, so
+    a stale prediction never delays a fresh one for long. At most capacity details
+    are kept; an entry is dropped when the email's last_modified changes or
+    when invalidate() is called for its conversation. Details of an email
+    whose body could not be fetched are returned but not cached.
+    """
+    
+    def __init__(self, loader, capacity=50):
+        self.loader = loader
+        self.capacity = capacity
+        
+        self._cache = OrderedDict()   # email id -> (last_modified, conversation_id, details)
+        self._inflight = {}           # email id -> Event set when its load finishes
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._run, name="detail-prefetch", daemon=True)
+        self._thread.start()
+    
+    def get(self, email):
+        """Get the cached details of an email, or None if they are not loaded yet"""
+        with self._lock:
+            entry = self._cache.get(email['id'])
+            if entry is None:
+                return None
+            
+            if entry[0] != email.get('last_modified'):
+                del self._cache[email['id']]
+                return None
+            
+            self._cache.move_to_end(email['id'])
+            return entry[2]
+    
+    def load(self, email):
+        """Get the details of an email, loading them now on a cache miss
+        
+        A load of the same email already running on the prefetch thread is
+        waited for rather than repeated.
+        """
+        while True:
+            details = self.get(email)
+            if details is not None:
+                return details
+            
+            with self._lock:
+                running = self._inflight.get(email['id'])
+                if running is None:
+                    self._inflight[email['id']] = threading.Event()
+            
+            if running is None:
+                return self._load(email)
+            running.wait()
+    
+    def prefetch(self, emails):
+        """Warm the cache with these emails, most likely to be opened first"""
+        with self._lock:
+            self._pending = [email for email in emails if email['id'] not in self._cache]
+        if self._pending:
+            self._wake_event.set()
+    
+    def invalidate(self, conversation_ids=None, email_ids=None):
+        """Drop cached details of whole conversations or single emails"""
+        conversation_ids = set(conversation_ids or [])
+        email_ids = set(email_ids or [])
+        with self._lock:
+            for entry_id in list(self._cache):
+                if entry_id in email_ids or self._cache[entry_id][1] in conversation_ids:
+                    del self._cache[entry_id]
+    
+    def clear(self):
+        """Drop all cached details and pending prefetches"""
+        with self._lock:
+            self._cache.clear()
+            self._pending = []
+    
+    def close(self):
+        """Stop the prefetch thread"""
+        self._closed = True
+        self._wake_event.set()
+    
+    def _load(self, email):
+        """Run the loader for an email this thread has claimed in _inflight"""
+        try:
+            details = self.loader(email)
+            loaded = details.get('email', email)
+            if loaded.get('partial'):
+                # The body could not be fetched (offline); try again next time
+                return details
+            
+            with self._lock:
+                # The loader may have fetched the body, which updates last_modified
+                self._cache[email['id']] = (loaded.get('last_modified'), loaded.get('conversation_id'), details)
+                self._cache.move_to_end(email['id'])
+                while len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
+            return details
+        finally:
+            with self._lock:
+                self._inflight.pop(email['id']).set()
+    
+    def _run(self):
+        """Prefetch thread main loop"""
+        while not self._closed:
+            self._wake_event.wait()
+            self._wake_event.clear()
+            
+            while not self._closed:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    email = self._pending.pop(0)
+                    if email['id'] in self._cache or email['id'] in self._inflight:
+                        continue
+                    self._inflight[email['id']] = threading.Event()
+                
+                try:
+                    self._load(email)
+                except Exception as e:
+                    logger.error(f"Error prefetching email details: {str(e)}")
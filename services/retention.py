@@ -0,0 +1,339 @@
+# services/retention.py
+import logging
+import pickle
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from services.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+class RetentionManager:
+    """Moves old rows out of the hot database into a compressed archive database
+    
+    Completed tasks past their retention period and drafts that were sent or
+    deleted are copied into the archive, and only the rows found there once
+    that copy is committed are removed from the hot database: a transaction
+    over an attached database is not atomic in WAL mode, so an interrupted
+    run leaves rows in both and the next run finishes the move. Large text
+    columns are zlib-compressed in the
+    archive. Old drafts that are still open keep only a preview of the
+    original email body, and cached messages past their retention period are
+    dropped since they can be fetched from Outlook again. Blob store segments
+    nothing refers to any more are deleted afterwards.
+    """
+    
+    DEFAULT_POLICY = {
+        'completed_task_days': 90,    # archive completed tasks this long after completion
+        'draft_body_days': 30,        # trim original email bodies of open drafts older than this
+        'message_cache_days': 60,     # drop cached messages received before this
+        'draft_preview_lines': 10     # lines of the original body kept in trimmed drafts
+    }
+    
+    # Draft statuses that are moved to the archive
+    ARCHIVED_DRAFT_STATUSES = ('Sent', 'Deleted')
+    
+    def __init__(self, db_file, archive_file=None):
+        self.db_file = Path(db_file)
+        self.archive_file = Path(archive_file) if archive_file else self.db_file.with_name("email_archive.db")
+        self.blob_store = BlobStore()
+    
+    def _connect(self):
+        """Open a connection with the archive database attached"""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        conn.execute('ATTACH DATABASE ? AS archive', (str(self.archive_file),))
+        self._init_archive(conn)
+        return conn
+    
+    def _init_archive(self, conn):
+        """Create the archive tables if needed"""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive.tasks (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            email_id TEXT,
+            email_from TEXT,
+            due_date TEXT,
+            priority TEXT,
+            status TEXT,
+            created_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
+        # original_email, response_text and formatted_email are zlib-compressed
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive.drafts (
+            id INTEGER PRIMARY KEY,
+            email_id TEXT,
+            original_email BLOB,
+            response_text BLOB,
+            formatted_email BLOB,
+            created_at TIMESTAMP,
+            status TEXT,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        conn.commit()
+    
+    def run(self, policy=None):
+        """Apply the retention policy; returns the number of rows affected per action"""
+        policy = dict(self.DEFAULT_POLICY, **(policy or {}))
+        conn = None
+        
+        try:
+            conn = self._connect()
+            
+            results = {
+                'tasks_archived': self._archive_tasks(conn, policy['completed_task_days']),
+                'drafts_archived': self._archive_drafts(conn),
+                'draft_bodies_trimmed': self._trim_draft_bodies(
+                    conn, policy['draft_body_days'], policy['draft_preview_lines']
+                ),
+                'messages_dropped': self._drop_cached_messages(conn, policy['message_cache_days'])
+            }
+            results['blobs_collected'] = self._collect_blobs(conn)
+            
+            # Hand the freed pages back to the file system (needs auto_vacuum = INCREMENTAL)
+            conn.execute('PRAGMA main.incremental_vacuum')
+            conn.commit()
+            
+            if any(results.values()):
+                logger.info(f"Retention policy applied: {results}")
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error applying retention policy: {str(e)}")
+            return None
+        
+        finally:
+            if conn:
+                conn.close()
+    
+    def _archive_tasks(self, conn, days):
+        """Move tasks completed more than the given number of days ago"""
+        condition = "status = 'Completed' AND completed_at < datetime('now', ?)"
+        params = (f'-{int(days)} days',)
+        
+        try:
+            conn.execute(f'''
+            INSERT OR IGNORE INTO archive.tasks
+                (id, text, email_id, email_from, due_date, priority, status, created_at, completed_at)
+            SELECT id, text, email_id, email_from, due_date, priority, status, created_at, completed_at
+            FROM main.tasks WHERE {condition}
+            ''', params)
+            conn.commit()
+            
+            # Row ids can be reused, so the archived copy must also match on creation time
+            moved = conn.execute(f'''
+            DELETE FROM main.tasks WHERE {condition} AND EXISTS (
+                SELECT 1 FROM archive.tasks AS archived
+                WHERE archived.id = main.tasks.id AND archived.created_at IS main.tasks.created_at
+            )
+            ''', params).rowcount
+            conn.commit()
+            return moved
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def _archive_drafts(self, conn):
+        """Move sent and deleted drafts"""
+        placeholders = ','.join('?' * len(self.ARCHIVED_DRAFT_STATUSES))
+        cursor = conn.cursor()
+        
+        try:
+            rows = cursor.execute(f'''
+            SELECT id, email_id, original_email, response_text, formatted_email, created_at, status, body_key
+            FROM main.drafts WHERE status IN ({placeholders})
+            ''', self.ARCHIVED_DRAFT_STATUSES).fetchall()
+            
+            # The archive is self-contained, so bodies go back into the original email
+            bodies = self.blob_store.get_many(cursor, [row[7] for row in rows])
+            
+            archived = []
+            for draft_id, email_id, blob, response_text, formatted_email, created_at, status, body_key in rows:
+                if body_key:
+                    try:
+                        original_email = pickle.loads(blob)
+                        original_email['body'] = bodies.get(body_key, '')
+                        blob = pickle.dumps(original_email)
+                    except Exception:
+                        pass
+                
+                archived.append((
+                    draft_id, email_id, _compress(blob), _compress(response_text),
+                    _compress(formatted_email), created_at, status
+                ))
+            
+            cursor.executemany('''
+            INSERT OR IGNORE INTO archive.drafts
+                (id, email_id, original_email, response_text, formatted_email, created_at, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', archived)
+            conn.commit()
+            
+            moved = 0
+            for draft_id, created_at, body_key in [(row[0], row[5], row[7]) for row in rows]:
+                # Row ids can be reused, so the archived copy must also match on creation time
+                confirmed = cursor.execute(
+                    'SELECT 1 FROM archive.drafts WHERE id = ? AND created_at IS ?', (draft_id, created_at)
+                ).fetchone()
+                if not confirmed:
+                    continue
+                
+                deleted = cursor.execute(
+                    f'DELETE FROM main.drafts WHERE id = ? AND status IN ({placeholders})',
+                    (draft_id,) + self.ARCHIVED_DRAFT_STATUSES
+                ).rowcount
+                if deleted and body_key:
+                    self.blob_store.release(cursor, body_key)
+                moved += deleted
+            conn.commit()
+            return moved
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def _trim_draft_bodies(self, conn, days, preview_lines):
+        """Replace the original email body of old open drafts with a short preview"""
+        cursor = conn.cursor()
+        rows = cursor.execute('''
+        SELECT id, original_email, body_key FROM main.drafts
+        WHERE status = 'Draft' AND created_at < datetime('now', ?)
+        ''', (f'-{int(days)} days',)).fetchall()
+        
+        bodies = self.blob_store.get_many(cursor, [row[2] for row in rows])
+        
+        updates = []
+        released = []
+        for draft_id, blob, body_key in rows:
+            try:
+                original_email = pickle.loads(blob)
+            except Exception:
+                continue
+            
+            if not isinstance(original_email, dict) or original_email.get('body_trimmed'):
+                continue
+            
+            body = bodies.get(body_key, '') if body_key else original_email.get('body') or ''
+            original_email['body'] = '\n'.join(body.split('\n')[:preview_lines])
+            original_email['body_trimmed'] = True
+            # The preview lives in the pickle; an empty key means no blob store body
+            updates.append((pickle.dumps(original_email), draft_id))
+            released.append(body_key)
+        
+        try:
+            for body_key in released:
+                self.blob_store.release(cursor, body_key)
+            cursor.executemany(
+                "UPDATE main.drafts SET original_email = ?, body_key = '' WHERE id = ?", updates
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        return len(updates)
+    
+    def _drop_cached_messages(self, conn, days):
+        """Remove cached messages received more than the given number of days ago"""
+        # received_at holds ISO timestamps written by StorageService.save_messages
+        cutoff = (datetime.now() - timedelta(days=int(days))).isoformat()
+        
+        condition = "received_at != '' AND received_at < ?"
+        cursor = conn.cursor()
+        
+        try:
+            keys = cursor.execute(
+                f'SELECT body_key FROM main.messages WHERE {condition}', (cutoff,)
+            ).fetchall()
+            for (body_key,) in keys:
+                self.blob_store.release(cursor, body_key)
+            dropped = cursor.execute(f'DELETE FROM main.messages WHERE {condition}', (cutoff,)).rowcount
+            conn.commit()
+            return dropped
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def _collect_blobs(self, conn):
+        """Delete blob store segments without references"""
+        try:
+            collected = self.blob_store.collect_garbage(conn.cursor())
+            conn.commit()
+            return collected
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def get_archived_drafts(self, limit=50):
+        """Get archived drafts, newest first, with their columns decompressed"""
+        conn = None
+        
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            
+            drafts = []
+            for row in conn.execute('SELECT * FROM archive.drafts ORDER BY id DESC LIMIT ?', (limit,)):
+                draft = dict(row)
+                for column in ('response_text', 'formatted_email'):
+                    text = _decompress(draft[column])
+                    draft[column] = text.decode('utf-8') if text is not None else ''
+                try:
+                    draft['original_email'] = pickle.loads(_decompress(draft['original_email']))
+                except Exception:
+                    draft['original_email'] = {}
+                drafts.append(draft)
+            
+            return drafts
+        
+        except Exception as e:
+            logger.error(f"Error getting archived drafts: {str(e)}")
+            return []
+        
+        finally:
+            if conn:
+                conn.close()
+    
+    def get_archived_tasks(self, limit=100):
+        """Get archived tasks, most recently completed first"""
+        conn = None
+        
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            
+            return [
+                dict(row) for row in conn.execute(
+                    'SELECT * FROM archive.tasks ORDER BY completed_at DESC LIMIT ?', (limit,)
+                )
+            ]
+        
+        except Exception as e:
+            logger.error(f"Error getting archived tasks: {str(e)}")
+            return []
+        
+        finally:
+            if conn:
+                conn.close()
+
+def _compress(value):
+    """zlib-compress a text or blob value"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return zlib.compress(value, 6)
+
+def _decompress(value):
+    """Reverse _compress, returning bytes"""
+    if value is None:
+        return None
+    return zlib.decompress(value)
@@ -1,15 +1,31 @@
-import json
 import os
 import logging
 from pathlib import Path
 import sqlite3
 import pickle
+import hashlib
+import threading
+from datetime import datetime
+from functools import partial
+
+from services.migrations import MigrationRunner
+from services.db_maintenance import DatabaseMaintenance
+from services.retention import RetentionManager
+from services.blob_store import BlobStore
+from services.config_store import ConfigStore
+from models.email_record import EmailRecord
 
 logger = logging.getLogger(__name__)
 
 class StorageService:
     """Service for handling local storage of settings and data"""
     
+    # Tables whose changes are recorded in the change log
+    TRACKED_TABLES = ('tasks', 'drafts')
+    
+    # Number of change log entries kept before old ones are pruned
+    CHANGE_LOG_LIMIT = 5000
+    
     def __init__(self, config_dir=None):
         if config_dir is None:
             self.config_dir = Path.home() / ".email_agent_ollama"
@@ -18,43 +34,95 @@ class StorageService:
         
         self.config_file = self.config_dir / "settings.json"
         self.db_file = self.config_dir / "email_data.db"
+        self.archive_file = self.config_dir / "email_archive.db"
         
         # Create config directory if it doesn't exist
         self.config_dir.mkdir(exist_ok=True)
         
+        self.config_store = ConfigStore(self.config_file)
+        
+        # In-process listeners notified after tracked tables change
+        self._change_listeners = []
+        self._listeners_lock = threading.Lock()
+        
+        # Email bodies are stored once in the shared blob store
+        self.blob_store = BlobStore()
+        
         # Initialize the database
+        self.migration_runner = MigrationRunner(self.db_file)
         self._init_database()
+        self.prune_change_log()
+        
+        self.retention = RetentionManager(self.db_file, self.archive_file)
     
     def config_exists(self):
         """Check if configuration file exists"""
-        return self.config_file.exists()
+        return self.config_store.exists()
     
     def load_config(self):
-        """Load configuration from file"""
+        """Load configuration, re-reading the file only when it changed on disk"""
         try:
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-            return config
+            return self.config_store.load()
         except Exception as e:
             logger.error(f"Error loading configuration: {str(e)}")
             return None
     
     def save_config(self, config):
-        """Save configuration to file"""
+        """Save configuration atomically and notify subscribers of changed sections"""
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
+            self.config_store.save(config)
             return True
         except Exception as e:
             logger.error(f"Error saving configuration: {str(e)}")
             return False
     
+    def subscribe_config(self, section, callback):
+        """Call callback(section_config) whenever a configuration section changes"""
+        self.config_store.subscribe(section, callback)
+    
+    def unsubscribe_config(self, section, callback):
+        """Stop calling a configuration section subscriber"""
+        self.config_store.unsubscribe(section, callback)
+    
+    def start_background_maintenance(self, retention_policy=None):
+        """Run background migration steps, retention and scheduled maintenance off the UI thread"""
+        maintenance = DatabaseMaintenance(self.db_file)
+        
+        def on_complete():
+            self.apply_retention(retention_policy)
+            maintenance.run_scheduled()
+        
+        return self.migration_runner.start_background(on_complete=on_complete)
+    
+    def apply_retention(self, policy=None):
+        """Archive old tasks and drafts and compact the database, see RetentionManager"""
+        results = self.retention.run(policy)
+        
+        if results:
+            if results['tasks_archived']:
+                self._notify_change('tasks')
+            if results['drafts_archived'] or results['draft_bodies_trimmed']:
+                self._notify_change('drafts')
+        
+        return results
+    
+    def stop_background_maintenance(self):
+        """Stop background migration work after its current chunk"""
+        self.migration_runner.stop_background()
+    
+    def run_shutdown_maintenance(self):
+        """VACUUM the database if it is due, once nothing else is using it"""
+        return DatabaseMaintenance(self.db_file).vacuum_if_due()
+    
     def _init_database(self):
         """Initialize the SQLite database"""
         try:
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
             
+            # Lets retention hand freed pages back; only takes effect on a new database
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            
             # Create tasks table
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS tasks (
@@ -94,7 +162,10 @@ class StorageService:
             conn.commit()
             conn.close()
             
-            logger.info("Database initialized")
+            # Bring older databases up to the current schema
+            version = self.migration_runner.migrate()
+            
+            logger.info(f"Database initialized (schema version {version})")
             return True
             
         except Exception as e:
@@ -107,22 +178,11 @@ class StorageService:
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
             
-            cursor.execute('''
-            INSERT INTO tasks (text, email_id, email_from, due_date, priority, status)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                task_data.get('text', ''),
-                task_data.get('email_id', ''),
-                task_data.get('email_from', ''),
-                task_data.get('due_date', ''),
-                task_data.get('priority', 'Medium'),
-                task_data.get('status', 'Not Started')
-            ))
-            
-            task_id = cursor.lastrowid
+            task_id = self._insert_task(cursor, task_data)
             
             conn.commit()
             conn.close()
+            self._notify_change('tasks')
             
             return task_id
             
@@ -156,41 +216,375 @@ class StorageService:
         except Exception as e:
             logger.error(f"Error getting tasks: {str(e)}")
             return []
+    
+    def iter_tasks(self, status=None, after=None, limit=None, page_size=200):
+        """Iterate tasks in due date order using keyset pagination
+        
+        after is the last task returned by a previous call; iteration resumes
+        right behind it. If limit is given at most that many tasks are
+        yielded, otherwise all remaining tasks are streamed page by page.
+        """
+        cursor_key = None
+        if after:
+            cursor_key = (after.get('due_date') or '', after.get('id'))
+        
+        remaining = limit
+        conn = None
+        
+        try:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            while remaining is None or remaining > 0:
+                fetch = page_size if remaining is None else min(page_size, remaining)
+                
+                conditions = []
+                params = []
+                if status:
+                    conditions.append('status = ?')
+                    params.append(status)
+                if cursor_key:
+                    conditions.append("(COALESCE(due_date, '') > ? OR (COALESCE(due_date, '') = ? AND id > ?))")
+                    params.extend([cursor_key[0], cursor_key[0], cursor_key[1]])
+                
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+                cursor.execute(
+                    f"SELECT * FROM tasks {where} ORDER BY COALESCE(due_date, ''), id LIMIT ?",
+                    (*params, fetch)
+                )
+                rows = cursor.fetchall()
+                
+                for row in rows:
+                    yield dict(row)
+                
+                if len(rows) < fetch:
+                    break
+                
+                cursor_key = (rows[-1]['due_date'] or '', rows[-1]['id'])
+                if remaining is not None:
+                    remaining -= len(rows)
+            
+        except Exception as e:
+            logger.error(f"Error iterating tasks: {str(e)}")
+            
+        finally:
+            if conn:
+                conn.close()
+    
+    def count_tasks(self, status=None):
+        """Count tasks, optionally filtered by status"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            if status:
+                cursor.execute('SELECT COUNT(*) FROM tasks WHERE status = ?', (status,))
+            else:
+                cursor.execute('SELECT COUNT(*) FROM tasks')
+            
+            count = cursor.fetchone()[0]
+            
+            conn.close()
+            
+            return count
+            
+        except Exception as e:
+            logger.error(f"Error counting tasks: {str(e)}")
+            return 0
+    
     def delete_draft(self, draft_id):
-        """Delete a draft response from the database"""
+        """Mark a draft response as deleted; retention moves it to the archive"""
+        return self._set_draft_status(draft_id, 'Deleted')
+    
+    def mark_draft_sent(self, draft_id):
+        """Mark a draft response as sent; retention moves it to the archive"""
+        return self._set_draft_status(draft_id, 'Sent')
+    
+    def _set_draft_status(self, draft_id, status):
+        """Change the status of a draft"""
         try:
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
         
-            cursor.execute('DELETE FROM drafts WHERE id = ?', (draft_id,))
+            cursor.execute('UPDATE drafts SET status = ? WHERE id = ?', (status, draft_id))
         
             conn.commit()
             conn.close()
+            self._notify_change('drafts')
             return True
         except Exception as e:
-            logger.error(f"Error deleting draft: {str(e)}")    
+            logger.error(f"Error updating draft status: {str(e)}")    
             return False
         
+    def delete_all_drafts(self):
+        """Mark all open draft responses as deleted"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute("UPDATE drafts SET status = 'Deleted' WHERE status = 'Draft'")
+            
+            conn.commit()
+            conn.close()
+            self._notify_change('drafts')
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting drafts: {str(e)}")
+            return False
+    
+    def enqueue_outbox(self, messages):
+        """Queue emails for the outbox worker; returns their outbox ids
+        
+        messages are dicts with 'to_email', 'subject', 'body' and an
+        optional 'draft_id'. Queued drafts leave the draft list in the same
+        transaction.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            outbox_ids = []
+            for message in messages:
+                cursor.execute('''
+                INSERT INTO outbox (draft_id, to_email, subject, body)
+                VALUES (?, ?, ?, ?)
+                ''', (
+                    message.get('draft_id'),
+                    message['to_email'],
+                    message.get('subject', ''),
+                    message.get('body', '')
+                ))
+                outbox_ids.append(cursor.lastrowid)
+                
+                if message.get('draft_id'):
+                    cursor.execute(
+                        "UPDATE drafts SET status = 'Queued' WHERE id = ? AND status = 'Draft'",
+                        (message['draft_id'],)
+                    )
+                    # An earlier failed attempt must not be retried alongside this one
+                    cursor.execute(
+                        "UPDATE outbox SET status = 'Cancelled' WHERE draft_id = ? AND status = 'Failed' AND id != ?",
+                        (message['draft_id'], outbox_ids[-1])
+                    )
+            
+            conn.commit()
+            conn.close()
+            
+            if any(message.get('draft_id') for message in messages):
+                self._notify_change('drafts')
+            
+            return outbox_ids
+            
+        except Exception as e:
+            logger.error(f"Error queueing emails: {str(e)}")
+            return []
+    
+    def claim_outbox(self, limit=10):
+        """Mark up to limit due outbox emails as sending and return them, oldest first"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT * FROM outbox
+            WHERE status = 'Queued' AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+            ORDER BY id LIMIT ?
+            ''', (datetime.now().isoformat(), limit))
+            messages = [dict(row) for row in cursor.fetchall()]
+            
+            cursor.executemany(
+                "UPDATE outbox SET status = 'Sending' WHERE id = ?",
+                [(message['id'],) for message in messages]
+            )
+            
+            conn.commit()
+            conn.close()
+            
+            return messages
+            
+        except Exception as e:
+            logger.error(f"Error claiming outbox emails: {str(e)}")
+            return []
+    
+    def finish_outbox(self, sent_ids=(), retries=None, failures=None):
+        """Record the outcome of a send batch in one transaction
+        
+        retries maps outbox id -> (next attempt datetime, error) and
+        failures maps outbox id -> error. Drafts of sent emails become
+        'Sent'; drafts of emails that failed for good return to the list.
+        """
+        retries = retries or {}
+        failures = failures or {}
+        
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            now = datetime.now().isoformat()
+            cursor.executemany('''
+            UPDATE outbox SET status = 'Sent', attempts = attempts + 1, sent_at = ?, last_error = NULL
+            WHERE id = ?
+            ''', [(now, outbox_id) for outbox_id in sent_ids])
+            cursor.executemany('''
+            UPDATE drafts SET status = 'Sent'
+            WHERE id = (SELECT draft_id FROM outbox WHERE id = ?)
+            ''', [(outbox_id,) for outbox_id in sent_ids])
+            
+            cursor.executemany('''
+            UPDATE outbox SET status = 'Queued', attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+            WHERE id = ?
+            ''', [(when.isoformat(), error, outbox_id) for outbox_id, (when, error) in retries.items()])
+            
+            cursor.executemany('''
+            UPDATE outbox SET status = 'Failed', attempts = attempts + 1, last_error = ?
+            WHERE id = ?
+            ''', [(error, outbox_id) for outbox_id, error in failures.items()])
+            cursor.executemany('''
+            UPDATE drafts SET status = 'Draft'
+            WHERE id = (SELECT draft_id FROM outbox WHERE id = ?) AND status = 'Queued'
+            ''', [(outbox_id,) for outbox_id in failures])
+            
+            conn.commit()
+            conn.close()
+            
+            if sent_ids or failures:
+                self._notify_change('drafts')
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error recording outbox results: {str(e)}")
+            return False
+    
+    def requeue_outbox(self):
+        """Put failed emails back in the queue with their attempts reset"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            UPDATE drafts SET status = 'Queued'
+            WHERE status = 'Draft' AND id IN (SELECT draft_id FROM outbox WHERE status = 'Failed')
+            ''')
+            
+            cursor.execute('''
+            UPDATE outbox SET status = 'Queued', next_attempt_at = NULL, attempts = 0
+            WHERE status = 'Failed'
+            ''')
+            count = cursor.rowcount
+            
+            conn.commit()
+            conn.close()
+            
+            self._notify_change('drafts')
+            
+            return count
+        
+        except Exception as e:
+            logger.error(f"Error requeueing outbox emails: {str(e)}")
+            return 0
+    
+    def fail_interrupted_outbox(self):
+        """Mark emails left in 'Sending' by a stopped app as failed with an unknown outcome
+        
+        They may have been sent before the app stopped, so they are not
+        resent automatically; their drafts return to the list and Retry
+        Failed sends them again.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            UPDATE drafts SET status = 'Draft'
+            WHERE status = 'Queued' AND id IN (SELECT draft_id FROM outbox WHERE status = 'Sending')
+            ''')
+            
+            cursor.execute('''
+            UPDATE outbox SET status = 'Failed',
+                last_error = 'Outcome unknown: the app stopped while sending; check Sent Items before retrying'
+            WHERE status = 'Sending'
+            ''')
+            count = cursor.rowcount
+            
+            conn.commit()
+            conn.close()
+            
+            if count:
+                self._notify_change('drafts')
+            
+            return count
+            
+        except Exception as e:
+            logger.error(f"Error failing interrupted outbox emails: {str(e)}")
+            return 0
+    
+    def get_outbox_counts(self):
+        """Get the number of outbox emails per status"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status')
+            counts = dict(cursor.fetchall())
+            
+            conn.close()
+            
+            return counts
+            
+        except Exception as e:
+            logger.error(f"Error counting outbox emails: {str(e)}")
+            return {}
+    
+    def next_outbox_attempt(self):
+        """Get when the next queued outbox email is due, or None if the queue is empty"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT MIN(COALESCE(next_attempt_at, '')), COUNT(*) FROM outbox WHERE status = 'Queued'
+            ''')
+            due, count = cursor.fetchone()
+            
+            conn.close()
+            
+            if not count:
+                return None
+            return datetime.fromisoformat(due) if due else datetime.now()
+            
+        except Exception as e:
+            logger.error(f"Error reading outbox schedule: {str(e)}")
+            return None
+    
     def save_draft(self, draft_data):
         """Save a draft response to the database"""
         try:
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
             
+            # The body goes to the blob store, the rest of the email is pickled
+            original_email = dict(draft_data.get('original_email', {}))
+            body_key = self.blob_store.put(cursor, original_email.pop('body', ''))
+            
             cursor.execute('''
-            INSERT INTO drafts (email_id, original_email, response_text, formatted_email)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO drafts (email_id, original_email, response_text, formatted_email, body_key)
+            VALUES (?, ?, ?, ?, ?)
             ''', (
                 draft_data.get('email_id', ''),
-                pickle.dumps(draft_data.get('original_email', {})),
+                pickle.dumps(original_email),
                 draft_data.get('response_text', ''),
-                draft_data.get('formatted_email', '')
+                draft_data.get('formatted_email', ''),
+                body_key
             ))
             
             draft_id = cursor.lastrowid
             
             conn.commit()
             conn.close()
+            self._notify_change('drafts')
             
             return draft_id
             
@@ -198,25 +592,37 @@ class StorageService:
             logger.error(f"Error saving draft: {str(e)}")
             return None
     
+    def _row_to_draft(self, row, bodies):
+        """Convert a drafts row into a dict with the original email unpickled"""
+        draft = dict(row)
+        try:
+            draft['original_email'] = pickle.loads(draft['original_email'])
+        except:
+            draft['original_email'] = {}
+        
+        # Bodies live in the blob store; trimmed drafts keep a preview in the pickle
+        body_key = draft.pop('body_key', None)
+        if body_key:
+            draft['original_email']['body'] = bodies.get(body_key, '')
+        return draft
+    
+    def _rows_to_drafts(self, cursor, rows):
+        """Convert drafts rows, loading their bodies from the blob store in one query"""
+        bodies = self.blob_store.get_many(cursor, [row['body_key'] for row in rows])
+        return [self._row_to_draft(row, bodies) for row in rows]
+    
     def get_drafts(self):
-        """Get all draft responses from the database"""
+        """Get all open draft responses from the database"""
         try:
             conn = sqlite3.connect(self.db_file)
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            cursor.execute('SELECT * FROM drafts ORDER BY created_at DESC')
+            cursor.execute("SELECT * FROM drafts WHERE status = 'Draft' ORDER BY created_at DESC")
             
             rows = cursor.fetchall()
             
-            drafts = []
-            for row in rows:
-                draft = dict(row)
-                try:
-                    draft['original_email'] = pickle.loads(draft['original_email'])
-                except:
-                    draft['original_email'] = {}
-                drafts.append(draft)
+            drafts = self._rows_to_drafts(cursor, rows)
             
             conn.close()
             
@@ -226,6 +632,72 @@ class StorageService:
             logger.error(f"Error getting drafts: {str(e)}")
             return []
     
+    def iter_drafts(self, after=None, limit=None, page_size=100):
+        """Iterate open drafts newest first using keyset pagination
+        
+        after is the last draft returned by a previous call; iteration resumes
+        right behind it. If limit is given at most that many drafts are
+        yielded, otherwise all remaining drafts are streamed page by page.
+        """
+        last_id = after.get('id') if after else None
+        remaining = limit
+        conn = None
+        
+        try:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            while remaining is None or remaining > 0:
+                fetch = page_size if remaining is None else min(page_size, remaining)
+                
+                # Ids are assigned in insertion order, so they follow created_at
+                if last_id is None:
+                    cursor.execute(
+                        "SELECT * FROM drafts WHERE status = 'Draft' ORDER BY id DESC LIMIT ?",
+                        (fetch,)
+                    )
+                else:
+                    cursor.execute(
+                        "SELECT * FROM drafts WHERE status = 'Draft' AND id < ? ORDER BY id DESC LIMIT ?",
+                        (last_id, fetch)
+                    )
+                rows = cursor.fetchall()
+                
+                for draft in self._rows_to_drafts(cursor, rows):
+                    yield draft
+                
+                if len(rows) < fetch:
+                    break
+                
+                last_id = rows[-1]['id']
+                if remaining is not None:
+                    remaining -= len(rows)
+            
+        except Exception as e:
+            logger.error(f"Error iterating drafts: {str(e)}")
+            
+        finally:
+            if conn:
+                conn.close()
+    
+    def count_drafts(self):
+        """Count open draft responses"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT COUNT(*) FROM drafts WHERE status = 'Draft'")
+            count = cursor.fetchone()[0]
+            
+            conn.close()
+            
+            return count
+            
+        except Exception as e:
+            logger.error(f"Error counting drafts: {str(e)}")
+            return 0
+    
     def save_style_sample(self, sample_id, text):
         """Save a style sample to the database"""
         try:
@@ -300,20 +772,11 @@ class StorageService:
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
 
-            cursor.execute('''
-            UPDATE tasks
-            SET text = ?, due_date = ?, priority = ?, status = ?
-            WHERE id = ?
-            ''', (
-                task_data.get('text', ''),
-                task_data.get('due_date', ''),
-                task_data.get('priority', 'Medium'),
-                task_data.get('status', ''),
-                task_id
-            ))
+            self._update_task_row(cursor, task_id, task_data)
 
             conn.commit()
             conn.close()
+            self._notify_change('tasks')
 
             return True
 
@@ -327,16 +790,96 @@ class StorageService:
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
         
-            cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+            self._delete_task_row(cursor, task_id)
         
             conn.commit()
             conn.close()
+            self._notify_change('tasks')
         
             return True
         
         except Exception as e:
             logger.error(f"Error deleting task: {str(e)}")
             return False
+    
+    def _insert_task(self, cursor, task_data):
+        """Insert a task row and return its id"""
+        cursor.execute('''
+        INSERT INTO tasks (text, email_id, email_from, due_date, priority, status)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            task_data.get('text', ''),
+            task_data.get('email_id', ''),
+            task_data.get('email_from', ''),
+            task_data.get('due_date', ''),
+            task_data.get('priority', 'Medium'),
+            task_data.get('status', 'Not Started')
+        ))
+        return cursor.lastrowid
+    
+    def _update_task_row(self, cursor, task_id, task_data):
+        """Update the editable fields of a task row"""
+        cursor.execute('''
+        UPDATE tasks
+        SET text = ?, due_date = ?, priority = ?, status = ?
+        WHERE id = ?
+        ''', (
+            task_data.get('text', ''),
+            task_data.get('due_date', ''),
+            task_data.get('priority', 'Medium'),
+            task_data.get('status', ''),
+            task_id
+        ))
+    
+    def _delete_task_row(self, cursor, task_id):
+        """Delete a task row"""
+        cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+    
+    def apply_task_writes(self, operations, on_committed=None):
+        """Apply a batch of task writes in a single transaction
+        
+        operations is a list of ('save', task_data), ('update', task_id, task_data)
+        or ('delete', task_id) tuples. Returns the per-operation results (the new
+        id for saves, True for updates and deletes), or None if the batch was
+        rolled back. on_committed(results) is called after the commit and before
+        change listeners are notified.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            results = []
+            try:
+                for operation in operations:
+                    kind = operation[0]
+                    if kind == 'save':
+                        results.append(self._insert_task(cursor, operation[1]))
+                    elif kind == 'update':
+                        self._update_task_row(cursor, operation[1], operation[2])
+                        results.append(True)
+                    elif kind == 'delete':
+                        self._delete_task_row(cursor, operation[1])
+                        results.append(True)
+                    else:
+                        raise ValueError(f"Unknown task operation: {kind}")
+                
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            
+            if on_committed:
+                on_committed(results)
+            self._notify_change('tasks')
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error applying task writes: {str(e)}")
+            return None
+    
     def delete_style_sample(self, sample_id):
         """Delete a style sample from the database"""
         try:
@@ -352,4 +895,676 @@ class StorageService:
             
         except Exception as e:
             logger.error(f"Error deleting style sample: {str(e)}")
+            return False
+    
+    def _message_content_hash(self, email_data):
+        """Compute a stable hash of the content fields of an email"""
+        content = "\x1f".join([
+            email_data.get('subject', '') or '',
+            email_data.get('from', '') or '',
+            email_data.get('to', '') or '',
+            email_data.get('body', '') or ''
+        ])
+        return hashlib.sha256(content.encode('utf-8', errors='replace')).hexdigest()
+    
+    def _sortable_date(self, date_str):
+        """Convert the display date used by OutlookService into an ISO timestamp"""
+        try:
+            return datetime.strptime(date_str, "%a, %d %b %Y %H:%M:%S").isoformat()
+        except Exception:
+            return date_str or ''
+    
+    def _row_to_message(self, row):
+        """Convert a messages row into the EmailRecord used by the UI
+        
+        The body stays in the blob store until it is first read.
+        """
+        message = EmailRecord(
+            id=row['entry_id'],
+            subject=row['subject'] or '',
+            sender=row['sender'] or '',
+            to=row['recipients'] or '',
+            date=row['date'] or '',
+            conversation_id=row['conversation_id'],
+            unread=bool(row['unread']),
+            has_attachments=bool(row['has_attachments']),
+            priority=row['priority'] or 'Medium',
+            priority_score=row['priority_score'] if row['priority_score'] is not None else 50,
+            content_hash=row['content_hash'],
+            last_modified=row['last_modified']
+        )
+        
+        # NULL until migration 5 has moved the body into the blob store
+        if row['body_key'] is None:
+            message['body'] = row['body'] or ''
+        elif row['body_key']:
+            message.body_loader = partial(self.get_message_body, row['body_key'])
+        else:
+            message['body'] = ''
+        
+        # Synced from a mailbox other than the default inbox
+        if row['mailbox']:
+            message['mailbox'] = row['mailbox']
+        
+        # Listed without a body; it is fetched when the email is opened
+        if row['partial']:
+            message['partial'] = True
+        
+        return message
+    
+    def _rows_to_messages(self, rows):
+        """Convert messages rows without reading their bodies"""
+        return [self._row_to_message(row) for row in rows]
+    
+    def get_message_body(self, body_key):
+        """Read a body from the blob store"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            body = self.blob_store.get_many(cursor, [body_key]).get(body_key, '')
+            
+            conn.close()
+            
+            return body
+        
+        except Exception as e:
+            logger.error(f"Error reading message body: {str(e)}")
+            return ''
+    
+    def load_message_bodies(self, messages):
+        """Read the bodies of cached messages not yet loaded in one blob store query
+        
+        Saves a connection and a query per message when a whole list is
+        about to read its bodies; messages loaded elsewhere are left alone.
+        """
+        pending = {}
+        for message in messages:
+            loader = getattr(message, 'body_loader', None)
+            if isinstance(loader, partial) and loader.func == self.get_message_body:
+                pending.setdefault(loader.args[0], []).append(message)
+        
+        if not pending:
+            return
+        
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            bodies = self.blob_store.get_many(cursor, list(pending))
+            
+            conn.close()
+            
+            for body_key, keyed in pending.items():
+                for message in keyed:
+                    message['body'] = bodies.get(body_key, '')
+        
+        except Exception as e:
+            logger.error(f"Error reading message bodies: {str(e)}")
+    
+    def save_messages(self, emails):
+        """Insert or update emails in the local message cache
+        
+        Rows whose content hash, unread flag and priority are unchanged are
+        left untouched, so repeated refreshes do not rewrite the same data.
+        Bodies are only written to the blob store when the content changed.
+        Emails marked 'partial' are stored without a body.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            emails = [email for email in emails if email.get('id')]
+            
+            # Content hash and body key of the rows already cached
+            existing = {}
+            entry_ids = [email['id'] for email in emails]
+            for start in range(0, len(entry_ids), 500):
+                chunk = entry_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(
+                    f'SELECT entry_id, content_hash, body_key FROM messages WHERE entry_id IN ({placeholders})',
+                    chunk
+                )
+                for entry_id, content_hash, body_key in cursor.fetchall():
+                    existing[entry_id] = (content_hash, body_key)
+            
+            # A bodiless listing must not replace an email that is already cached
+            emails = [
+                email for email in emails
+                if not (email.get('partial') and email['id'] in existing)
+            ]
+            
+            rows = []
+            for email in emails:
+                content_hash = self._message_content_hash(email)
+                email['content_hash'] = content_hash
+                
+                previous_hash, body_key = existing.get(email['id'], (None, None))
+                if previous_hash != content_hash or body_key is None:
+                    self.blob_store.release(cursor, body_key)
+                    body_key = self.blob_store.put(cursor, email.get('body', ''))
+                    existing[email['id']] = (content_hash, body_key)
+                
+                rows.append((
+                    email['id'],
+                    email.get('subject', ''),
+                    email.get('from', ''),
+                    email.get('to', ''),
+                    email.get('date', ''),
+                    self._sortable_date(email.get('date', '')),
+                    body_key,
+                    email.get('conversation_id'),
+                    1 if email.get('unread') else 0,
+                    1 if email.get('has_attachments') else 0,
+                    email.get('priority', 'Medium'),
+                    email.get('priority_score', 50),
+                    content_hash,
+                    email.get('last_modified'),
+                    1 if email.get('partial') else 0,
+                    email.get('mailbox', '')
+                ))
+            
+            # Keep the conversation index current as messages are synced
+            self._index_conversation_rows(cursor, [
+                (email.get('conversation_id'), email['id'], 'inbox', self._sortable_date(email.get('date', '')))
+                for email in emails
+            ])
+            
+            cursor.executemany('''
+            INSERT INTO messages (entry_id, subject, sender, recipients, date, received_at, body_key,
+                                  conversation_id, unread, has_attachments, priority, priority_score,
+                                  content_hash, last_modified, partial, mailbox)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(entry_id) DO UPDATE SET
+                subject = excluded.subject,
+                sender = excluded.sender,
+                recipients = excluded.recipients,
+                date = excluded.date,
+                received_at = excluded.received_at,
+                body = NULL,
+                body_key = excluded.body_key,
+                conversation_id = excluded.conversation_id,
+                unread = excluded.unread,
+                has_attachments = excluded.has_attachments,
+                priority = excluded.priority,
+                priority_score = excluded.priority_score,
+                content_hash = excluded.content_hash,
+                last_modified = excluded.last_modified,
+                partial = excluded.partial,
+                mailbox = excluded.mailbox,
+                cached_at = CURRENT_TIMESTAMP
+            WHERE messages.content_hash IS NOT excluded.content_hash
+               OR messages.unread != excluded.unread
+               OR messages.priority IS NOT excluded.priority
+               OR messages.priority_score IS NOT excluded.priority_score
+               OR messages.last_modified IS NOT excluded.last_modified
+               OR messages.body_key IS NOT excluded.body_key
+               OR messages.partial != excluded.partial
+               OR messages.mailbox != excluded.mailbox
+            ''', rows)
+            
+            conn.commit()
+            conn.close()
+            
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"Error saving messages: {str(e)}")
+            return 0
+    
+    def get_cached_messages(self, limit=100, unread_only=False):
+        """Get cached emails, newest first"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            if unread_only:
+                cursor.execute(
+                    'SELECT * FROM messages WHERE unread = 1 ORDER BY received_at DESC LIMIT ?',
+                    (limit,)
+                )
+            else:
+                cursor.execute('SELECT * FROM messages ORDER BY received_at DESC LIMIT ?', (limit,))
+            
+            messages = self._rows_to_messages(cursor.fetchall())
+            
+            conn.close()
+            
+            return messages
+            
+        except Exception as e:
+            logger.error(f"Error getting cached messages: {str(e)}")
+            return []
+    
+    def get_cached_messages_by_ids(self, entry_ids):
+        """Get cached emails for the given EntryIDs as a dict keyed by EntryID"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            messages = {}
+            entry_ids = list(entry_ids)
+            
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(entry_ids), 500):
+                chunk = entry_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'SELECT * FROM messages WHERE entry_id IN ({placeholders})', chunk)
+                for message in self._rows_to_messages(cursor.fetchall()):
+                    messages[message['id']] = message
+            
+            conn.close()
+            
+            return messages
+            
+        except Exception as e:
+            logger.error(f"Error getting cached messages: {str(e)}")
+            return {}
+    
+    def get_message_versions(self):
+        """Get the last known modification stamp of every cached email"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT entry_id, last_modified FROM messages')
+            versions = {entry_id: last_modified for entry_id, last_modified in cursor.fetchall()}
+            
+            conn.close()
+            
+            return versions
+            
+        except Exception as e:
+            logger.error(f"Error getting message versions: {str(e)}")
+            return {}
+    
+    def get_message_states(self, since=None, mailbox=None):
+        """Get the unread flag and modification stamp of cached emails received since a datetime
+        
+        mailbox limits the result to emails synced from one mailbox ('' is
+        the default inbox). Returns a dict of EntryID -> {'unread': bool,
+        'last_modified': str}.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            query = 'SELECT entry_id, unread, last_modified FROM messages'
+            conditions = []
+            params = []
+            if since:
+                conditions.append('received_at >= ?')
+                params.append(since.isoformat())
+            if mailbox is not None:
+                conditions.append('mailbox = ?')
+                params.append(mailbox)
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            
+            cursor.execute(query, params)
+            
+            states = {
+                entry_id: {'unread': bool(unread), 'last_modified': last_modified}
+                for entry_id, unread, last_modified in cursor.fetchall()
+            }
+            
+            conn.close()
+            
+            return states
+            
+        except Exception as e:
+            logger.error(f"Error getting message states: {str(e)}")
+            return {}
+    
+    def update_message_states(self, states):
+        """Update the unread flag and modification stamp of cached emails
+        
+        states maps EntryID -> {'unread': bool, 'last_modified': str}.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.executemany(
+                'UPDATE messages SET unread = ?, last_modified = ? WHERE entry_id = ?',
+                [(1 if state['unread'] else 0, state.get('last_modified'), entry_id)
+                 for entry_id, state in states.items()]
+            )
+            
+            conn.commit()
+            conn.close()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error updating message states: {str(e)}")
+            return False
+    
+    def update_message_flags(self, entry_id, unread):
+        """Update the unread flag of a cached email"""
+        return self.update_message_flags_many([entry_id], unread)
+    
+    def update_message_flags_many(self, entry_ids, unread):
+        """Update the unread flag of several cached emails in one transaction"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.executemany(
+                'UPDATE messages SET unread = ? WHERE entry_id = ?',
+                [(1 if unread else 0, entry_id) for entry_id in entry_ids]
+            )
+            
+            conn.commit()
+            conn.close()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error updating message flags: {str(e)}")
+            return False
+    
+    def delete_messages(self, entry_ids):
+        """Remove emails from the local message cache"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            for entry_id in entry_ids:
+                cursor.execute('SELECT body_key FROM messages WHERE entry_id = ?', (entry_id,))
+                row = cursor.fetchone()
+                if row:
+                    self.blob_store.release(cursor, row[0])
+                    cursor.execute('DELETE FROM messages WHERE entry_id = ?', (entry_id,))
+            
+            conn.commit()
+            conn.close()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error deleting messages: {str(e)}")
+            return False
+    
+    def _index_conversation_rows(self, cursor, rows):
+        """Upsert (conversation_id, entry_id, folder, received_at) rows into the conversation index"""
+        cursor.executemany('''
+        INSERT INTO conversation_index (conversation_id, entry_id, folder, received_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(conversation_id, entry_id) DO UPDATE SET
+            folder = excluded.folder,
+            received_at = excluded.received_at
+        WHERE conversation_index.folder IS NOT excluded.folder
+           OR conversation_index.received_at IS NOT excluded.received_at
+        ''', [row for row in rows if row[0] and row[1]])
+    
+    def index_conversations(self, entries):
+        """Add emails of any folder to the conversation index
+        
+        entries are dicts with 'conversation_id', 'id', 'folder' and 'date'
+        in the display format used by the mail sources.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            self._index_conversation_rows(cursor, [
+                (entry.get('conversation_id'), entry.get('id'), entry.get('folder'),
+                 self._sortable_date(entry.get('date', '')))
+                for entry in entries
+            ])
+            
+            conn.commit()
+            conn.close()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error indexing conversations: {str(e)}")
+            return False
+    
+    def get_conversation_members(self, conversation_id, limit=None):
+        """Get the indexed messages of a conversation, oldest first
+        
+        Returns dicts with 'id', 'folder' and 'received_at'. With a limit,
+        the most recent members are returned.
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT entry_id, folder, received_at FROM conversation_index
+            WHERE conversation_id = ?
+            ORDER BY received_at DESC
+            LIMIT ?
+            ''', (conversation_id, limit if limit is not None else -1))
+            
+            members = [
+                {'id': row['entry_id'], 'folder': row['folder'], 'received_at': row['received_at']}
+                for row in cursor.fetchall()
+            ]
+            members.reverse()
+            
+            conn.close()
+            
+            return members
+            
+        except Exception as e:
+            logger.error(f"Error getting conversation members: {str(e)}")
+            return []
+    
+    def remove_conversation_members(self, entry_ids):
+        """Drop EntryIDs that no longer resolve from the conversation index"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.executemany(
+                'DELETE FROM conversation_index WHERE entry_id = ?',
+                [(entry_id,) for entry_id in entry_ids]
+            )
+            
+            conn.commit()
+            conn.close()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error removing conversation members: {str(e)}")
+            return False
+    
+    def get_meta(self, key, default=None):
+        """Read a value from the storage_meta bookkeeping table"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT value FROM storage_meta WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            
+            conn.close()
+            
+            return row[0] if row else default
+            
+        except Exception as e:
+            logger.error(f"Error reading {key}: {str(e)}")
+            return default
+    
+    def set_meta(self, key, value):
+        """Write a value to the storage_meta bookkeeping table"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            INSERT INTO storage_meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', (key, str(value)))
+            
+            conn.commit()
+            conn.close()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error writing {key}: {str(e)}")
+            return False
+    
+    def add_change_listener(self, callback):
+        """Register a callback(table_name, version) invoked after a tracked table changes
+        
+        Callbacks run on the thread that made the change.
+        """
+        with self._listeners_lock:
+            self._change_listeners.append(callback)
+    
+    def remove_change_listener(self, callback):
+        """Unregister a change listener"""
+        with self._listeners_lock:
+            if callback in self._change_listeners:
+                self._change_listeners.remove(callback)
+    
+    def _notify_change(self, table_name):
+        """Notify listeners that a tracked table changed"""
+        with self._listeners_lock:
+            listeners = list(self._change_listeners)
+        
+        if not listeners:
+            return
+        
+        version = self.get_version(table_name)
+        for callback in listeners:
+            try:
+                callback(table_name, version)
+            except Exception as e:
+                logger.error(f"Error in change listener: {str(e)}")
+    
+    def get_version(self, table_name):
+        """Get the current change version of a tracked table"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT MAX(version) FROM change_log WHERE table_name = ?', (table_name,))
+            version = cursor.fetchone()[0] or 0
+            
+            conn.close()
+            
+            return version
+            
+        except Exception as e:
+            logger.error(f"Error getting version of {table_name}: {str(e)}")
+            return 0
+    
+    def changes_since(self, table_name, version):
+        """Get rows of a tracked table changed after the given version
+        
+        Returns a dict with the new 'version' and the 'inserted' and 'updated'
+        rows plus the ids of 'deleted' rows, or None if the change log no
+        longer reaches back that far and the caller has to reload fully.
+        """
+        if table_name not in self.TRACKED_TABLES:
+            logger.error(f"Table {table_name} is not tracked for changes")
+            return None
+        
+        try:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT value FROM storage_meta WHERE key = 'change_log_pruned_through'")
+            pruned = cursor.fetchone()
+            if pruned and version < int(pruned['value']):
+                conn.close()
+                return None
+            
+            cursor.execute(
+                'SELECT version, row_id, op FROM change_log WHERE table_name = ? AND version > ? ORDER BY version',
+                (table_name, version)
+            )
+            entries = cursor.fetchall()
+            
+            # Collapse the log into the net effect per row
+            first_op = {}
+            last_op = {}
+            new_version = version
+            for entry in entries:
+                first_op.setdefault(entry['row_id'], entry['op'])
+                last_op[entry['row_id']] = entry['op']
+                new_version = entry['version']
+            
+            inserted_ids = []
+            updated_ids = []
+            deleted_ids = []
+            for row_id, op in last_op.items():
+                if op == 'delete':
+                    if first_op[row_id] != 'insert':
+                        deleted_ids.append(row_id)
+                elif first_op[row_id] == 'insert':
+                    inserted_ids.append(row_id)
+                else:
+                    updated_ids.append(row_id)
+            
+            rows = {}
+            changed_ids = inserted_ids + updated_ids
+            for start in range(0, len(changed_ids), 500):
+                chunk = changed_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'SELECT * FROM {table_name} WHERE id IN ({placeholders})', chunk)
+                fetched = cursor.fetchall()
+                if table_name == 'drafts':
+                    for draft in self._rows_to_drafts(cursor, fetched):
+                        rows[draft['id']] = draft
+                else:
+                    for row in fetched:
+                        rows[row['id']] = dict(row)
+            
+            conn.close()
+            
+            return {
+                'version': new_version,
+                'inserted': [rows[row_id] for row_id in inserted_ids if row_id in rows],
+                'updated': [rows[row_id] for row_id in updated_ids if row_id in rows],
+                'deleted': deleted_ids
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting changes for {table_name}: {str(e)}")
+            return None
+    
+    def prune_change_log(self, keep=None):
+        """Drop old change log entries, keeping the latest entry of every table"""
+        keep = keep or self.CHANGE_LOG_LIMIT
+        
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT MAX(version) FROM change_log')
+            latest = cursor.fetchone()[0] or 0
+            cutoff = latest - keep
+            
+            if cutoff > 0:
+                cursor.execute('''
+                DELETE FROM change_log
+                WHERE version <= ?
+                  AND version NOT IN (SELECT MAX(version) FROM change_log GROUP BY table_name)
+                ''', (cutoff,))
+                cursor.execute('''
+                INSERT INTO storage_meta (key, value) VALUES ('change_log_pruned_through', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                ''', (str(cutoff),))
+            
+            conn.commit()
+            conn.close()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error pruning change log: {str(e)}")
             return False
\ No newline at end of file
@@ -0,0 +1,268 @@
+# services/sync_engine.py
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from services.mail_source import DATE_FORMAT
+
+logger = logging.getLogger(__name__)
+
+class SyncEngine:
+    """Incremental sync of a mail source folder into the local message cache
+    
+    A high-water mark per folder, kept in storage_meta, records the newest
+    received time synced and the ids received in that minute (Outlook date
+    restrictions only have minute precision). Each sync lists only emails
+    received since the mark, reads the flags of emails modified since the
+    previous sync, and every full_check_interval seconds compares the ids
+    of the whole window with the cache to find deleted or moved emails.
+    Steady-state cost therefore follows the amount of new mail rather than
+    the size of the window. An engine syncs one mailbox; MailboxSync runs
+    one per mailbox.
+    """
+    
+    # Restrictions are rounded to the minute, so modified times overlap a little
+    MODIFIED_OVERLAP = timedelta(minutes=2)
+    
+    def __init__(self, storage_service, mail_source, window_days=3, page_size=100,
+                 max_page_size=2000, full_check_interval=600, prepare=None, mailbox=''):
+        self.storage_service = storage_service
+        self.mail_source = mail_source
+        self.mailbox = mailbox  # '' for the default inbox
+        self.prepare = prepare
+        self.window_days = window_days
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.full_check_interval = full_check_interval  # seconds between deletion checks
+        
+        # The monitor and manual refreshes share one engine; syncs must not overlap
+        self._lock = threading.Lock()
+    
+    def _meta_key(self, folder):
+        if self.mailbox:
+            return f"sync_watermark:{self.mailbox}:{folder}"
+        return f"sync_watermark:{folder}"
+    
+    def load_watermark(self, folder='inbox'):
+        """Get the stored high-water mark of a folder, or None before the first sync"""
+        value = self.storage_service.get_meta(self._meta_key(folder))
+        try:
+            return json.loads(value) if value else None
+        except ValueError:
+            return None
+    
+    def reset(self, folder='inbox'):
+        """Forget the high-water mark so the next sync covers the whole window"""
+        return self.storage_service.set_meta(self._meta_key(folder), '')
+    
+    def sync(self, folder='inbox', prepare=None):
+        """Bring the cache up to date with the mail source
+        
+        prepare(emails) (by default the one given to the constructor) is
+        called with the new and changed emails before they are saved, e.g.
+        to score them. Returns a dict with 'added' and 'changed' emails,
+        'removed' ids and the number of 'flags' updated, or None if the mail
+        source is unavailable.
+        """
+        with self._lock:
+            return self._sync(folder, prepare or self.prepare)
+    
+    def _sync(self, folder, prepare):
+        """Run one sync while holding the lock"""
+        started = datetime.now()
+        window_start = started - timedelta(days=self.window_days)
+        
+        mark = self.load_watermark(folder) or {}
+        since = window_start
+        if mark.get('received'):
+            since = max(since, datetime.fromisoformat(mark['received']))
+        seen = set(mark.get('ids', []))
+        
+        listed = self._list_new(since)
+        if listed is None:
+            return None
+        
+        cached = self.storage_service.get_message_states(window_start, mailbox=self.mailbox)
+        added = [email for email in listed if email['id'] not in seen and email['id'] not in cached]
+        
+        full_check = time.time() - mark.get('full_check', 0) >= self.full_check_interval
+        flags, changed_ids, removed = self._detect_changes(mark, cached, window_start, full_check)
+        
+        changed = []
+        if changed_ids:
+            changed = list(self.mail_source.get_emails_by_ids(changed_ids).values())
+            for email in changed:
+                email.pop('folder', None)
+        
+        if prepare and (added or changed):
+            prepare(added + changed)
+        
+        if added or changed:
+            self.storage_service.save_messages(added + changed)
+        if flags:
+            self.storage_service.update_message_states(flags)
+        if removed:
+            self.storage_service.delete_messages(removed)
+        
+        # Only advance the mark once the emails are safely cached
+        self._save_watermark(folder, mark, listed, since, started, full_check)
+        
+        logger.info(
+            f"Synced {self.mailbox or folder}: {len(added)} new, {len(changed)} changed, "
+            f"{len(flags)} flag updates, {len(removed)} removed"
+        )
+        
+        return {'added': added, 'changed': changed, 'removed': removed, 'flags': len(flags)}
+    
+    def _list_new(self, since):
+        """List emails received since a time, growing the page until it holds them all"""
+        limit = self.page_size
+        while True:
+            emails = self.mail_source.list_emails(since=since, limit=limit)
+            if not emails and not self.mail_source.is_connected():
+                return None
+            
+            if len(emails) < limit:
+                return emails
+            
+            if limit >= self.max_page_size:
+                logger.warning(f"More than {limit} new emails since {since}; syncing the newest")
+                return emails
+            
+            limit *= 2
+    
+    def _detect_changes(self, mark, cached, window_start, full_check):
+        """Compare the source state with the cache
+        
+        Returns (flag updates, ids to refetch, ids to remove). Outside a
+        full check only emails modified since the previous sync are read.
+        """
+        if full_check or not mark.get('checked'):
+            state = self.mail_source.get_folder_state(since=window_start)
+        else:
+            modified_since = datetime.fromisoformat(mark['checked']) - self.MODIFIED_OVERLAP
+            state = self.mail_source.get_folder_state(since=window_start, modified_since=modified_since)
+        
+        if state is None:
+            return {}, [], []
+        
+        flags = {}
+        changed_ids = []
+        for entry_id, current in state.items():
+            known = cached.get(entry_id)
+            if not known:
+                continue
+            
+            # Compare the flag even under an unchanged stamp: local mail programs change flags without touching it
+            if known['unread'] != current['unread']:
+                flags[entry_id] = current
+            elif known['last_modified'] != current['last_modified']:
+                changed_ids.append(entry_id)
+        
+        removed = []
+        if full_check or not mark.get('checked'):
+            removed = [entry_id for entry_id in cached if entry_id not in state]
+        
+        return flags, changed_ids, removed
+    
+    def _save_watermark(self, folder, mark, listed, since, started, full_check):
+        """Store the newest received time and the ids received in its minute"""
+        received = since
+        ids = set(mark.get('ids', []))
+        
+        dated = []
+        for email in listed:
+            try:
+                dated.append((datetime.strptime(email['date'], DATE_FORMAT), email['id']))
+            except (KeyError, ValueError):
+                continue
+        
+        if dated:
+            newest = max(date for date, _ in dated)
+            if newest > received:
+                received = newest
+                ids = set()
+        elif not mark.get('received'):
+            # An empty window: start from now rather than re-listing the window
+            received = started - self.MODIFIED_OVERLAP
+        
+        minute = received.replace(second=0, microsecond=0)
+        ids.update(entry_id for date, entry_id in dated if date >= minute)
+        
+        self.storage_service.set_meta(self._meta_key(folder), json.dumps({
+            'received': received.isoformat(),
+            'ids': sorted(ids),
+            'checked': started.isoformat(),
+            'full_check': time.time() if full_check or not mark.get('checked') else mark.get('full_check', 0)
+        }))
+
+class MailboxSync:
+    """Syncs every mailbox of a mail source in parallel into the local message cache
+    
+    MailSource.mailboxes() names the mailboxes; a plain source only has
+    the default inbox ('') and is synced inline. Each mailbox gets its own
+    SyncEngine, and so its own high-water mark, and the results are merged
+    into one dict shaped like SyncEngine.sync's. Backends give every
+    mailbox its own connection (an Outlook COM worker or a mailbox reader),
+    so the syncs overlap and throughput grows with the number of mailboxes
+    up to max_workers.
+    """
+    
+    def __init__(self, storage_service, mail_source, max_workers=4, **options):
+        self.engines = {
+            label: SyncEngine(storage_service, source, mailbox=label, **options)
+            for label, source in mail_source.mailboxes().items()
+        }
+        
+        self._executor = None
+        if len(self.engines) > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(max_workers, len(self.engines)),
+                thread_name_prefix="mailbox-sync"
+            )
+    
+    def sync(self, folder='inbox', prepare=None):
+        """Sync all mailboxes; returns the merged result, or None if none was available"""
+        if self._executor is None:
+            return next(iter(self.engines.values())).sync(folder, prepare)
+        
+        futures = {
+            label: self._executor.submit(engine.sync, folder, prepare)
+            for label, engine in self.engines.items()
+        }
+        
+        merged = None
+        for label, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Error syncing mailbox {label or 'inbox'}: {str(e)}")
+                continue
+            
+            if result is None:
+                continue
+            
+            if merged is None:
+                merged = {'added': [], 'changed': [], 'removed': [], 'flags': 0}
+            merged['added'].extend(result['added'])
+            merged['changed'].extend(result['changed'])
+            merged['removed'].extend(result['removed'])
+            merged['flags'] += result['flags']
+        
+        return merged
+    
+    def load_watermark(self, folder='inbox', mailbox=''):
+        """Get the high-water mark of one mailbox"""
+        return self.engines[mailbox].load_watermark(folder)
+    
+    def reset(self, folder='inbox'):
+        """Forget the high-water marks of all mailboxes"""
+        return all([engine.reset(folder) for engine in self.engines.values()])
+    
+    def close(self):
+        """Stop the sync threads once running syncs finish"""
+        if self._executor:
+            self._executor.shutdown(wait=False)
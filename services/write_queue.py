@@ -0,0 +1,199 @@
+# services/write_queue.py
+import queue
+import threading
+import logging
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Applies task mutations on a single background writer thread
+    
+    Callers get a Future for every write. Writes that arrive close together
+    are committed in one transaction, and consecutive updates of the same
+    task are merged into one. A Future returned by save_task can be passed
+    as the task id of later updates or deletes before it has resolved.
+    """
+    
+    def __init__(self, storage_service, batch_window=0.05, max_batch=100):
+        self.storage_service = storage_service
+        self.batch_window = batch_window  # seconds to wait for more writes
+        self.max_batch = max_batch
+        
+        self._queue = queue.Queue()
+        self._carry = None
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+        self._thread.start()
+    
+    def save_task(self, task_data):
+        """Queue a new task; the Future resolves to its id, or None on failure"""
+        return self._submit(('save', dict(task_data)))
+    
+    def update_task(self, task_id, task_data):
+        """Queue a task update; the Future resolves to True or False"""
+        return self._submit(('update', task_id, dict(task_data)))
+    
+    def delete_task(self, task_id):
+        """Queue a task deletion; the Future resolves to True or False"""
+        return self._submit(('delete', task_id))
+    
+    def flush(self, timeout=None):
+        """Block until every write submitted so far has been committed"""
+        try:
+            self._submit(('flush',)).result(timeout)
+            return True
+        except Exception as e:
+            logger.error(f"Error flushing write queue: {str(e)}")
+            return False
+    
+    def close(self, timeout=10):
+        """Flush pending writes and stop the writer thread"""
+        if self._closed:
+            return True
+        
+        result = self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        return result
+    
+    def _submit(self, operation):
+        """Put an operation on the queue and return its Future"""
+        if self._closed:
+            raise RuntimeError("Write queue is closed")
+        
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+    
+    def _run(self):
+        """Writer thread main loop"""
+        while True:
+            item = self._carry if self._carry is not None else self._queue.get()
+            self._carry = None
+            if item is None:
+                break
+            
+            batch, stop = self._collect_batch(item)
+            self._process(batch)
+            
+            if stop:
+                break
+    
+    def _collect_batch(self, first):
+        """Gather writes arriving within the batch window"""
+        batch = [first]
+        if first[0][0] == 'flush':
+            return batch, False
+        
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if item is None:
+                return batch, True
+            
+            # A write that needs the id of a save in this batch goes in the next one
+            if self._depends_on(item, batch):
+                self._carry = item
+                break
+            
+            batch.append(item)
+            if item[0][0] == 'flush':
+                break
+        
+        return batch, False
+    
+    def _depends_on(self, item, batch):
+        """Check whether a write refers to an unresolved save in the batch"""
+        operation = item[0]
+        if operation[0] not in ('update', 'delete') or not isinstance(operation[1], Future):
+            return False
+        return any(future is operation[1] for _, future in batch)
+    
+    def _same_task(self, first_id, second_id):
+        """Check whether two task ids (or pending save Futures) name the same task"""
+        if isinstance(first_id, Future) or isinstance(second_id, Future):
+            return first_id is second_id
+        return first_id == second_id
+    
+    def _coalesce(self, batch):
+        """Merge consecutive updates of the same task into one write"""
+        merged = []
+        for operation, future in batch:
+            previous = merged[-1][0] if merged else None
+            if (operation[0] == 'update' and previous and previous[0] == 'update'
+                    and self._same_task(previous[1], operation[1])):
+                # The later update carries the complete set of fields
+                merged[-1][0] = operation
+                merged[-1][1].append(future)
+            else:
+                merged.append([operation, [future]])
+        return merged
+    
+    def _resolve_id(self, operation):
+        """Replace a Future task id with the id it resolved to"""
+        if operation[0] not in ('update', 'delete') or not isinstance(operation[1], Future):
+            return operation
+        
+        task_id = operation[1].result() if operation[1].done() else None
+        if not task_id:
+            return None
+        return (operation[0], task_id) + tuple(operation[2:])
+    
+    def _process(self, batch):
+        """Commit a batch of writes and resolve their Futures"""
+        flush_futures = []
+        operations = []
+        groups = []
+        
+        try:
+            for operation, futures in self._coalesce(batch):
+                if operation[0] == 'flush':
+                    flush_futures.extend(futures)
+                    continue
+                
+                resolved = self._resolve_id(operation)
+                if resolved is None:
+                    # The save this write depends on failed
+                    for future in futures:
+                        future.set_result(False)
+                    continue
+                
+                operations.append(resolved)
+                groups.append(futures)
+            
+            def on_committed(results):
+                for futures, result in zip(groups, results):
+                    for future in futures:
+                        future.set_result(result)
+            
+            if operations:
+                results = self.storage_service.apply_task_writes(operations, on_committed=on_committed)
+                if results is None:
+                    for operation, futures in zip(operations, groups):
+                        for future in futures:
+                            future.set_result(None if operation[0] == 'save' else False)
+                else:
+                    logger.debug(f"Committed {len(operations)} task write(s) from {len(batch)} request(s)")
+        
+        except Exception as e:
+            logger.error(f"Error processing write batch: {str(e)}")
+            for futures in groups:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+        
+        finally:
+            for future in flush_futures:
+                future.set_result(True)
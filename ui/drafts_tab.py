@@ -1,7 +1,6 @@
 # ui/drafts_tab.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
 import logging
 from datetime import datetime
 
@@ -10,17 +9,28 @@ logger = logging.getLogger(__name__)
 class DraftsTab:
     """Drafts tab UI for the email agent application"""
     
-    def __init__(self, parent, outlook_service, storage_service):
+    # Number of drafts fetched from storage per scroll step
+    PAGE_SIZE = 50
+    
+    def __init__(self, parent, outlook_service, storage_service, outbox):
         self.parent = parent
         self.outlook_service = outlook_service
         self.storage_service = storage_service
+        self.outbox = outbox
         
         # Current data
         self.drafts = []
         self.current_draft = None
+        self.has_more_drafts = False
+        self.drafts_cursor = None  # Last draft fetched from storage
+        self.drafts_version = 0  # Storage change version the list reflects
         
         self._setup_ui()
         self._load_drafts()
+        self.update_outbox_progress(self.outbox.get_progress())
+        
+        # Keep the list in sync with drafts created elsewhere
+        self.storage_service.add_change_listener(self._on_drafts_changed)
     
     def _setup_ui(self):
         """Set up the drafts UI"""
@@ -42,17 +52,28 @@ class DraftsTab:
         clear_button = ttk.Button(controls_frame, text="Clear All", command=self._clear_all_drafts)
         clear_button.pack(side=tk.RIGHT, padx=5)
         
+        # Outbox progress; sends happen in the background
+        outbox_frame = ttk.Frame(drafts_list_frame)
+        outbox_frame.pack(fill=tk.X, padx=5)
+        
+        self.outbox_var = tk.StringVar(value="")
+        outbox_label = ttk.Label(outbox_frame, textvariable=self.outbox_var, anchor=tk.W)
+        outbox_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.retry_button = ttk.Button(outbox_frame, text="Retry Failed", command=self._retry_failed_sends)
+        
         # Drafts list
         drafts_frame = ttk.Frame(drafts_list_frame)
         drafts_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Create listbox with scrollbar
-        self.drafts_listbox = tk.Listbox(drafts_frame, width=40, height=20)
+        self.drafts_listbox = tk.Listbox(drafts_frame, width=40, height=20, selectmode=tk.EXTENDED,
+                                         exportselection=False)
         self.drafts_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        scrollbar = ttk.Scrollbar(drafts_frame, orient=tk.VERTICAL, command=self.drafts_listbox.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.drafts_listbox.configure(yscrollcommand=scrollbar.set)
+        self.drafts_scrollbar = ttk.Scrollbar(drafts_frame, orient=tk.VERTICAL, command=self.drafts_listbox.yview)
+        self.drafts_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.drafts_listbox.configure(yscrollcommand=self._on_drafts_scrolled)
         
         # Bind selection event
         self.drafts_listbox.bind('<<ListboxSelect>>', self._on_draft_selected)
@@ -121,28 +142,20 @@ class DraftsTab:
         self.response_text.config(state=tk.DISABLED)
     
     def _load_drafts(self):
-        """Load drafts from storage"""
+        """Load the first page of drafts from storage"""
         try:
             # Show busy cursor
             self._set_busy_cursor(True)
             
             # Clear existing items
             self.drafts_listbox.delete(0, tk.END)
+            self.drafts = []
+            self.has_more_drafts = True
+            self.drafts_cursor = None
+            self.drafts_version = self.storage_service.get_version('drafts')
             
-            # Get drafts from storage
-            self.drafts = self.storage_service.get_drafts()
-            
-            # Add to listbox
-            for i, draft in enumerate(self.drafts):
-                # Get subject from original email
-                subject = draft.get('original_email', {}).get('subject', 'No subject')
-                
-                # Format subject for display
-                if len(subject) > 40:
-                    subject = subject[:37] + "..."
-                
-                # Add to listbox
-                self.drafts_listbox.insert(tk.END, subject)
+            # Get the first page of drafts from storage
+            self._load_more_drafts()
             
             # Clear current selection
             self._clear_draft_display()
@@ -155,6 +168,96 @@ class DraftsTab:
             # Reset cursor
             self._set_busy_cursor(False)
     
+    def _load_more_drafts(self):
+        """Append the next page of drafts to the list"""
+        if not self.has_more_drafts:
+            return
+        
+        page = list(self.storage_service.iter_drafts(after=self.drafts_cursor, limit=self.PAGE_SIZE))
+        self.has_more_drafts = len(page) == self.PAGE_SIZE
+        if page:
+            self.drafts_cursor = page[-1]
+        
+        # Add to listbox
+        for draft in page:
+            self.drafts_listbox.insert(tk.END, self._draft_label(draft))
+        
+        self.drafts.extend(page)
+    
+    def _draft_label(self, draft):
+        """Build the listbox label for a draft"""
+        # Get subject from original email
+        subject = draft.get('original_email', {}).get('subject', 'No subject')
+        
+        # Format subject for display
+        if len(subject) > 40:
+            subject = subject[:37] + "..."
+        
+        return subject
+    
+    def _on_drafts_changed(self, table_name, version):
+        """Storage change listener; may be called from any thread"""
+        if table_name == 'drafts' and version != self.drafts_version:
+            self.parent.after(0, self._refresh_drafts)
+    
+    def _refresh_drafts(self):
+        """Apply draft changes made since the last load instead of reloading"""
+        try:
+            version = self.storage_service.get_version('drafts')
+            if version == self.drafts_version:
+                return
+            
+            changes = self.storage_service.changes_since('drafts', self.drafts_version)
+            if changes is None:
+                # Change log no longer covers our version
+                self._load_drafts()
+                return
+            
+            self._apply_draft_changes(changes)
+            
+        except Exception as e:
+            logger.error(f"Error refreshing drafts: {str(e)}")
+    
+    def _apply_draft_changes(self, changes):
+        """Apply a change set from StorageService.changes_since to the list"""
+        # Sent and deleted drafts stay in the table until retention archives them
+        deleted = set(changes['deleted'])
+        deleted.update(draft['id'] for draft in changes['updated'] if draft.get('status') != 'Draft')
+        for index in range(len(self.drafts) - 1, -1, -1):
+            if self.drafts[index].get('id') in deleted:
+                if self.current_draft is self.drafts[index]:
+                    self._clear_draft_display()
+                self.drafts_listbox.delete(index)
+                self.drafts.pop(index)
+        
+        for draft in changes['updated']:
+            if draft['id'] in deleted:
+                continue
+            for index, existing in enumerate(self.drafts):
+                if existing.get('id') == draft['id']:
+                    existing.update(draft)
+                    self.drafts_listbox.delete(index)
+                    self.drafts_listbox.insert(index, self._draft_label(existing))
+                    break
+        
+        # New drafts are the newest ones, so they go on top
+        known_ids = {draft.get('id') for draft in self.drafts}
+        for draft in sorted(changes['inserted'], key=lambda d: d['id']):
+            if draft['id'] in known_ids or draft.get('status') != 'Draft':
+                continue
+            self.drafts.insert(0, draft)
+            self.drafts_listbox.insert(0, self._draft_label(draft))
+        
+        self.drafts_version = changes['version']
+    
+    def _on_drafts_scrolled(self, first, last):
+        """Update the scrollbar and fetch more drafts when the end comes into view"""
+        self.drafts_scrollbar.set(first, last)
+        
+        if self.has_more_drafts and float(last) >= 1.0:
+            # Defer so the listbox is not modified from inside its own scroll callback
+            self.parent.after_idle(self._load_more_drafts)
+    
     def _on_draft_selected(self, event):
         """Handle draft selection"""
         try:
@@ -250,108 +353,88 @@ class DraftsTab:
             # Set back to read-only
             self.response_text.config(state=tk.DISABLED)
     
+    def _selected_drafts(self):
+        """Get the drafts selected in the list"""
+        return [self.drafts[index] for index in self.drafts_listbox.curselection() if index < len(self.drafts)]
+    
+    def _outgoing_message(self, draft):
+        """Build the outbox entry replying to a draft's original email, or None"""
+        original_email = draft.get('original_email', {})
+        if not original_email:
+            return None
+        
+        # Get recipient
+        to_email = original_email.get('from', '').split('<')[-1].split('>')[0]
+        if not to_email:
+            return None
+        
+        # The draft being edited is sent as shown
+        if draft is self.current_draft:
+            body = self.response_text.get("1.0", tk.END)
+        else:
+            body = draft.get('response_text', '')
+        
+        return {
+            'draft_id': draft.get('id'),
+            'to_email': to_email,
+            'subject': "Re: " + original_email.get('subject', ''),
+            'body': body
+        }
+    
     def _send_email(self):
-        """Send the current draft as an email"""
-        if not self.current_draft:
+        """Queue the selected drafts for sending"""
+        drafts = self._selected_drafts()
+        if not drafts and self.current_draft:
+            drafts = [self.current_draft]
+        if not drafts:
             messagebox.showinfo("Send Email", "Please select a draft first.")
             return
             
         try:
-            # Get original email for reply information
-            original_email = self.current_draft.get('original_email', {})
-            if not original_email:
-                messagebox.showerror("Send Email", "Original email information is missing.")
-                return
-                
-            # Get response text
-            response_text = self.response_text.get("1.0", tk.END)
+            messages = [self._outgoing_message(draft) for draft in drafts]
+            unsendable = messages.count(None)
+            messages = [message for message in messages if message]
             
-            # Show busy cursor
-            self._set_busy_cursor(True)
+            if not messages:
+                messagebox.showerror("Send Email", "Could not determine the recipient of the selected draft.")
+                return
             
             # Confirm send
-            if not messagebox.askyesno("Send Email", "Are you sure you want to send this email?"):
-                self._set_busy_cursor(False)
+            prompt = "Are you sure you want to send this email?"
+            if len(messages) > 1:
+                prompt = f"Are you sure you want to send {len(messages)} emails?"
+            if unsendable:
+                prompt += f"\n\n{unsendable} draft(s) without a recipient will be skipped."
+            if not messagebox.askyesno("Send Email", prompt):
                 return
-                
-            # Get recipient
-            to_email = original_email.get('from', '').split('<')[-1].split('>')[0]
-            if not to_email:
-                messagebox.showerror("Send Email", "Could not determine recipient email address.")
-                self._set_busy_cursor(False)
-                return
-                
-            # Create subject line
-            subject = "Re: " + original_email.get('subject', '')
             
-            # Send in a separate thread
-            threading.Thread(
-                target=self._send_email_thread,
-                args=(to_email, subject, response_text),
-                daemon=True
-            ).start()
+            # The outbox worker sends them; the drafts leave the list once queued
+            if not self.outbox.send(messages):
+                messagebox.showerror("Send Email", "Failed to queue the email for sending.")
             
         except Exception as e:
             logger.error(f"Error preparing to send email: {str(e)}")
             messagebox.showerror("Send Email", f"Error: {str(e)}")
-            self._set_busy_cursor(False)
     
-    def _send_email_thread(self, to_email, subject, body):
-        """Send email in a background thread"""
-        try:
-            # Send the email
-            result = self.outlook_service.send_email(
-                to_email=to_email,
-                subject=subject,
-                body=body
-            )
-            
-            # Update UI in main thread
-            if result:
-                self.parent.after(0, lambda: self._handle_email_sent())
-            else:
-                self.parent.after(0, lambda: messagebox.showerror(
-                    "Send Email",
-                    "Failed to send the email. Please check your Outlook configuration."
-                ))
-                
-        except Exception as e:
-            logger.error(f"Error sending email: {str(e)}")
-            self.parent.after(0, lambda: messagebox.showerror(
-                "Send Email",
-                f"Error sending email: {str(e)}"
-            ))
-            
-        finally:
-            # Reset cursor in main thread
-            self.parent.after(0, lambda: self._set_busy_cursor(False))
+    def update_outbox_progress(self, progress):
+        """Show the outbox counts from OutboxWorker.get_progress"""
+        parts = []
+        if progress.get('queued'):
+            parts.append(f"Sending {progress['queued']}")
+        if progress.get('sent'):
+            parts.append(f"{progress['sent']} sent")
+        if progress.get('failed'):
+            parts.append(f"{progress['failed']} failed")
+        self.outbox_var.set("Outbox: " + ", ".join(parts) if parts else "")
+        
+        if progress.get('failed'):
+            self.retry_button.pack(side=tk.RIGHT, padx=5)
+        else:
+            self.retry_button.pack_forget()
     
-    def _handle_email_sent(self):
-        """Handle successful email sending"""
-        try:
-            messagebox.showinfo("Send Email", "Email sent successfully!")
-            
-            # Delete draft after sending
-            if self.current_draft and 'id' in self.current_draft:
-                self.storage_service.delete_draft(self.current_draft['id'])
-                
-            # Get selected index
-            selection = self.drafts_listbox.curselection()
-            if selection:
-                index = selection[0]
-                
-                # Remove from listbox
-                self.drafts_listbox.delete(index)
-                
-                # Remove from list
-                if index < len(self.drafts):
-                    self.drafts.pop(index)
-                    
-            # Clear display
-            self._clear_draft_display()
-            
-        except Exception as e:
-            logger.error(f"Error handling sent email: {str(e)}")
+    def _retry_failed_sends(self):
+        """Queue the emails that could not be sent again"""
+        self.outbox.retry_failed()
     
     def _delete_draft(self):
         """Delete the current draft"""
@@ -402,17 +485,17 @@ class DraftsTab:
             ):
                 return
                 
-            # TODO: Add method to storage service to clear all drafts
-            # For now, delete them one by one
-            for draft in self.drafts:
-                if 'id' in draft:
-                    self.storage_service.delete_draft(draft['id'])
+            # Only a page of drafts is loaded, so clear the table directly
+            if not self.storage_service.delete_all_drafts():
+                messagebox.showerror("Clear All Drafts", "Failed to delete drafts.")
+                return
             
             # Clear listbox
             self.drafts_listbox.delete(0, tk.END)
             
             # Clear list
             self.drafts = []
+            self.has_more_drafts = False
             
             # Clear display
             self._clear_draft_display()
@@ -1,15 +1,31 @@
 # ui/inbox_tab.py
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import threading
 import logging
-from datetime import datetime
+import webbrowser
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from services.sync_engine import MailboxSync
+from services.prefetcher import DetailPrefetcher
 
 logger = logging.getLogger(__name__)
 
 class InboxTab:
     """Inbox tab UI for the email agent application"""
     
+    # Rows either side of the selection, and top unread emails, to prefetch
+    PREFETCH_NEIGHBOURS = 3
+    PREFETCH_PRIORITY = 3
+    
+    # First and largest page of sent items indexed per refresh
+    SENT_INDEX_PAGE = 500
+    SENT_INDEX_MAX_PAGE = 16000
+    
+    # New unread emails per sync whose bodies are fetched to score them
+    SCORE_BODY_LIMIT = 50
+    
     def __init__(self, parent, outlook_service, email_processor, priority_engine, 
                 response_generator, action_extractor, storage_service, config):
         self.parent = parent
@@ -25,8 +41,16 @@ class InboxTab:
         self.emails = []
         self.current_email = None
         self.current_thread = []
+        self.current_attachments = []
+        
+        # Fetches only what changed in each mailbox since the last refresh
+        self.sync_engine = MailboxSync(storage_service, outlook_service, prepare=self._score_emails)
+        
+        # Thread history and action items of the emails likely to be opened next
+        self.prefetcher = DetailPrefetcher(self._load_details)
         
         self._setup_ui()
+        self._load_cached_emails()
     
     def _setup_ui(self):
         """Set up the inbox UI"""
@@ -59,7 +83,8 @@ class InboxTab:
         email_list_frame_inner.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         columns = ("From", "Subject", "Time", "Priority")
-        self.email_list = ttk.Treeview(email_list_frame_inner, columns=columns, show="headings")
+        self.email_list = ttk.Treeview(email_list_frame_inner, columns=columns, show="headings",
+                                       selectmode="extended")
         
         # Define headings
         self.email_list.heading("From", text="From")
@@ -82,6 +107,9 @@ class InboxTab:
         # Bind selection event
         self.email_list.bind('<<TreeviewSelect>>', self._on_email_selected)
         
+        # Ctrl+A selects every listed email for the bulk actions
+        self.email_list.bind('<Control-a>', lambda event: self.email_list.selection_set(self.email_list.get_children()))
+        
         # Create email view frame
         email_view_frame = ttk.Frame(self.paned_window)
         self.paned_window.add(email_view_frame, weight=60)
@@ -160,6 +188,23 @@ class InboxTab:
         thread_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.thread_view.configure(yscrollcommand=thread_scrollbar.set)
         
+        # Attachments tab; contents are only read when opened or saved
+        attachments_frame = ttk.Frame(self.content_notebook)
+        self.content_notebook.add(attachments_frame, text="Attachments")
+        
+        self.attachments_list = tk.Listbox(attachments_frame, height=6)
+        self.attachments_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.attachments_list.bind('<Double-1>', lambda event: self._open_attachment())
+        
+        attachment_buttons = ttk.Frame(attachments_frame)
+        attachment_buttons.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        open_attachment_button = ttk.Button(attachment_buttons, text="Open", command=self._open_attachment)
+        open_attachment_button.pack(side=tk.LEFT, padx=5)
+        
+        save_attachment_button = ttk.Button(attachment_buttons, text="Save As...", command=self._save_attachment)
+        save_attachment_button.pack(side=tk.LEFT, padx=5)
+        
         # Action items tab
         actions_frame = ttk.Frame(self.content_notebook)
         self.content_notebook.add(actions_frame, text="Action Items")
@@ -187,8 +232,8 @@ class InboxTab:
         archive_button = ttk.Button(actions_frame, text="Archive", command=self._archive_email)
         archive_button.pack(side=tk.LEFT, padx=5)
     
-    def _refresh_emails(self):
-        """Refresh the email list"""
+    def _refresh_emails(self, sync=True):
+        """Refresh the email list, syncing the mailboxes first unless sync is False"""
         try:
             # Show loading indicator
             self._set_busy_cursor(True)
@@ -200,71 +245,225 @@ class InboxTab:
             filter_type = self.filter_var.get()
             
             # Start refresh in a separate thread
-            threading.Thread(target=self._load_emails, args=(filter_type,), daemon=True).start()
+            threading.Thread(target=self._load_emails, args=(filter_type, sync), daemon=True).start()
             
         except Exception as e:
             logger.error(f"Error refreshing emails: {str(e)}")
             self._set_busy_cursor(False)
             messagebox.showerror("Refresh Error", f"Failed to refresh emails: {str(e)}")
     
-    def _load_emails(self, filter_type):
+    def _load_cached_emails(self):
+        """Render the inbox from the local message cache without touching Outlook"""
+        try:
+            filter_type = self.filter_var.get()
+            cached = self.storage_service.get_cached_messages(
+                limit=100,
+                unread_only=filter_type == "Unread"
+            )
+            
+            if cached:
+                self.emails = self._filter_emails(cached, filter_type)
+                self._update_email_list(self.emails)
+                
+        except Exception as e:
+            logger.error(f"Error loading cached emails: {str(e)}")
+    
+    def _load_emails(self, filter_type, sync=True):
         """Load emails in a background thread"""
         try:
-            # Get emails based on filter
-            if filter_type == "Unread":
-                emails = self.outlook_service.get_unread_emails(limit=50)
-            else:
-                # Default to recent emails
-                emails = self.outlook_service.get_recent_emails(days=3, limit=100)
+            # Cost follows the amount of new mail, not the size of the list
+            result = self.sync_engine.sync() if sync else None
+            if result is not None:
+                self._index_sent_items()
+            
+            # The cache holds the merged result; offline it is all there is
+            emails = self.storage_service.get_cached_messages(
+                limit=100,
+                unread_only=filter_type == "Unread"
+            )
+            
+            # Action words may only be in the body, which emails listed without one lack
+            if filter_type == "With Actions":
+                self._fetch_bodies(emails)
             
             # Process emails for display
-            processed_emails = []
+            processed_emails = self._filter_emails(emails, filter_type)
             
-            for email in emails:
-                # Process priority
-                priority_result = self.priority_engine.prioritize_email(email)
-                email['priority'] = priority_result.get('category', 'Medium')
-                email['priority_score'] = priority_result.get('score', 50)
-                
-                # Apply filters
-                if filter_type == "High Priority" and email['priority'] != "High" and email['priority'] != "Urgent":
-                    continue
-                elif filter_type == "Today":
-                    # Check if email is from today
-                    try:
-                        email_date = datetime.strptime(email['date'], "%a, %d %b %Y %H:%M:%S")
-                        today = datetime.now().date()
-                        if email_date.date() != today:
-                            continue
-                    except:
-                        # If date parsing fails, include the email
-                        pass
-                elif filter_type == "With Actions":
-                    # Check if email has potential action items (simple check)
-                    action_indicators = ["please", "request", "action", "needed", "required", "task"]
-                    has_action = False
-                    
-                    for indicator in action_indicators:
-                        if indicator in email.get('subject', '').lower() or indicator in email.get('body', '').lower():
-                            has_action = True
-                            break
-                    
-                    if not has_action:
-                        continue
-                
-                processed_emails.append(email)
+            # New arrivals extend the threads of their conversations
+            known = {email['id'] for email in self.emails}
+            self.prefetcher.invalidate(conversation_ids={
+                email.get('conversation_id') for email in processed_emails
+                if email['id'] not in known and email.get('conversation_id')
+            })
             
             # Store emails
             self.emails = processed_emails
             
             # Update UI in main thread
             self.parent.after(0, lambda: self._update_email_list(processed_emails))
-            
+            self.prefetcher.prefetch(self._prefetch_candidates(None))
+        
         except Exception as e:
             logger.error(f"Error loading emails: {str(e)}")
             self.parent.after(0, lambda: messagebox.showerror("Load Error", f"Failed to load emails: {str(e)}"))
             self.parent.after(0, lambda: self._set_busy_cursor(False))
     
+    def _load_thread(self, conversation_id, limit=10):
+        """Get a conversation from the local index, fetching only bodies not cached"""
+        members = self.storage_service.get_conversation_members(conversation_id, limit=limit)
+        member_ids = [member['id'] for member in members]
+        
+        emails = self.storage_service.get_cached_messages_by_ids(member_ids)
+        
+        missing = [entry_id for entry_id in member_ids if entry_id not in emails]
+        if missing:
+            fetched = self.outlook_service.get_emails_by_ids(missing)
+            emails.update(fetched)
+            
+            # Items that no longer resolve were deleted or moved elsewhere
+            stale = [entry_id for entry_id in missing if entry_id not in fetched]
+            if stale and self.outlook_service.is_connected():
+                self.storage_service.remove_conversation_members(stale)
+        
+        thread = []
+        for member in members:
+            email = emails.get(member['id'])
+            if email:
+                email['folder'] = member['folder']
+                thread.append(email)
+        return thread
+    
+    def _index_sent_items(self):
+        """Add sent emails since the last sync to the conversation index"""
+        try:
+            since = self.storage_service.get_meta('conversation_index_sent_since')
+            since = datetime.fromisoformat(since) if since else datetime.now() - timedelta(days=30)
+            started = datetime.now()
+            
+            # Entries come newest first, so grow the page until it reaches back to since
+            limit = self.SENT_INDEX_PAGE
+            while True:
+                entries = self.outlook_service.get_conversation_entries('sent', since=since, limit=limit)
+                if len(entries) < limit:
+                    break
+                if limit >= self.SENT_INDEX_MAX_PAGE:
+                    logger.warning(f"More than {limit} sent items since {since}; indexing the newest")
+                    break
+                limit *= 2
+            
+            if self.outlook_service.is_connected() and self.storage_service.index_conversations(entries):
+                # Overlap a little so items saved while listing are not missed
+                self.storage_service.set_meta(
+                    'conversation_index_sent_since',
+                    (started - timedelta(minutes=5)).isoformat()
+                )
+        
+        except Exception as e:
+            logger.error(f"Error indexing sent items: {str(e)}")
+    
+    def _score_emails(self, emails):
+        """Compute the priority of new or changed emails before they are cached
+        
+        Emails listed without a body would miss the urgency and question
+        points, so new unread ones are fetched in full first. Any beyond
+        SCORE_BODY_LIMIT stay partial with a score from their headers, which
+        _load_body replaces once the body is read.
+        """
+        partial = [email for email in emails if email.get('partial') and email.get('unread')]
+        if partial:
+            fetched = self.outlook_service.get_emails_by_ids(
+                [email['id'] for email in partial[:self.SCORE_BODY_LIMIT]]
+            )
+            self._merge_fetched(partial, fetched)
+        
+        for email in emails:
+            priority_result = self.priority_engine.prioritize_email(email)
+            email['priority'] = priority_result.get('category', 'Medium')
+            email['priority_score'] = priority_result.get('score', 50)
+    
+    def _merge_fetched(self, emails, fetched):
+        """Complete emails listed without a body from fetched full emails; returns those completed"""
+        completed = []
+        for email in emails:
+            full = fetched.get(email['id'])
+            if full:
+                full.pop('folder', None)
+                email.update(full)
+                email.pop('partial', None)
+                completed.append(email)
+        return completed
+    
+    def _fetch_bodies(self, emails):
+        """Fetch the bodies of emails listed without one in a single call and cache them"""
+        partial = [email for email in emails if email.get('partial')]
+        if not partial:
+            return
+        
+        fetched = self.outlook_service.get_emails_by_ids([email['id'] for email in partial])
+        completed = self._merge_fetched(partial, fetched)
+        if completed:
+            # The body feeds into the priority score
+            self._score_emails(completed)
+            self.storage_service.save_messages(completed)
+    
+    def _load_body(self, email):
+        """Fetch the body of an email listed without one and cache the full email"""
+        fetched = self.outlook_service.get_emails_by_ids([email['id']])
+        if not self._merge_fetched([email], fetched):
+            return email
+        
+        # The body feeds into the priority score
+        self._score_emails([email])
+        
+        self.storage_service.save_messages([email])
+        return email
+    
+    def _filter_emails(self, emails, filter_type):
+        """Apply the selected inbox filter to a list of emails
+        
+        "With Actions" also matches the body; _load_emails fetches it first
+        for emails listed without one, and cached bodies are read in one batch.
+        """
+        processed_emails = []
+        
+        action_indicators = ["please", "request", "action", "needed", "required", "task"]
+        if filter_type == "With Actions":
+            # Only emails whose subject has no action word need their body
+            self.storage_service.load_message_bodies([
+                email for email in emails
+                if not any(indicator in email.get('subject', '').lower() for indicator in action_indicators)
+            ])
+        
+        for email in emails:
+            # Apply filters
+            if filter_type == "High Priority" and email['priority'] != "High" and email['priority'] != "Urgent":
+                continue
+            elif filter_type == "Today":
+                # Check if email is from today
+                try:
+                    email_date = datetime.strptime(email['date'], "%a, %d %b %Y %H:%M:%S")
+                    today = datetime.now().date()
+                    if email_date.date() != today:
+                        continue
+                except:
+                    # If date parsing fails, include the email
+                    pass
+            elif filter_type == "With Actions":
+                # Check if email has potential action items (simple check)
+                # The subject first, so a match there never reads the body
+                subject = email.get('subject', '').lower()
+                has_action = any(indicator in subject for indicator in action_indicators)
+                if not has_action:
+                    body = email.get('body', '').lower()
+                    has_action = any(indicator in body for indicator in action_indicators)
+                
+                if not has_action:
+                    continue
+            
+            processed_emails.append(email)
+        
+        return processed_emails
+    
     def _update_email_list(self, emails):
         """Update the email list in the UI"""
         try:
@@ -323,48 +522,127 @@ class InboxTab:
             if not selection:
                 return
             
+            # With several rows selected, show the one clicked last
+            row = self.email_list.focus()
+            if row not in selection:
+                row = selection[0]
+            
             # Get index of selected item
-            selected_index = self.email_list.index(selection[0])
+            selected_index = self.email_list.index(row)
             
             if selected_index < 0 or selected_index >= len(self.emails):
                 return
             
+            # Extending the selection does not reload the email already shown
+            if len(selection) > 1 and self.emails[selected_index] is self.current_email:
+                return
+            
             # Get email data
             self.current_email = self.emails[selected_index]
             
+            # Warm the rows the user will likely move to next
+            self._prefetch_around(selected_index)
+            
+            # Prefetched details show without a round trip
+            details = self.prefetcher.get(self.current_email)
+            if details is not None:
+                self._show_details(self.current_email, details)
+                return
+            
             # Show busy cursor
             self._set_busy_cursor(True)
             
             # Start thread to load email details
-            threading.Thread(target=self._load_email_details, daemon=True).start()
+            threading.Thread(target=self._load_email_details, args=(self.current_email,), daemon=True).start()
             
         except Exception as e:
             logger.error(f"Error handling email selection: {str(e)}")
             self._set_busy_cursor(False)
     
-    def _load_email_details(self):
+    def _load_email_details(self, email):
         """Load email details in background thread"""
         try:
-            # Load thread if available
-            if self.current_email.get('conversation_id'):
-                self.current_thread = self.outlook_service.get_thread_emails(
-                    self.current_email.get('conversation_id'),
-                    limit=10
-                )
-            else:
-                self.current_thread = []
-            
-            # Extract action items
-            action_items = self.action_extractor.extract_action_items(self.current_email)
+            details = self.prefetcher.load(email)
             
             # Update UI in main thread
-            self.parent.after(0, lambda: self._update_email_display())
+            self.parent.after(0, lambda: self._show_details(email, details))
             
         except Exception as e:
             logger.error(f"Error loading email details: {str(e)}")
             self.parent.after(0, lambda: self._set_busy_cursor(False))
     
-    def _update_email_display(self):
+    def _load_details(self, email):
+        """Load the body, thread history and action items of an email
+        
+        Runs off the Tk thread while the list renders the same emails, so it
+        works on a copy; a fetched body and priority reach the listed email
+        through _apply_loaded on the Tk thread.
+        """
+        email = email.copy()
+        if email.get('partial'):
+            self._load_body(email)
+            if not email.get('partial'):
+                self.parent.after(0, lambda: self._apply_loaded(email))
+        
+        # Load thread if available
+        thread = []
+        if email.get('conversation_id'):
+            thread = self._load_thread(email.get('conversation_id'), limit=10)
+        
+        # Names and sizes only; contents are streamed when opened
+        attachments = []
+        if email.get('has_attachments'):
+            attachments = self.outlook_service.list_attachments(email['id'])
+        
+        return {
+            'email': email,
+            'thread': thread,
+            'action_items': self.action_extractor.extract_action_items(email),
+            'attachments': attachments
+        }
+    
+    def _apply_loaded(self, loaded):
+        """Give the listed copies of an email the body and priority fetched for it"""
+        for email in self.emails + [self.current_email]:
+            if email is not None and email['id'] == loaded['id'] and email.get('partial'):
+                email.update(loaded)
+                email.pop('partial', None)
+    
+    def _prefetch_candidates(self, selected_index):
+        """Emails to prefetch: the next rows around the selection, then the top unread"""
+        candidates = []
+        if selected_index is not None:
+            for offset in range(1, self.PREFETCH_NEIGHBOURS + 1):
+                for index in (selected_index + offset, selected_index - offset):
+                    if 0 <= index < len(self.emails):
+                        candidates.append(self.emails[index])
+        
+        unread = [email for email in self.emails if email.get('unread')]
+        unread.sort(key=lambda email: email.get('priority_score', 0), reverse=True)
+        candidates.extend(unread[:self.PREFETCH_PRIORITY])
+        
+        seen = set()
+        return [email for email in candidates if not (email['id'] in seen or seen.add(email['id']))]
+    
+    def _prefetch_around(self, selected_index):
+        """Start prefetching the details of emails near the selection"""
+        try:
+            self.prefetcher.prefetch(self._prefetch_candidates(selected_index))
+        except Exception as e:
+            logger.error(f"Error prefetching emails: {str(e)}")
+    
+    def _show_details(self, email, details):
+        """Display loaded details if the email is still the one selected"""
+        if email is not self.current_email:
+            # The user moved on while this loaded
+            self._set_busy_cursor(False)
+            return
+        
+        self.current_thread = details['thread']
+        self.current_attachments = details['attachments']
+        self._update_email_display(details['action_items'])
+    
+    def _update_email_display(self, action_items=None):
         """Update the email display"""
         try:
             if not self.current_email:
@@ -421,8 +699,16 @@ class InboxTab:
             # Configure text tags
             self.thread_view.tag_configure("header", font=("", 9, "bold"))
             
+            # Update attachments
+            self.attachments_list.delete(0, tk.END)
+            for attachment in self.current_attachments:
+                self.attachments_list.insert(
+                    tk.END,
+                    f"{attachment['name']} ({self._format_size(attachment['size'])}, {attachment['content_type']})"
+                )
+            
             # Extract and show action items
-            self._extract_actions()
+            self._extract_actions(action_items)
             
         except Exception as e:
             logger.error(f"Error updating email display: {str(e)}")
@@ -450,8 +736,70 @@ class InboxTab:
         self.actions_view.delete("1.0", tk.END)
         self.actions_view.config(state=tk.DISABLED)
         
+        self.attachments_list.delete(0, tk.END)
+        
         self.current_email = None
         self.current_thread = []
+        self.current_attachments = []
+    
+    def _format_size(self, size):
+        """Format a byte count for display"""
+        for unit in ("B", "KB", "MB"):
+            if size < 1024:
+                return f"{size:.0f} {unit}"
+            size /= 1024
+        return f"{size:.1f} GB"
+    
+    def _selected_attachment(self):
+        """Get the attachment selected in the attachments tab, or None"""
+        selection = self.attachments_list.curselection()
+        if not self.current_email or not selection or selection[0] >= len(self.current_attachments):
+            messagebox.showinfo("Attachments", "Please select an attachment first.")
+            return None
+        return self.current_attachments[selection[0]]
+    
+    def _open_attachment(self):
+        """Spool the selected attachment to a temp file and open it"""
+        attachment = self._selected_attachment()
+        if attachment:
+            self._set_busy_cursor(True)
+            threading.Thread(
+                target=self._save_attachment_thread,
+                args=(self.current_email['id'], attachment, None),
+                daemon=True
+            ).start()
+    
+    def _save_attachment(self):
+        """Save the selected attachment where the user chooses"""
+        attachment = self._selected_attachment()
+        if not attachment:
+            return
+        
+        path = filedialog.asksaveasfilename(initialfile=attachment['name'])
+        if path:
+            self._set_busy_cursor(True)
+            threading.Thread(
+                target=self._save_attachment_thread,
+                args=(self.current_email['id'], attachment, path),
+                daemon=True
+            ).start()
+    
+    def _save_attachment_thread(self, email_id, attachment, path):
+        """Stream an attachment to disk; without a path it is spooled and opened"""
+        try:
+            saved = self.outlook_service.save_attachment(email_id, attachment['index'], path=path)
+            if not saved:
+                self.parent.after(0, lambda: messagebox.showerror(
+                    "Attachments", f"Could not save {attachment['name']}."
+                ))
+            elif path is None:
+                webbrowser.open(Path(saved).as_uri())
+        
+        except Exception as e:
+            logger.error(f"Error saving attachment: {str(e)}")
+        
+        finally:
+            self.parent.after(0, lambda: self._set_busy_cursor(False))
     
     def _generate_reply(self):
         """Generate a reply to the current email"""
@@ -517,14 +865,15 @@ class InboxTab:
                 "Failed to save generated reply."
             )
     
-    def _extract_actions(self):
+    def _extract_actions(self, action_items=None):
         """Extract action items from the current email"""
         if not self.current_email:
             return
         
         try:
-            # Extract action items
-            action_items = self.action_extractor.extract_action_items(self.current_email)
+            # Extract action items unless they were loaded with the email
+            if action_items is None:
+                action_items = self.action_extractor.extract_action_items(self.current_email)
             
             # Update actions view
             self.actions_view.config(state=tk.NORMAL)
@@ -602,59 +951,115 @@ class InboxTab:
             logger.error(f"Error saving actions: {str(e)}")
             messagebox.showerror("Save Actions", f"Error saving actions: {str(e)}")
     
+    def _selected_emails(self):
+        """Get (row, email) pairs of the selected rows of the email list"""
+        selected = []
+        for row in self.email_list.selection():
+            index = self.email_list.index(row)
+            if 0 <= index < len(self.emails) and self.emails[index].get('id'):
+                selected.append((row, self.emails[index]))
+        return selected
+    
     def _mark_as_read(self):
-        """Mark the current email as read"""
-        if not self.current_email:
+        """Mark the selected emails as read"""
+        selected = self._selected_emails()
+        if not selected:
             return
         
+        self._set_busy_cursor(True)
+        threading.Thread(target=self._mark_as_read_selected, args=(selected,), daemon=True).start()
+    
+    def _mark_as_read_selected(self, selected):
+        """Mark emails as read in one mailbox job, in a background thread"""
         try:
-            email_id = self.current_email.get('id', '')
-            if not email_id:
-                return
-                
-            result = self.outlook_service.mark_as_read(email_id)
+            results = self.outlook_service.mark_as_read_many([email['id'] for _, email in selected])
+            done = [(row, email) for row, email in selected if results.get(email['id'])]
             
-            if result:
-                # Update local data
-                self.current_email['unread'] = False
-                
-                # Update UI
-                selection = self.email_list.selection()
-                if selection:
-                    self.email_list.item(selection[0], tags=("read",))
+            # Update local data
+            self.storage_service.update_message_flags_many([email['id'] for _, email in done], unread=False)
+            for _, email in done:
+                email['unread'] = False
+            
+            self.parent.after(0, lambda: self._on_marked_as_read(done, len(selected)))
             
         except Exception as e:
-            logger.error(f"Error marking email as read: {str(e)}")
+            logger.error(f"Error marking emails as read: {str(e)}")
+            self.parent.after(0, lambda: self._set_busy_cursor(False))
+    
+    def _on_marked_as_read(self, done, requested):
+        """Update the list rows of emails marked as read"""
+        try:
+            for row, _ in done:
+                if self.email_list.exists(row):
+                    self.email_list.item(row, tags=("read",))
+            
+            if len(done) < requested:
+                messagebox.showwarning(
+                    "Mark as Read",
+                    f"{requested - len(done)} of {requested} emails could not be marked as read."
+                )
+        finally:
+            self._set_busy_cursor(False)
     
     def _archive_email(self):
-        """Archive the current email"""
-        if not self.current_email:
+        """Archive the selected emails"""
+        selected = self._selected_emails()
+        if not selected:
             messagebox.showinfo("Archive Email", "Please select an email first.")
             return
         
+        if len(selected) > 1 and not messagebox.askyesno(
+            "Archive Emails", f"Archive the {len(selected)} selected emails?"
+        ):
+            return
+        
+        self._set_busy_cursor(True)
+        threading.Thread(target=self._archive_selected, args=(selected,), daemon=True).start()
+    
+    def _archive_selected(self, selected):
+        """Archive emails in one mailbox job, in a background thread"""
         try:
-            email_id = self.current_email.get('id', '')
-            if not email_id:
-                return
-                
-            result = self.outlook_service.archive_email(email_id)
+            results = self.outlook_service.archive_many([email['id'] for _, email in selected])
+            done = [(row, email) for row, email in selected if results.get(email['id'])]
             
-            if result:
-                messagebox.showinfo("Archive Email", "Email archived successfully.")
-                
-                # Remove from list
-                selection = self.email_list.selection()
-                if selection:
-                    self.email_list.delete(selection[0])
-                    
-                # Clear display
-                self._clear_email_display()
-            else:
-                messagebox.showwarning("Archive Email", "Failed to archive email.")
+            # Remove from local cache
+            self.storage_service.delete_messages([email['id'] for _, email in done])
+            
+            self.parent.after(0, lambda: self._on_archived(done, len(selected)))
             
         except Exception as e:
-            logger.error(f"Error archiving email: {str(e)}")
-            messagebox.showerror("Archive Email", f"Error archiving email: {str(e)}")
+            logger.error(f"Error archiving emails: {str(e)}")
+            # e is unbound once the except block ends, before the callback runs
+            error = str(e)
+            self.parent.after(0, lambda: self._set_busy_cursor(False))
+            self.parent.after(0, lambda: messagebox.showerror("Archive Email", f"Error archiving email: {error}"))
+    
+    def _on_archived(self, done, requested):
+        """Remove archived emails from the list"""
+        try:
+            archived = [email for _, email in done]
+            for row, _ in done:
+                if self.email_list.exists(row):
+                    self.email_list.delete(row)
+            self.emails = [email for email in self.emails if not any(email is gone for gone in archived)]
+            
+            # Clear display
+            if any(self.current_email is email for email in archived):
+                self._clear_email_display()
+            
+            if not done:
+                messagebox.showwarning("Archive Email", "Failed to archive email.")
+            elif len(done) < requested:
+                messagebox.showwarning(
+                    "Archive Emails",
+                    f"Archived {len(done)} emails; {requested - len(done)} could not be archived."
+                )
+            elif requested == 1:
+                messagebox.showinfo("Archive Email", "Email archived successfully.")
+            else:
+                messagebox.showinfo("Archive Emails", f"Archived {requested} emails.")
+        finally:
+            self._set_busy_cursor(False)
     
     def _set_busy_cursor(self, busy):
         """Set or clear busy cursor"""
@@ -12,14 +12,25 @@ from ui.tasks_tab import TasksTab
 from ui.settings_tab import SettingsTab
 
 from services.ollama_service import OllamaService
+from services.write_queue import WriteBehindQueue
+from services.outbox import OutboxWorker
+from services.mail_source import clear_spool
 
 class EmailAgentUI:
     """Main UI for the email agent application"""
     
+    # How often settings.json is checked for outside edits
+    CONFIG_CHECK_MS = 5000
+    
     def __init__(self, outlook_service, storage_service, email_processor, 
-                priority_engine, response_generator, action_extractor, config):
+                priority_engine, response_generator, action_extractor, config,
+                write_queue=None, outbox=None):
         self.outlook_service = outlook_service
         self.storage_service = storage_service
+        self.write_queue = write_queue or WriteBehindQueue(storage_service)
+        self.outbox = outbox or OutboxWorker(
+            storage_service, outlook_service, on_progress=self._on_outbox_progress
+        )
         self.email_processor = email_processor
         self.priority_engine = priority_engine
         self.response_generator = response_generator
@@ -62,6 +73,12 @@ class EmailAgentUI:
         # Initialize Outlook connection
         threading.Thread(target=self._init_outlook, daemon=True).start()
         
+        # Finish index builds and run database maintenance in the background
+        self.storage_service.start_background_maintenance(self.config.get("storage", {}).get("retention"))
+        
+        # Pick up edits to settings.json made outside the app
+        self.root.after(self.CONFIG_CHECK_MS, self._check_config_file)
+        
         # Start the main loop
         self.root.mainloop()
     
@@ -108,7 +125,8 @@ class EmailAgentUI:
         self.tabs['drafts'] = DraftsTab(
             drafts_frame,
             self.outlook_service,
-            self.storage_service
+            self.storage_service,
+            self.outbox
         )
         
         # Tasks tab
@@ -117,7 +135,8 @@ class EmailAgentUI:
         self.tabs['tasks'] = TasksTab(
             tasks_frame,
             self.storage_service,
-            self.outlook_service
+            self.outlook_service,
+            self.write_queue
         )
         
         # Settings tab
@@ -168,6 +187,7 @@ class EmailAgentUI:
             
             if result:
                 self._update_connection_status("Connected")
+                self.outbox.start()
                 self.root.after(0, lambda: self._start_email_monitoring())
                 self.root.after(0, lambda: self._refresh_inbox_data())
             else:
@@ -188,17 +208,29 @@ class EmailAgentUI:
             ))
     
     def _start_email_monitoring(self):
-        """Start monitoring for new emails - simplified version"""
+        """Start monitoring for new emails"""
         if not self.monitoring:
-            self._update_status("Starting email processing...")
-            # Just call the method but don't rely on its background functionality
-            result = self.outlook_service.start_monitoring(self._on_new_emails, self.root)
+            self._update_status("Starting email monitoring...")
+            # Polls with the inbox's sync engine so both share one watermark
+            result = self.outlook_service.start_monitoring(
+                self._on_new_emails,
+                self.root,
+                sync_engine=self.tabs['inbox'].sync_engine,
+                interval=self.config.get("email", {}).get("refresh_interval", 300)
+            )
             if result:
                 self.monitoring = True
+                self._update_monitoring_status("On")
+                self._update_status("Email monitoring started")
+                self.storage_service.subscribe_config("email", self._on_email_config_changed)
+            else:
                 self._update_monitoring_status("Manual")
-                self._update_status("Email processing initialized")
-                # Do an immediate refresh
-                self._refresh_inbox_data()
+            # Do an immediate refresh
+            self._refresh_inbox_data()
+    
+    def _on_email_config_changed(self, email_config):
+        """Apply a changed refresh interval to the running monitor"""
+        self.outlook_service.set_monitoring_interval(email_config.get("refresh_interval", 300))
     
     def _stop_email_monitoring(self):
         """Stop monitoring for new emails"""
@@ -208,6 +240,7 @@ class EmailAgentUI:
             if result:
                 self.monitoring = False
                 self._update_monitoring_status("Off")
+                self.storage_service.unsubscribe_config("email", self._on_email_config_changed)
                 self._update_status("Email monitoring stopped")
                 logger.info("Stopped email monitoring")
     
@@ -217,9 +250,9 @@ class EmailAgentUI:
             # Update status
             self._update_status(f"Received {len(emails)} new email(s)")
             
-            # Refresh inbox tab if active
+            # The monitor already synced them into the cache, so only redraw from it
             if self.tab_control.index(self.tab_control.select()) == 0:
-                self.tabs['inbox']._refresh_emails()
+                self.tabs['inbox']._refresh_emails(sync=False)
             
             # Show notification if enabled
             if self.config.get("notifications", {}).get("new_emails", True):
@@ -251,6 +284,11 @@ class EmailAgentUI:
         except Exception as e:
             logger.error(f"Error showing notification: {str(e)}")
     
+    def _on_outbox_progress(self, progress):
+        """Show outbox progress in the drafts tab; called from the sender thread"""
+        if self.root is not None and 'drafts' in self.tabs:
+            self.root.after(0, lambda: self.tabs['drafts'].update_outbox_progress(progress))
+    
     def _refresh_inbox_data(self):
         """Refresh inbox data if inbox tab is active"""
         if self.tab_control.index(self.tab_control.select()) == 0:
@@ -266,13 +304,13 @@ class EmailAgentUI:
             tab_names = ["Inbox", "Draft Responses", "Action Items", "Settings"]
             self._update_status(f"Viewing {tab_names[current_tab]}")
             
-            # Refresh data for the selected tab if needed
+            # Apply any storage changes to the selected tab
             if current_tab == 0:  # Inbox tab
                 pass  # Already refreshed on startup
             elif current_tab == 1:  # Drafts tab
-                self.tabs['drafts']._load_drafts()
+                self.tabs['drafts']._refresh_drafts()
             elif current_tab == 2:  # Tasks tab
-                self.tabs['tasks']._load_tasks()
+                self.tabs['tasks']._refresh_tasks()
                 
         except Exception as e:
             logger.error(f"Error handling tab change: {str(e)}")
@@ -283,8 +321,8 @@ class EmailAgentUI:
             # Update local config
             self.config = config
             
-            # Update components that need the config
-            # ...
+            # Components subscribed through StorageService.subscribe_config
+            # have already been updated by save_config
             
             # Update status
             self._update_status("Settings updated")
@@ -292,6 +330,17 @@ class EmailAgentUI:
         except Exception as e:
             logger.error(f"Error handling settings update: {str(e)}")
     
+    def _check_config_file(self):
+        """Reload settings.json if it changed on disk; subscribers see only changed sections"""
+        try:
+            if self.storage_service.config_store.reload_if_changed():
+                self.config = self.storage_service.load_config()
+                self._update_status("Settings reloaded")
+        except Exception as e:
+            logger.error(f"Error checking configuration file: {str(e)}")
+        
+        self.root.after(self.CONFIG_CHECK_MS, self._check_config_file)
+    
     def _update_status(self, message):
         """Update the status bar message"""
         self.status_var.set(message)
@@ -310,6 +359,22 @@ class EmailAgentUI:
             # Stop email monitoring
             if self.monitoring:
                 self._stop_email_monitoring()
+            
+            # Queued emails stay in the outbox and are sent on the next start
+            self.outbox.close()
+            
+            # Let queued mailbox jobs finish and release the COM thread
+            self.outlook_service.close()
+            
+            # Attachments opened from the inbox were spooled to temp files
+            clear_spool()
+            
+            # Make sure queued task writes reach the database
+            self.write_queue.close()
+            self.storage_service.stop_background_maintenance()
+            
+            # VACUUM would lock the UI out of the database, so it only runs on the way out
+            self.storage_service.run_shutdown_maintenance()
                 
             # Close the window
             self.root.destroy()
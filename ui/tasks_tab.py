@@ -10,17 +10,37 @@ logger = logging.getLogger(__name__)
 class TasksTab:
     """Tasks tab UI for the email agent application"""
     
-    def __init__(self, parent, storage_service, outlook_service):
+    # Number of tasks fetched from storage per scroll step
+    PAGE_SIZE = 100
+    
+    # Filters that can be answered by the database directly
+    STATUS_FILTERS = {
+        'Completed': 'Completed',
+        'Not Started': 'Not Started'
+    }
+    
+    def __init__(self, parent, storage_service, outlook_service, write_queue):
         self.parent = parent
         self.storage_service = storage_service
         self.outlook_service = outlook_service
+        self.write_queue = write_queue
         
         # Current data
         self.tasks = []
         self.current_task = None
+        self.has_more_tasks = False
+        self.tasks_cursor = None  # Last task fetched from storage
+        self.tasks_version = 0  # Storage change version the list reflects
+        
+        # Tasks added but not yet written get negative temporary ids
+        self.pending_saves = {}
+        self.next_pending_id = -1
         
         self._setup_ui()
         self._load_tasks()
+        
+        # Keep the list in sync with changes made elsewhere
+        self.storage_service.add_change_listener(self._on_tasks_changed)
     
     def _setup_ui(self):
         """Set up the tasks UI"""
@@ -51,7 +71,7 @@ class TasksTab:
         filter_combo.pack(side=tk.LEFT, padx=5)
         
         # Bind filter change
-        filter_combo.bind('<<ComboboxSelected>>', lambda e: self._apply_filter())
+        filter_combo.bind('<<ComboboxSelected>>', lambda e: self._load_tasks())
         
         # Create paned window for tasks list and details
         paned_window = ttk.PanedWindow(main_frame, orient=tk.HORIZONTAL)
@@ -81,10 +101,10 @@ class TasksTab:
         self.tasks_tree.column("Priority", width=80)
         
         # Scrollbar for tasks list
-        tasks_scrollbar = ttk.Scrollbar(tasks_list_frame, orient=tk.VERTICAL, command=self.tasks_tree.yview)
-        tasks_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tasks_scrollbar = ttk.Scrollbar(tasks_list_frame, orient=tk.VERTICAL, command=self.tasks_tree.yview)
+        self.tasks_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.tasks_tree.configure(yscrollcommand=tasks_scrollbar.set)
+        self.tasks_tree.configure(yscrollcommand=self._on_tasks_scrolled)
         self.tasks_tree.pack(fill=tk.BOTH, expand=True)
         
         # Bind selection event
@@ -171,7 +191,7 @@ class TasksTab:
         delete_button.pack(side=tk.LEFT, padx=5)
     
     def _load_tasks(self):
-        """Load tasks from storage"""
+        """Load the first page of tasks from storage"""
         try:
             # Show busy cursor
             self._set_busy_cursor(True)
@@ -180,11 +200,16 @@ class TasksTab:
             for item in self.tasks_tree.get_children():
                 self.tasks_tree.delete(item)
                 
-            # Get tasks from storage
-            self.tasks = self.storage_service.get_tasks()
+            self.tasks = []
+            self.has_more_tasks = True
+            self.tasks_cursor = None
+            self.tasks_version = self.storage_service.get_version('tasks')
             
-            # Apply current filter
-            self._apply_filter()
+            # Get the first page of tasks from storage
+            self._load_more_tasks()
+            
+            # Clear details
+            self._clear_task_details()
             
         except Exception as e:
             logger.error(f"Error loading tasks: {str(e)}")
@@ -194,84 +219,39 @@ class TasksTab:
             # Reset cursor
             self._set_busy_cursor(False)
     
+    def _load_more_tasks(self):
+        """Append the next page of tasks to the list"""
+        if not self.has_more_tasks:
+            return
+        
+        page = list(self.storage_service.iter_tasks(
+            status=self.STATUS_FILTERS.get(self.filter_var.get()),
+            after=self.tasks_cursor,
+            limit=self.PAGE_SIZE
+        ))
+        self.has_more_tasks = len(page) == self.PAGE_SIZE
+        if page:
+            self.tasks_cursor = page[-1]
+        
+        self.tasks.extend(page)
+        self._insert_tasks(page)
+    
+    def _on_tasks_scrolled(self, first, last):
+        """Update the scrollbar and fetch more tasks when the end comes into view"""
+        self.tasks_scrollbar.set(first, last)
+        
+        if self.has_more_tasks and float(last) >= 1.0:
+            # Defer so the tree is not modified from inside its own scroll callback
+            self.parent.after_idle(self._load_more_tasks)
+    
     def _apply_filter(self):
-        """Apply the selected filter to tasks"""
+        """Apply the selected filter to the loaded tasks"""
         try:
             # Clear existing items
             for item in self.tasks_tree.get_children():
                 self.tasks_tree.delete(item)
                 
-            filter_type = self.filter_var.get()
-            today = datetime.now().date()
-            
-            # Filter tasks
-            filtered_tasks = []
-            
-            for task in self.tasks:
-                if filter_type == "All Tasks":
-                    filtered_tasks.append(task)
-                elif filter_type == "Today":
-                    due_date = task.get('due_date')
-                    if due_date:
-                        try:
-                            # Parse date string
-                            task_date = self._parse_date(due_date)
-                            if task_date and task_date.date() == today:
-                                filtered_tasks.append(task)
-                        except:
-                            # If parsing fails, skip this task
-                            pass
-                elif filter_type == "This Week":
-                    due_date = task.get('due_date')
-                    if due_date:
-                        try:
-                            # Parse date string
-                            task_date = self._parse_date(due_date)
-                            if task_date:
-                                # Calculate days until end of week (Sunday)
-                                days_to_end_of_week = 6 - today.weekday()  # 0=Monday, 6=Sunday
-                                end_of_week = today + timedelta(days=days_to_end_of_week)
-                                
-                                if today <= task_date.date() <= end_of_week:
-                                    filtered_tasks.append(task)
-                        except:
-                            # If parsing fails, skip this task
-                            pass
-                elif filter_type == "Completed":
-                    if task.get('status') == "Completed":
-                        filtered_tasks.append(task)
-                elif filter_type == "Not Started":
-                    if task.get('status') == "Not Started":
-                        filtered_tasks.append(task)
-            
-            # Add filtered tasks to treeview
-            for task in filtered_tasks:
-                due_date = task.get('due_date', '')
-                if due_date:
-                    # Try to format date for display
-                    try:
-                        date_obj = self._parse_date(due_date)
-                        if date_obj:
-                            due_date = date_obj.strftime("%m/%d/%Y")
-                    except:
-                        # Keep original string if parsing fails
-                        pass
-                
-                self.tasks_tree.insert(
-                    "", tk.END, 
-                    values=(
-                        task.get('text', ''),
-                        due_date,
-                        task.get('status', 'Not Started'),
-                        task.get('priority', 'Medium')
-                    ),
-                    tags=(task.get('status', '').lower().replace(' ', '_'),)
-                )
-            
-            # Configure tag appearances
-            self.tasks_tree.tag_configure('completed', foreground='gray')
-            self.tasks_tree.tag_configure('in_progress', foreground='blue')
-            self.tasks_tree.tag_configure('not_started', foreground='black')
+            self._insert_tasks(self.tasks)
             
             # Clear details
             self._clear_task_details()
@@ -279,6 +259,149 @@ class TasksTab:
         except Exception as e:
             logger.error(f"Error applying filter: {str(e)}")
     
+    def _task_matches_filter(self, task, filter_type, today):
+        """Check whether a task should be shown under the given filter"""
+        if filter_type == "All Tasks":
+            return True
+        elif filter_type == "Today":
+            due_date = task.get('due_date')
+            if due_date:
+                try:
+                    # Parse date string
+                    task_date = self._parse_date(due_date)
+                    if task_date and task_date.date() == today:
+                        return True
+                except:
+                    # If parsing fails, skip this task
+                    pass
+        elif filter_type == "This Week":
+            due_date = task.get('due_date')
+            if due_date:
+                try:
+                    # Parse date string
+                    task_date = self._parse_date(due_date)
+                    if task_date:
+                        # Calculate days until end of week (Sunday)
+                        days_to_end_of_week = 6 - today.weekday()  # 0=Monday, 6=Sunday
+                        end_of_week = today + timedelta(days=days_to_end_of_week)
+                        
+                        if today <= task_date.date() <= end_of_week:
+                            return True
+                except:
+                    # If parsing fails, skip this task
+                    pass
+        elif filter_type == "Completed":
+            return task.get('status') == "Completed"
+        elif filter_type == "Not Started":
+            return task.get('status') == "Not Started"
+        
+        return False
+    
+    def _task_row(self, task):
+        """Build the treeview values and tags for a task"""
+        due_date = task.get('due_date', '')
+        if due_date:
+            # Try to format date for display
+            try:
+                date_obj = self._parse_date(due_date)
+                if date_obj:
+                    due_date = date_obj.strftime("%m/%d/%Y")
+            except:
+                # Keep original string if parsing fails
+                pass
+        
+        values = (
+            task.get('text', ''),
+            due_date,
+            task.get('status', 'Not Started'),
+            task.get('priority', 'Medium')
+        )
+        tags = (task.get('status', '').lower().replace(' ', '_'),)
+        return values, tags
+    
+    def _insert_tasks(self, tasks):
+        """Add the tasks matching the current filter to the treeview"""
+        filter_type = self.filter_var.get()
+        today = datetime.now().date()
+        
+        # Add filtered tasks to treeview, keyed by task id
+        for task in tasks:
+            if not self._task_matches_filter(task, filter_type, today):
+                continue
+            
+            values, tags = self._task_row(task)
+            self.tasks_tree.insert("", tk.END, iid=str(task['id']), values=values, tags=tags)
+        
+        # Configure tag appearances
+        self.tasks_tree.tag_configure('completed', foreground='gray')
+        self.tasks_tree.tag_configure('in_progress', foreground='blue')
+        self.tasks_tree.tag_configure('not_started', foreground='black')
+    
+    def _on_tasks_changed(self, table_name, version):
+        """Storage change listener; may be called from any thread"""
+        if table_name == 'tasks' and version != self.tasks_version:
+            self.parent.after(0, self._refresh_tasks)
+    
+    def _refresh_tasks(self):
+        """Apply task changes made since the last load instead of reloading"""
+        try:
+            version = self.storage_service.get_version('tasks')
+            if version == self.tasks_version:
+                return
+            
+            changes = self.storage_service.changes_since('tasks', self.tasks_version)
+            if changes is None:
+                # Change log no longer covers our version
+                self._load_tasks()
+                return
+            
+            self._apply_task_changes(changes)
+            
+        except Exception as e:
+            logger.error(f"Error refreshing tasks: {str(e)}")
+    
+    def _apply_task_changes(self, changes):
+        """Apply a change set from StorageService.changes_since to the list"""
+        filter_type = self.filter_var.get()
+        status_filter = self.STATUS_FILTERS.get(filter_type)
+        today = datetime.now().date()
+        
+        tasks_by_id = {task.get('id'): task for task in self.tasks}
+        
+        for task_id in changes['deleted']:
+            tasks_by_id.pop(task_id, None)
+            if self.tasks_tree.exists(str(task_id)):
+                self.tasks_tree.delete(str(task_id))
+            if self.current_task and self.current_task.get('id') == task_id:
+                self._clear_task_details()
+        
+        for task in changes['inserted'] + changes['updated']:
+            # Rows beyond the loaded page arrive through paging later
+            if task['id'] not in tasks_by_id and self.has_more_tasks and self.tasks_cursor:
+                cursor_key = (self.tasks_cursor.get('due_date') or '', self.tasks_cursor.get('id'))
+                if ((task.get('due_date') or ''), task['id']) > cursor_key:
+                    continue
+            
+            if status_filter and task.get('status') != status_filter:
+                tasks_by_id.pop(task['id'], None)
+            elif task['id'] in tasks_by_id:
+                tasks_by_id[task['id']].update(task)
+            else:
+                tasks_by_id[task['id']] = task
+            
+            iid = str(task['id'])
+            if task['id'] in tasks_by_id and self._task_matches_filter(task, filter_type, today):
+                values, tags = self._task_row(task)
+                if self.tasks_tree.exists(iid):
+                    self.tasks_tree.item(iid, values=values, tags=tags)
+                else:
+                    self.tasks_tree.insert("", tk.END, iid=iid, values=values, tags=tags)
+            elif self.tasks_tree.exists(iid):
+                self.tasks_tree.delete(iid)
+        
+        self.tasks = list(tasks_by_id.values())
+        self.tasks_version = changes['version']
+    
     def _parse_date(self, date_string):
         """Parse date string into datetime object"""
         # Try various date formats
@@ -304,17 +427,10 @@ class TasksTab:
             if not selection:
                 return
                 
-            # Get selected item values
-            item = selection[0]
-            values = self.tasks_tree.item(item, 'values')
-            
-            if not values:
-                return
-                
-            # Find the task in our list
-            task_text = values[0]
+            # Rows are keyed by task id
+            task_id = selection[0]
             for task in self.tasks:
-                if task.get('text') == task_text:
+                if str(task.get('id')) == task_id:
                     self.current_task = task
                     break
             
@@ -438,21 +554,26 @@ class TasksTab:
                     'status': 'Not Started'
                 }
                 
-                # Save to storage
-                task_id = self.storage_service.save_task(task_data)
+                # Show the task right away under a temporary id; the real
+                # id is filled in once the writer thread has stored it
+                temp_id = self.next_pending_id
+                self.next_pending_id -= 1
+                task_data['id'] = temp_id
                 
-                if task_id:
-                    # Add to list
-                    task_data['id'] = task_id
-                    self.tasks.append(task_data)
-                    
-                    # Refresh display
-                    self._apply_filter()
-                    
-                    dialog.destroy()
-                    messagebox.showinfo("Add Task", "Task added successfully.")
-                else:
-                    messagebox.showerror("Add Task", "Failed to add task.")
+                future = self.write_queue.save_task(task_data)
+                self.pending_saves[temp_id] = future
+                future.add_done_callback(
+                    lambda f: self.parent.after(0, lambda: self._on_task_saved(temp_id, f))
+                )
+                
+                # Add to list
+                self.tasks.append(task_data)
+                
+                # Refresh display
+                self._apply_filter()
+                
+                dialog.destroy()
+                messagebox.showinfo("Add Task", "Task added successfully.")
             
             ttk.Button(button_frame, text="Save", command=save_task).pack(side=tk.RIGHT, padx=5)
             
@@ -486,9 +607,9 @@ class TasksTab:
             self.current_task['priority'] = priority
             self.current_task['status'] = status
             
-            # Save to storage
-            result = self.storage_service.update_task(
-                self.current_task['id'],
+            # Queue the write and update the display optimistically
+            future = self.write_queue.update_task(
+                self._task_ref(self.current_task),
                 {
                     'text': task_text,
                     'due_date': due_date,
@@ -496,13 +617,11 @@ class TasksTab:
                     'status': status
                 }
             )
+            self._watch_write(future, "Update Task", "Failed to update task.")
             
-            if result:
-                # Refresh display
-                self._apply_filter()
-                messagebox.showinfo("Update Task", "Task updated successfully.")
-            else:
-                messagebox.showerror("Update Task", "Failed to update task.")
+            # Refresh display
+            self._apply_filter()
+            messagebox.showinfo("Update Task", "Task updated successfully.")
             
         except Exception as e:
             logger.error(f"Error updating task: {str(e)}")
@@ -519,9 +638,9 @@ class TasksTab:
             self.current_task['status'] = 'Completed'
             self.status_var.set('Completed')
             
-            # Save to storage
-            result = self.storage_service.update_task(
-                self.current_task['id'],
+            # Queue the write and update the display optimistically
+            future = self.write_queue.update_task(
+                self._task_ref(self.current_task),
                 {
                     'text': self.current_task['text'],
                     'due_date': self.current_task.get('due_date', ''),
@@ -529,13 +648,11 @@ class TasksTab:
                     'status': 'Completed'
                 }
             )
+            self._watch_write(future, "Mark Complete", "Failed to update task status.")
             
-            if result:
-                # Refresh display
-                self._apply_filter()
-                messagebox.showinfo("Mark Complete", "Task marked as complete.")
-            else:
-                messagebox.showerror("Mark Complete", "Failed to update task status.")
+            # Refresh display
+            self._apply_filter()
+            messagebox.showinfo("Mark Complete", "Task marked as complete.")
             
         except Exception as e:
             logger.error(f"Error marking task complete: {str(e)}")
@@ -552,27 +669,83 @@ class TasksTab:
             if not messagebox.askyesno("Delete Task", "Are you sure you want to delete this task?"):
                 return
                 
-            # Delete from storage
-            result = self.storage_service.delete_task(self.current_task['id'])
+            # Queue the delete and remove the task from the display optimistically
+            future = self.write_queue.delete_task(self._task_ref(self.current_task))
+            self._watch_write(future, "Delete Task", "Failed to delete task.")
             
-            if result:
-                # Remove from list
-                self.tasks = [t for t in self.tasks if t.get('id') != self.current_task['id']]
-                
-                # Refresh display
-                self._apply_filter()
-                
-                # Clear details
-                self._clear_task_details()
-                
-                messagebox.showinfo("Delete Task", "Task deleted successfully.")
-            else:
-                messagebox.showerror("Delete Task", "Failed to delete task.")
+            # Remove from list
+            self.tasks = [t for t in self.tasks if t.get('id') != self.current_task['id']]
+            
+            # Refresh display
+            self._apply_filter()
+            
+            # Clear details
+            self._clear_task_details()
+            
+            messagebox.showinfo("Delete Task", "Task deleted successfully.")
             
         except Exception as e:
             logger.error(f"Error deleting task: {str(e)}")
             messagebox.showerror("Delete Task", f"Error: {str(e)}")
     
+    def _task_ref(self, task):
+        """Get the id to queue writes against, or the pending save for a new task"""
+        return self.pending_saves.get(task['id'], task['id'])
+    
+    def _watch_write(self, future, title, error_message):
+        """Report a failed queued write and reload to drop the optimistic change"""
+        def on_done(f):
+            try:
+                ok = f.result()
+            except Exception as e:
+                logger.error(f"Error in queued task write: {str(e)}")
+                ok = False
+            
+            if not ok:
+                self.parent.after(0, lambda: self._on_write_failed(title, error_message))
+        
+        future.add_done_callback(on_done)
+    
+    def _on_write_failed(self, title, error_message):
+        """Show a write error and reload tasks from storage"""
+        messagebox.showerror(title, error_message)
+        self._load_tasks()
+    
+    def _on_task_saved(self, temp_id, future):
+        """Swap the temporary id of a newly added task for its stored id"""
+        self.pending_saves.pop(temp_id, None)
+        
+        try:
+            task_id = future.result()
+        except Exception as e:
+            logger.error(f"Error in queued task save: {str(e)}")
+            task_id = None
+        
+        task = next((t for t in self.tasks if t.get('id') == temp_id), None)
+        iid = str(temp_id)
+        
+        if not task_id:
+            self.tasks = [t for t in self.tasks if t.get('id') != temp_id]
+            if self.tasks_tree.exists(iid):
+                self.tasks_tree.delete(iid)
+            messagebox.showerror("Add Task", "Failed to add task.")
+            return
+        
+        if task is None:
+            return
+        
+        task['id'] = task_id
+        
+        # Re-key the tree row, keeping its position and selection
+        if self.tasks_tree.exists(iid):
+            index = self.tasks_tree.index(iid)
+            selected = iid in self.tasks_tree.selection()
+            values, tags = self._task_row(task)
+            self.tasks_tree.delete(iid)
+            self.tasks_tree.insert("", index, iid=str(task_id), values=values, tags=tags)
+            if selected:
+                self.tasks_tree.selection_set(str(task_id))
+    
     def _open_source_email(self):
         """Open the source email if available"""
         if not self.current_task or not self.current_task.get('email_id'):